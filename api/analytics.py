@@ -0,0 +1,109 @@
+"""
+Analytics aggregated over many media items.
+
+Channel and billing account analytics sum the views and storage sizes of all of the media items in
+the channel or billing account. :py:func:`~.aggregate_analytics` computes the total storage size
+and the series of views with one query which groups the rows of the legacy SMS view rollups for
+the items by period. Aggregates are cached by :py:func:`~.cached_aggregate_analytics` until the
+rollups are next updated or media items are next synchronised from JWP. See
+:py:func:`legacysms.analytics.invalidate_aggregates`.
+
+"""
+import hashlib
+import json
+
+from django.contrib.postgres.fields.jsonb import KeyTextTransform
+from django.core.cache import cache
+from django.db import connections, models
+from django.db.models import functions
+
+from legacysms import analytics as legacyanalytics
+import legacysms.models as legacymodels
+
+#: Number of seconds for which aggregated analytics are cached. Aggregates are also invalidated
+#: when they change and so this only bounds how long unused aggregates occupy the cache.
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def aggregate_analytics(items, start=None, end=None, granularity=legacymodels.DAY):
+    """
+    Aggregate the analytics of a queryset of media items.
+
+    :param items: a queryset of :py:class:`mediaplatform.models.MediaItem`
+    :param start: if not ``None``, only count views in periods which end on or after this date
+    :param end: if not ``None``, only count views in periods which start on or before this date
+    :param granularity: one of :py:data:`legacysms.models.GRANULARITIES`
+
+    Returns a dict with the keys "granularity", "views", "total_views" and "size". The views are a
+    list of dicts with the keys "day" and "num_hits", like the fields of
+    :py:attr:`legacysms.models.MediaItem.ResultRow`, in order of increasing day giving the total
+    views of all the items in each period. The size is the total storage size of the items in
+    bytes as given by :py:attr:`mediaplatform.models.MediaItem.fetched_size`.
+
+    """
+    rollup_model = legacymodels.ROLLUP_MODELS[granularity]
+
+    items_sql, items_params = (
+        items
+        .annotate(
+            media_id=models.F('sms__id'),
+            size=functions.Cast(
+                KeyTextTransform('size', 'jwp__resource__data'), models.BigIntegerField()),
+        )
+        .order_by()
+        .values('media_id', 'size')
+        .query.sql_with_params()
+    )
+
+    conditions, params = ['TRUE'], []
+    if start is not None:
+        conditions.append('rollups.day >= %s')
+        params.append(rollup_model.period_start(start))
+    if end is not None:
+        conditions.append('rollups.day <= %s')
+        params.append(end)
+
+    # The first row holds the total size and the remaining rows hold the views in each period.
+    sql = f'''
+        WITH items AS ({items_sql})
+        SELECT NULL::date AS day, COALESCE(SUM(items.size), 0)::bigint AS total FROM items
+        UNION ALL
+        SELECT rollups.day, SUM(rollups.views)::bigint
+        FROM {rollup_model._meta.db_table} AS rollups
+        JOIN items ON rollups.media_id = items.media_id
+        WHERE {' AND '.join(conditions)}
+        GROUP BY rollups.day
+        ORDER BY day NULLS FIRST
+    '''
+
+    with connections[items.db].cursor() as cursor:
+        cursor.execute(sql, list(items_params) + params)
+        (_, size), *rows = cursor.fetchall()
+
+    return {
+        'granularity': granularity,
+        'views': [{'day': day, 'num_hits': num_hits} for day, num_hits in rows],
+        'total_views': sum(num_hits for _, num_hits in rows),
+        'size': size,
+    }
+
+
+def cached_aggregate_analytics(scope, items, start=None, end=None,
+                               granularity=legacymodels.DAY):
+    """
+    Like :py:func:`~.aggregate_analytics` except that the result is cached. *scope* is a string
+    identifying the set of items, e.g. "channel:<id>", which is used in the cache key in place of
+    the queryset. The cached aggregates are invalidated by
+    :py:func:`legacysms.analytics.invalidate_aggregates`.
+
+    """
+    key_parts = [scope, granularity, str(start), str(end)]
+    cache_key = 'api:analytics:{}:{}'.format(
+        legacyanalytics.aggregates_generation(),
+        hashlib.sha256(json.dumps(key_parts).encode('utf8')).hexdigest())
+
+    aggregates = cache.get(cache_key)
+    if aggregates is None:
+        aggregates = aggregate_analytics(items, start=start, end=end, granularity=granularity)
+        cache.set(cache_key, aggregates, CACHE_TIMEOUT)
+    return aggregates
@@ -0,0 +1,140 @@
+"""
+Micro-benchmarks for performance-sensitive parts of the API. These are run via the
+``apibenchmark`` management command:
+
+.. code-block:: bash
+
+    $ ./manage.py apibenchmark
+    $ ./manage.py apibenchmark --number 500 serializer_fields
+
+Each benchmark is a function taking the number of iterations to run and returning a list of
+``(label, seconds per iteration)`` pairs. Benchmarks are registered in :py:data:`BENCHMARKS`.
+
+"""
+import datetime
+import timeit
+
+from rest_framework import renderers as drfrenderers
+from rest_framework import serializers as drfserializers
+
+import mediaplatform.models as mpmodels
+
+from . import renderers
+from . import serializers
+
+
+def serializer_fields(number):
+    """
+    Time the construction of the fields for the media item serializers with and without the
+    per-class field cache provided by :py:class:`api.serializers.CachedFieldsMixin`. The cost of
+    constructing a language ChoiceField is timed separately since that is what DRF would build
+    from the model field if the language field were not declared explicitly.
+
+    """
+    results = []
+
+    for serializer_class in [serializers.MediaItemSerializer,
+                             serializers.MediaItemDetailSerializer]:
+        name = serializer_class.__name__
+
+        def uncached():
+            # Clearing the cache means that get_fields() has to introspect the model each time.
+            serializer_class._cached_prototype_fields = None
+            return serializer_class().fields
+
+        def cached():
+            return serializer_class().fields
+
+        results.append((f'{name} fields, uncached', _time(uncached, number)))
+        cached()
+        results.append((f'{name} fields, cached', _time(cached, number)))
+
+    choices = mpmodels.MediaItem.LANGUAGE_CHOICES
+    results.append((
+        'language ChoiceField construction',
+        _time(lambda: drfserializers.ChoiceField(choices=choices, allow_blank=True), number)
+    ))
+    results.append((
+        'language CharField construction',
+        _time(lambda: drfserializers.CharField(
+            max_length=3, allow_blank=True, validators=[serializers.validate_language_code]
+        ), number)
+    ))
+
+    return results
+
+
+def renderers_page(number):
+    """
+    Time rendering a representative page of media item list results with DRF's stdlib JSON
+    renderer, the JSON renderer from :py:mod:`api.renderers` and, if available, the MessagePack
+    renderer. Pages of the default (50) and maximum (300) size are rendered.
+
+    """
+    results = []
+    candidates = [
+        ('stdlib json', drfrenderers.JSONRenderer()),
+        ('api.renderers.JSONRenderer', renderers.JSONRenderer()),
+    ]
+    if renderers.HAVE_MSGPACK:
+        candidates.append(('api.renderers.MessagePackRenderer', renderers.MessagePackRenderer()))
+
+    for page_size in [50, 300]:
+        data = _representative_page(page_size)
+        for label, renderer in candidates:
+            results.append((
+                f'{label}, {page_size} items',
+                _time(lambda: renderer.render(data, renderer.media_type, {}), number)
+            ))
+
+    return results
+
+
+#: Registered benchmarks keyed by name.
+BENCHMARKS = {
+    'serializer_fields': serializer_fields,
+    'renderers': renderers_page,
+}
+
+
+def _representative_page(page_size):
+    """
+    Return data shaped like a page from the media item list endpoint as produced by
+    :py:class:`api.serializers.MediaItemSerializer`. Values of a similar length to real-world ones
+    are used for each field.
+
+    """
+    now = datetime.datetime(2018, 11, 5, 12, 34, 56, 789000, tzinfo=datetime.timezone.utc)
+    return {
+        'next': 'https://media.invalid/api/media/?cursor=cD0yMDE4LTExLTA1KzEyJTNBMzQlM0E1Ng%3D%3D',
+        'previous': None,
+        'results': [
+            {
+                'url': f'https://media.invalid/api/media/item{index:06d}',
+                'id': f'item{index:06d}',
+                'title': f'Lecture {index}: An introduction \N{EN DASH} part {index}',
+                'description': 'A description of the lecture. ' * 20,
+                'duration': 3600.5 + index,
+                'type': 'video',
+                'publishedAt': (now - datetime.timedelta(days=index)).isoformat(),
+                'downloadable': index % 2 == 0,
+                'language': 'eng',
+                'copyright': 'University of Cambridge',
+                'tags': ['lecture', 'physics', f'tag{index % 10}'],
+                'createdAt': now.isoformat(),
+                'updatedAt': now.isoformat(),
+                'posterImageUrl': (
+                    f'https://media.invalid/api/media/item{index:06d}/poster-720.jpg'),
+                'downloadableByUser': True,
+            }
+            for index in range(page_size)
+        ],
+    }
+
+
+def _time(callable_, number):
+    """
+    Return the best time in seconds per call to *callable_* from three runs of *number* calls.
+
+    """
+    return min(timeit.repeat(callable_, number=number, repeat=3)) / number
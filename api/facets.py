@@ -0,0 +1,111 @@
+"""
+Facet counts for media item listings.
+
+A facet is a property of media items, such as the channel or the year of publication, by which a
+listing can be broken down. :py:func:`~.facet_counts` counts the number of items in a queryset
+for each value of several facets at once. Rather than issuing one query per facet, the queryset is
+used as a sub-query and grouped by ``GROUPING SETS`` with one grouping set per facet. The most
+common values of each facet are then selected with a window function in the same query.
+
+"""
+from django.db import connections
+from django.db.models import functions
+
+#: Facet for the channel containing the item. Values are channel ids.
+CHANNEL = 'channel'
+
+#: Facet for the type of media.
+TYPE = 'type'
+
+#: Facet for the language of the item.
+LANGUAGE = 'language'
+
+#: Facet for the year of publication.
+YEAR = 'year'
+
+#: Facet for tags. An item with several tags is counted once for each tag.
+TAG = 'tag'
+
+#: Supported facets mapped to the expression which gives the value of the facet within the facet
+#: query.
+FACETS = {
+    CHANNEL: 'items.channel_id',
+    TYPE: 'items.type',
+    LANGUAGE: 'items.language',
+    YEAR: 'items.published_year',
+    TAG: 'item_tags.tag',
+}
+
+
+def facet_counts(queryset, facets, limit):
+    """
+    Count the items in a queryset of media items for each value of the requested facets.
+
+    :param queryset: a queryset of media items which should already be filtered to those items the
+        user may view and by any search
+    :param facets: a sequence of facet names from :py:data:`~.FACETS`
+    :param limit: the maximum number of values to return for each facet
+
+    Returns a dict mapping each requested facet name to a list of dicts with the keys "value" and
+    "count". The list contains the *limit* most common values of the facet in order of decreasing
+    count. Items for which the value of a facet is NULL are not counted for that facet.
+
+    """
+    facets = [facet for facet in FACETS if facet in facets]
+    if len(facets) == 0:
+        return {}
+
+    items_sql, params = (
+        queryset
+        .annotate(published_year=functions.ExtractYear('published_at'))
+        .order_by()
+        .values('id', 'channel', 'type', 'language', 'published_year', 'tags')
+        .query.sql_with_params()
+    )
+
+    from_clause = f'({items_sql}) AS items'
+    if TAG in facets:
+        # A left join is used so that items without tags are still counted for the other facets.
+        from_clause += ' LEFT JOIN LATERAL unnest(items.tags) AS item_tags(tag) ON TRUE'
+
+    expressions = [FACETS[facet] for facet in facets]
+
+    # The facet of a row in the grouped result is the one column which is not grouped out. Values
+    # of all facets are returned as text in one column.
+    facet_case = ' '.join(
+        f"WHEN GROUPING({expression}) = 0 THEN '{facet}'"
+        for facet, expression in zip(facets, expressions)
+    )
+    value_coalesce = ', '.join(f'({expression})::text' for expression in expressions)
+    grouping_sets = ', '.join(f'({expression})' for expression in expressions)
+
+    sql = f'''
+        SELECT facet, value, item_count FROM (
+            SELECT
+                facet, value, item_count,
+                ROW_NUMBER() OVER (
+                    PARTITION BY facet ORDER BY item_count DESC, value
+                ) AS facet_rank
+            FROM (
+                SELECT
+                    CASE {facet_case} END AS facet,
+                    COALESCE({value_coalesce}) AS value,
+                    COUNT(DISTINCT items.id) AS item_count
+                FROM {from_clause}
+                GROUP BY GROUPING SETS ({grouping_sets})
+            ) AS grouped_counts
+            WHERE value IS NOT NULL
+        ) AS ranked_counts
+        WHERE facet_rank <= %s
+        ORDER BY facet, item_count DESC, value
+    '''
+
+    counts = {facet: [] for facet in facets}
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, list(params) + [limit])
+        for facet, value, item_count in cursor.fetchall():
+            if facet == YEAR:
+                value = int(float(value))
+            counts[facet].append({'value': value, 'count': item_count})
+
+    return counts
@@ -0,0 +1,31 @@
+"""
+The ``apibenchmark`` management command runs the micro-benchmarks in :py:mod:`api.benchmarks`
+and prints the time per iteration for each. With no positional arguments, all benchmarks are run.
+
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Run API micro-benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*', metavar='BENCHMARK',
+            help='Benchmarks to run. One of: {}'.format(', '.join(benchmarks.BENCHMARKS)))
+        parser.add_argument(
+            '--number', type=int, default=100,
+            help='Number of iterations for each timing (default: 100)')
+
+    def handle(self, *args, names, number, **options):
+        names = names if len(names) > 0 else list(benchmarks.BENCHMARKS)
+        for name in names:
+            if name not in benchmarks.BENCHMARKS:
+                raise CommandError(f'Unknown benchmark: {name}')
+
+        for name in names:
+            self.stdout.write(f'{name}:')
+            for label, seconds in benchmarks.BENCHMARKS[name](number):
+                self.stdout.write(f'    {label:<50} {seconds * 1e6:12.1f} \N{MICRO SIGN}s')
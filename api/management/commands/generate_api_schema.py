@@ -0,0 +1,25 @@
+"""
+The ``generate_api_schema`` management command writes the pre-generated API schema artifacts for
+the current code version. See :py:mod:`api.schema`.
+
+"""
+from django.core.management.base import BaseCommand
+
+from api import schema
+
+
+class Command(BaseCommand):
+    help = 'Generate the API schema artifacts for the current code version.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate the artifacts even if they exist for the current version')
+
+    def handle(self, *args, force, **options):
+        paths = schema.write_artifacts(force=force)
+        if len(paths) == 0:
+            self.stdout.write(
+                f'API schema for version {schema.code_version()} is up to date')
+        for path in paths:
+            self.stdout.write(f'Wrote {path}')
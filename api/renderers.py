@@ -0,0 +1,88 @@
+"""
+Renderers for the API.
+
+:py:class:`~.JSONRenderer` is a drop-in replacement for DRF's JSON renderer which uses `orjson
+<https://github.com/ijl/orjson>`_ to encode responses if it is installed. Values which orjson does
+not handle natively in a way compatible with DRF, such as datetimes and Decimals, are encoded
+using DRF's own :py:class:`rest_framework.utils.encoders.JSONEncoder`. The output is equivalent
+to DRF's but not identical: whitespace and the formatting of some floats differ and NaN and
+infinite floats are rendered as ``null`` whereas DRF refuses to render them.
+
+:py:class:`~.MessagePackRenderer` renders responses as `MessagePack <https://msgpack.org/>`_ if
+the msgpack library is installed. Clients select it by sending ``Accept: application/msgpack``.
+
+Both libraries are optional. If they are not installed, :py:data:`~.API_RENDERER_CLASSES` falls
+back to DRF's JSON renderer and does not offer MessagePack.
+
+"""
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+    HAVE_ORJSON = True
+except ImportError:  # pragma: no cover
+    HAVE_ORJSON = False
+
+try:
+    import msgpack
+    HAVE_MSGPACK = True
+except ImportError:  # pragma: no cover
+    HAVE_MSGPACK = False
+
+#: Encoder whose default() method is used for values which cannot be encoded natively.
+_ENCODER = encoders.JSONEncoder()
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    A JSON renderer which uses orjson. If orjson is not installed or if indented output is
+    requested, rendering is delegated to DRF's :py:class:`rest_framework.renderers.JSONRenderer`.
+
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (not HAVE_ORJSON or
+                self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Datetimes are passed through to DRF's encoder since orjson and DRF differ in how they
+        # represent UTC.
+        ret = orjson.dumps(
+            data, default=_ENCODER.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+        # Like DRF, escape the unicode line and paragraph separators which are valid in JSON but
+        # not in JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Render data as MessagePack. Values which have no MessagePack representation are converted in
+    the same way as the JSON renderer would.
+
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_ENCODER.default, use_bin_type=True)
+
+
+#: Renderer classes used by the API views. MessagePack is only offered if msgpack is installed.
+API_RENDERER_CLASSES = (
+    [JSONRenderer] +
+    ([MessagePackRenderer] if HAVE_MSGPACK else []) +
+    [renderers.BrowsableAPIRenderer]
+)
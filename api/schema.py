@@ -0,0 +1,210 @@
+"""
+Pre-generated OpenAPI schema for the API.
+
+Generating the swagger document with DRF-YASG introspects every view, serializer and filter in the
+API. Doing so on each request to ``/api/swagger.json`` is wasteful since the document only changes
+when the code does. This module generates the document once per *code version*, stores it as a
+versioned artifact on disk and serves the stored copy with an ``ETag`` header so that clients can
+make conditional requests.
+
+The code version is taken from the :py:data:`~mediawebapp.settings.base.API_SCHEMA_CODE_VERSION`
+setting if it is non-empty. Otherwise it is a digest of the project's Python sources and the
+versions of the libraries which influence the generated document. The artifacts are written to
+:py:data:`~mediawebapp.settings.base.API_SCHEMA_DIR` by the ``generate_api_schema`` management
+command at build time. If no artifact exists for the current version, it is generated on first use
+and written to disk if possible.
+
+"""
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, Http404
+from django.views.decorators.http import condition, require_safe
+import django
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.generators import OpenAPISchemaGenerator
+import drf_yasg
+import rest_framework
+
+LOG = logging.getLogger(__name__)
+
+#: Description of the API included in the generated document.
+API_INFO = openapi.Info(
+    title='Media API',
+    default_version='v1',
+    description='Media Service Content API',
+    contact=openapi.Contact(email='automation@uis.cam.ac.uk'),
+    license=openapi.License(name='MIT License'),
+)
+
+#: Supported formats for the schema mapped to the codec used to encode them and the content type
+#: they are served with.
+FORMATS = {
+    'json': (OpenAPICodecJson, 'application/json'),
+    'yaml': (OpenAPICodecYaml, 'application/yaml'),
+}
+
+#: Directories which are not considered when computing the code version.
+_IGNORED_DIRECTORIES = {
+    'build', 'frontend', 'migrations', 'node_modules', 'test', 'tests', 'venv', '__pycache__',
+}
+
+#: In-process cache of artifacts keyed by (code version, format). Values are (content, etag)
+#: tuples.
+_ARTIFACTS = {}
+
+#: Lock held while generating the schema so that concurrent requests only generate it once.
+_GENERATE_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def code_version():
+    """
+    Return a string identifying the version of the code which determines the generated schema.
+    The value is computed once per process.
+
+    """
+    if settings.API_SCHEMA_CODE_VERSION:
+        return settings.API_SCHEMA_CODE_VERSION
+
+    digest = hashlib.sha256()
+    for module in (django, rest_framework, drf_yasg):
+        digest.update(f'{module.__name__}={getattr(module, "__version__", "")}\n'.encode('utf8'))
+
+    for root, dirs, files in os.walk(settings.BASE_DIR):
+        # Sort the directories in place so that the walk order is deterministic.
+        dirs[:] = sorted(
+            d for d in dirs if d not in _IGNORED_DIRECTORIES and not d.startswith('.'))
+        for name in sorted(files):
+            if not name.endswith('.py'):
+                continue
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, settings.BASE_DIR).encode('utf8'))
+            with open(path, 'rb') as fobj:
+                digest.update(fobj.read())
+
+    return digest.hexdigest()[:16]
+
+
+def artifact_path(format, version=None):
+    """
+    Return the path to the schema artifact for *format* and the code version *version*. If
+    *version* is ``None``, the current code version is used.
+
+    """
+    version = version if version is not None else code_version()
+    return os.path.join(settings.API_SCHEMA_DIR, version, f'swagger.{format}')
+
+
+def generate():
+    """
+    Generate the schema document for the API. Returns a :py:class:`drf_yasg.openapi.Swagger`
+    instance.
+
+    The document is generated without a request and so does not include a host. Per the OpenAPI 2.0
+    specification, clients then use the host which served the document.
+
+    """
+    generator = OpenAPISchemaGenerator(info=API_INFO, urlconf=settings.API_SCHEMA_URLCONF)
+    return generator.get_schema(request=None, public=True)
+
+
+def write_artifacts(force=False):
+    """
+    Generate the schema and write it to disk in all supported formats for the current code
+    version. Unless *force* is ``True``, nothing is generated if all artifacts already exist.
+    Returns a list of the paths written.
+
+    """
+    paths = {format: artifact_path(format) for format in FORMATS}
+    if not force and all(os.path.isfile(path) for path in paths.values()):
+        return []
+
+    document = generate()
+    for format, path in paths.items():
+        codec_class, _ = FORMATS[format]
+        _write_atomically(path, codec_class(validators=[]).encode(document))
+
+    _ARTIFACTS.clear()
+    return list(paths.values())
+
+
+def get_artifact(format):
+    """
+    Return a (content, etag) tuple for the schema in *format* for the current code version. The
+    schema is read from disk if an artifact exists and is generated otherwise.
+
+    """
+    key = (code_version(), format)
+    artifact = _ARTIFACTS.get(key)
+    if artifact is not None:
+        return artifact
+
+    with _GENERATE_LOCK:
+        artifact = _ARTIFACTS.get(key)
+        if artifact is not None:
+            return artifact
+
+        path = artifact_path(format)
+        try:
+            with open(path, 'rb') as fobj:
+                content = fobj.read()
+        except FileNotFoundError:
+            LOG.info('No API schema artifact at "%s"; generating schema', path)
+            codec_class, _ = FORMATS[format]
+            content = codec_class(validators=[]).encode(generate())
+            try:
+                _write_atomically(path, content)
+            except OSError as e:
+                LOG.warning('Could not write API schema artifact "%s": %s', path, e)
+
+        artifact = (content, hashlib.sha256(content).hexdigest()[:32])
+        _ARTIFACTS[key] = artifact
+
+    return artifact
+
+
+def _write_atomically(path, content):
+    """
+    Write *content* to *path* such that readers never see a partially written file.
+
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.swagger-')
+    try:
+        # mkstemp() creates files which are only readable by their owner.
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as fobj:
+            fobj.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _artifact_etag(request, format):
+    format = format.lstrip('.')
+    return get_artifact(format)[1] if format in FORMATS else None
+
+
+@require_safe
+@condition(etag_func=_artifact_etag)
+def schema_view(request, format):
+    """
+    Serve the pre-generated schema. *format* is the extension of the requested document including
+    the leading dot, e.g. ``".json"``.
+
+    """
+    format = format.lstrip('.')
+    if format not in FORMATS:
+        raise Http404()
+    content, _ = get_artifact(format)
+    _, content_type = FORMATS[format]
+    return HttpResponse(content, content_type=content_type)
@@ -0,0 +1,154 @@
+"""
+Cross-type full-text search.
+
+Media items, channels and playlists each have a full-text search vector with a GIN index. Rather
+than searching each type of resource separately and merging the results, :py:func:`~.search`
+forms a single ``UNION ALL`` query with one branch per resource type. Each branch is filtered by
+the caller's permission conditions and ranks its own matches. The combined result is ordered by
+rank and then by resource type and id so that the ordering is total.
+
+Results are paged by position rather than offset. The last result of a page is encoded as a
+cursor and the condition "comes after the cursor" is pushed into each branch.
+
+"""
+import base64
+import binascii
+import dataclasses
+import decimal
+import json
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import models
+from django.db.models import functions
+
+#: Resource type for media items.
+MEDIA_ITEM = 'mediaItem'
+
+#: Resource type for channels.
+CHANNEL = 'channel'
+
+#: Resource type for playlists.
+PLAYLIST = 'playlist'
+
+#: Resource types which may appear in search results.
+RESOURCE_TYPES = (CHANNEL, MEDIA_ITEM, PLAYLIST)
+
+#: Field used for the rank of a result. The rank is cast from a PostgreSQL "real" to a fixed
+#: precision numeric so that ranks in a cursor compare exactly with those in the database.
+RANK_FIELD = models.DecimalField(max_digits=12, decimal_places=8)
+
+#: Fields included in each result
+RESULT_FIELDS = ('resource_type', 'id', 'title', 'description', 'updated_at', 'rank')
+
+
+@dataclasses.dataclass(frozen=True)
+class Position:
+    """The position of a result in the ordering of search results."""
+
+    #: The rank of the result
+    rank: decimal.Decimal
+
+    #: The type of resource. One of :py:data:`~.RESOURCE_TYPES`.
+    resource_type: str
+
+    #: The id of the resource.
+    id: str
+
+    @classmethod
+    def from_result(cls, result):
+        """Return the position of a result returned from :py:func:`~.search`."""
+        return cls(rank=result['rank'], resource_type=result['resource_type'], id=result['id'])
+
+    def encode(self):
+        """Encode the position as an opaque string suitable for use in a URL."""
+        return base64.urlsafe_b64encode(
+            json.dumps([str(self.rank), self.resource_type, self.id]).encode('utf8')
+        ).decode('ascii')
+
+    @classmethod
+    def decode(cls, encoded):
+        """
+        Decode a string returned from :py:meth:`~.encode`. Raises :py:exc:`ValueError` if the
+        string is not a valid position.
+
+        """
+        try:
+            rank, resource_type, id = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf8'))
+            rank = decimal.Decimal(rank)
+        except (binascii.Error, UnicodeError, TypeError, decimal.InvalidOperation) as e:
+            raise ValueError(f'Invalid position: {e}')
+
+        if resource_type not in RESOURCE_TYPES or not isinstance(id, str):
+            raise ValueError('Invalid position')
+
+        return cls(rank=rank, resource_type=resource_type, id=id)
+
+
+def search_query(terms):
+    """
+    Return a :py:class:`django.contrib.postgres.search.SearchQuery` which matches any of the
+    passed search terms.
+
+    """
+    query = SearchQuery(terms[0])
+    for t in terms[1:]:
+        query = query | SearchQuery(t)
+    return query
+
+
+def search(querysets, query, after=None, limit=50):
+    """
+    Search resources of several types using a single query.
+
+    :param querysets: a dict mapping resource types to querysets of resources of that type. Each
+        queryset should already be filtered to those resources the user may view.
+    :param query: a :py:class:`django.contrib.postgres.search.SearchQuery` to search for
+    :param after: if not ``None``, a :py:class:`~.Position` and only results after that position
+        are returned
+    :param limit: the maximum number of results to return
+
+    Returns a list of dicts with the keys listed in :py:data:`~.RESULT_FIELDS`.
+
+    """
+    branches = [
+        _ranked_queryset(resource_type, queryset, query, after)
+        for resource_type, queryset in querysets.items()
+    ]
+    if len(branches) == 0:
+        return []
+
+    combined = branches[0].union(*branches[1:], all=True)
+    return list(combined.order_by('-rank', 'resource_type', 'id')[:limit])
+
+
+def _ranked_queryset(resource_type, queryset, query, after):
+    """
+    Return a values queryset for one branch of the search. The queryset selects
+    :py:data:`~.RESULT_FIELDS` for the resources in *queryset* matching *query* which come after
+    *after*.
+
+    """
+    queryset = (
+        queryset
+        .annotate(
+            rank=functions.Cast(
+                SearchRank(models.F('text_search_vector'), query), output_field=RANK_FIELD),
+            resource_type=models.Value(resource_type, output_field=models.CharField()),
+        )
+        .filter(text_search_vector=query)
+    )
+
+    # Since the resource type is constant within a branch, the condition "comes after" is only a
+    # condition on the rank and id.
+    if after is not None:
+        if resource_type > after.resource_type:
+            queryset = queryset.filter(rank__lte=after.rank)
+        elif resource_type == after.resource_type:
+            queryset = queryset.filter(
+                models.Q(rank__lt=after.rank) | models.Q(rank=after.rank, id__gt=after.id))
+        else:
+            queryset = queryset.filter(rank__lt=after.rank)
+
+    # Clear any default ordering since branches of a UNION cannot be ordered.
+    return queryset.order_by().values(*RESULT_FIELDS)
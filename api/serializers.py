@@ -1,17 +1,109 @@
+import copy
 import logging
 from urllib import parse as urlparse
 
 from django.conf import settings
-from django.http import QueryDict
-from django.urls import reverse
-from django.utils.http import urlencode
 from rest_framework import serializers
 
 from mediaplatform import models as mpmodels
 from mediaplatform_jwp.api import management as management
 
+from . import search
+from . import suggestions
+from . import urltemplates
+
 LOG = logging.getLogger(__name__)
 
+#: The set of valid values for a media item's language. Validating against a set is far cheaper
+#: than having DRF construct a ChoiceField from the 7,000+ entries in
+#: :py:attr:`mediaplatform.models.MediaItem.LANGUAGE_CHOICES` for each serializer instance.
+LANGUAGE_CODES = frozenset(code for code, _ in mpmodels.MediaItem.LANGUAGE_CHOICES)
+
+
+def validate_language_code(value):
+    """
+    Validator which checks that *value* is an ISO 639-3 language code or is blank.
+
+    """
+    if value not in LANGUAGE_CODES:
+        raise serializers.ValidationError(f'"{value}" is not a valid ISO 639-3 language code.')
+
+
+# Hyperlinked fields
+#
+# The following fields and base serializer replace DRF's hyperlinked fields with ones which use
+# pre-compiled URL templates from :py:mod:`api.urltemplates` rather than calling reverse() and
+# build_absolute_uri() for every object.
+
+
+class HyperlinkedIdentityField(serializers.HyperlinkedIdentityField):
+    """
+    A :py:class:`rest_framework.serializers.HyperlinkedIdentityField` which uses
+    :py:func:`api.urltemplates.reverse` to form URLs.
+
+    """
+    def get_url(self, obj, view_name, request, format):
+        return _get_templated_url(self, obj, view_name, request)
+
+
+class HyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
+    """
+    A :py:class:`rest_framework.serializers.HyperlinkedRelatedField` which uses
+    :py:func:`api.urltemplates.reverse` to form URLs.
+
+    """
+    def get_url(self, obj, view_name, request, format):
+        return _get_templated_url(self, obj, view_name, request)
+
+
+def _get_templated_url(field, obj, view_name, request):
+    """
+    Implementation of get_url() shared between the hyperlinked fields above. Matches the behaviour
+    of DRF's implementation except that the format suffix is not supported.
+
+    """
+    # Unsaved objects will not yet have a valid URL.
+    if hasattr(obj, 'pk') and obj.pk in (None, ''):
+        return None
+
+    return urltemplates.reverse(
+        view_name, kwargs={field.lookup_url_kwarg: getattr(obj, field.lookup_field)},
+        request=request)
+
+
+class HyperlinkedModelSerializer(serializers.HyperlinkedModelSerializer):
+    """
+    A :py:class:`rest_framework.serializers.HyperlinkedModelSerializer` which uses the
+    templated hyperlinked fields for its url field and related fields.
+
+    """
+    serializer_url_field = HyperlinkedIdentityField
+
+    serializer_related_field = HyperlinkedRelatedField
+
+
+class CachedFieldsMixin:
+    """
+    A mixin for model serializers which builds the serializer fields once per class rather than
+    once per instance.
+
+    DRF re-runs its model introspection in :py:meth:`~rest_framework.serializers.ModelSerializer
+    .get_fields` every time a serializer is instantiated. This mixin caches the unbound fields
+    for each concrete class and hands each instance a deep copy of them.
+
+    The fields returned by get_fields() must not depend on the instance, e.g. its context. Any
+    per-request behaviour should happen when the field is used, as in
+    :py:class:`~.RelatedChannelIdField`.
+
+    """
+    def get_fields(self):
+        cls = type(self)
+        prototype_fields = cls.__dict__.get('_cached_prototype_fields')
+        if prototype_fields is None:
+            prototype_fields = super().get_fields()
+            cls._cached_prototype_fields = prototype_fields
+        return copy.deepcopy(prototype_fields)
+
 
 # Model serializers for API calls
 #
@@ -33,7 +125,7 @@ class RelatedBillingAccountIdField(serializers.PrimaryKeyRelatedField):
         return mpmodels.BillingAccount.objects.all().channels_creatable_by_user(user)
 
 
-class ChannelSerializer(serializers.HyperlinkedModelSerializer):
+class ChannelSerializer(HyperlinkedModelSerializer):
     """
     An individual channel.
 
@@ -59,7 +151,7 @@ class ChannelSerializer(serializers.HyperlinkedModelSerializer):
         source='billing_account', required=True, write_only=True,
         help_text='Unique id of owning billing account resource')
 
-    billingAccountUrl = serializers.HyperlinkedRelatedField(
+    billingAccountUrl = HyperlinkedRelatedField(
         source='billing_account', view_name='api:billing_account', read_only=True)
 
     def create(self, validated_data):
@@ -109,7 +201,7 @@ class RelatedChannelIdField(serializers.PrimaryKeyRelatedField):
         return mpmodels.Channel.objects.all().editable_by_user(user)
 
 
-class ChannelOwnedResourceModelSerializer(serializers.HyperlinkedModelSerializer):
+class ChannelOwnedResourceModelSerializer(HyperlinkedModelSerializer):
     """
     Shared ModelSerializer between Media Items and Playlists as both are owned by a channel
 
@@ -144,16 +236,9 @@ class PlaylistSerializer(ChannelOwnedResourceModelSerializer):
     )
 
     def get_mediaUrl(self, obj):
-        # Get location of media list endpoint
-        location = reverse('api:media_list')
-
-        # Add query parameter
-        location += '?' + urlencode({'playlist': obj.id})
-
-        if self.context is None or 'request' not in self.context:
-            return location
-
-        return self.context['request'].build_absolute_uri(location)
+        # Location of media list endpoint filtered by this playlist
+        return urltemplates.reverse(
+            'api:media_list', query={'playlist': obj.id}, request=_context_request(self))
 
     class Meta:
         model = mpmodels.Playlist
@@ -173,7 +258,7 @@ class PlaylistSerializer(ChannelOwnedResourceModelSerializer):
         }
 
 
-class MediaItemSerializer(ChannelOwnedResourceModelSerializer):
+class MediaItemSerializer(CachedFieldsMixin, ChannelOwnedResourceModelSerializer):
     """
     An individual media item.
 
@@ -201,6 +286,11 @@ class MediaItemSerializer(ChannelOwnedResourceModelSerializer):
     posterImageUrl = serializers.SerializerMethodField(
         help_text='A URL of a thumbnail/poster image for the media', read_only=True)
 
+    # Declared explicitly so that DRF does not build a ChoiceField from the model's choices.
+    language = serializers.CharField(
+        max_length=3, allow_blank=True, required=False, validators=[validate_language_code],
+        help_text=mpmodels.MediaItem._meta.get_field('language').help_text)
+
     downloadableByUser = serializers.BooleanField(
         source='downloadable_by_user',
         help_text=(
@@ -229,18 +319,12 @@ class MediaItemSerializer(ChannelOwnedResourceModelSerializer):
         return obj
 
     def get_posterImageUrl(self, obj):
-        return self._build_absolute_uri(reverse(
-            'api:media_poster',
-            kwargs={'pk': obj.id, 'width': 720, 'extension': 'jpg'}
-        ))
+        return urltemplates.reverse(
+            'api:media_poster', kwargs={'pk': obj.id, 'width': 720, 'extension': 'jpg'},
+            request=_context_request(self))
 
-    def _build_absolute_uri(self, uri):
-        if 'request' in self.context:
-            return self.context['request'].build_absolute_uri(uri)
-        return uri
 
-
-class BillingAccountSerializer(serializers.HyperlinkedModelSerializer):
+class BillingAccountSerializer(HyperlinkedModelSerializer):
     """
     An individual billing account.
 
@@ -263,6 +347,149 @@ class BillingAccountSerializer(serializers.HyperlinkedModelSerializer):
         }
 
 
+class SearchResultSerializer(serializers.Serializer):
+    """
+    A resource matching a search.
+
+    """
+    #: Map from resource type to the name of the view for the resource.
+    VIEW_NAMES = {
+        search.MEDIA_ITEM: 'api:media_item',
+        search.CHANNEL: 'api:channel',
+        search.PLAYLIST: 'api:playlist',
+    }
+
+    type = serializers.ChoiceField(
+        source='resource_type', choices=search.RESOURCE_TYPES, help_text='Type of resource')
+    id = serializers.CharField(help_text='Unique id of resource')
+    url = serializers.SerializerMethodField(help_text='URL of resource')
+    title = serializers.CharField()
+    description = serializers.CharField()
+    updatedAt = serializers.DateTimeField(source='updated_at')
+    rank = serializers.FloatField(help_text='Relevance of resource to the search')
+
+    def get_url(self, result):
+        return urltemplates.reverse(
+            self.VIEW_NAMES[result['resource_type']], kwargs={'pk': result['id']},
+            request=_context_request(self))
+
+
+class SuggestionSerializer(serializers.Serializer):
+    """
+    A suggested completion for text typed by a user.
+
+    """
+    type = serializers.ChoiceField(
+        source='suggestion_type', choices=suggestions.SUGGESTION_TYPES,
+        help_text='Type of suggestion')
+    id = serializers.CharField(
+        source='suggestion_id', allow_null=True,
+        help_text='Unique id of suggested resource or null if the suggestion is a tag')
+    text = serializers.CharField(help_text='Suggested text')
+    url = serializers.SerializerMethodField(
+        help_text='URL of suggested resource or of the media items with the suggested tag')
+
+    def get_url(self, suggestion):
+        if suggestion['suggestion_type'] == suggestions.TAG:
+            return urltemplates.reverse(
+                'api:media_list', query={'tag': suggestion['text']},
+                request=_context_request(self))
+        return urltemplates.reverse(
+            SearchResultSerializer.VIEW_NAMES[suggestion['suggestion_type']],
+            kwargs={'pk': suggestion['suggestion_id']}, request=_context_request(self))
+
+
+class TagSerializer(serializers.ModelSerializer):
+    """
+    A tag applied to media items and the number of items with that tag.
+
+    """
+    class Meta:
+        model = mpmodels.Tag
+        fields = ('name', 'itemCount', 'url')
+
+        extra_kwargs = {
+            'itemCount': {'source': 'item_count'},
+        }
+
+    url = serializers.SerializerMethodField(help_text='URL of the media items with this tag')
+
+    def get_url(self, tag):
+        return urltemplates.reverse(
+            'api:media_list', query={'tag': tag.name}, request=_context_request(self))
+
+
+# Bulk update serializers
+#
+# The following serializers validate the body of a bulk update request. They are not used to
+# render resources.
+
+
+class PermissionSerializer(serializers.ModelSerializer):
+    """
+    The users and groups granted a permission.
+
+    """
+    class Meta:
+        model = mpmodels.Permission
+        fields = ('crsids', 'lookupGroups', 'lookupInsts', 'isPublic', 'isSignedIn')
+
+        extra_kwargs = {
+            'lookupGroups': {'source': 'lookup_groups'},
+            'lookupInsts': {'source': 'lookup_insts'},
+            'isPublic': {'source': 'is_public'},
+            'isSignedIn': {'source': 'is_signed_in'},
+        }
+
+
+class MediaItemBulkUpdateItemSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    """
+    Changes to a single media item within a bulk update. Only the fields which are present are
+    changed.
+
+    """
+    class Meta:
+        model = mpmodels.MediaItem
+        fields = (
+            'id', 'title', 'description', 'publishedAt', 'downloadable', 'language', 'copyright',
+            'tags', 'viewPermission',
+        )
+
+        extra_kwargs = {
+            'publishedAt': {'source': 'published_at'},
+            'title': {'allow_blank': False},
+        }
+
+    id = serializers.CharField(help_text='Unique id of the media item to update')
+
+    language = serializers.CharField(
+        max_length=3, allow_blank=True, required=False, validators=[validate_language_code],
+        help_text=mpmodels.MediaItem._meta.get_field('language').help_text)
+
+    viewPermission = PermissionSerializer(
+        source='view_permission', required=False,
+        help_text='Changes to the permission determining who can view the item')
+
+
+class MediaItemBulkUpdateSerializer(serializers.Serializer):
+    """
+    A bulk update of media items.
+
+    """
+    #: Maximum number of items which may be updated in a single request.
+    MAX_ITEMS = 300
+
+    items = MediaItemBulkUpdateItemSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        if len(items) > self.MAX_ITEMS:
+            raise serializers.ValidationError(
+                f'At most {self.MAX_ITEMS} items may be updated at once.')
+        if len({item['id'] for item in items}) != len(items):
+            raise serializers.ValidationError('Each item may only appear once.')
+        return items
+
+
 # Detail serialisers
 #
 # The following serialiser are to be used in individual resource views and include more information
@@ -280,16 +507,14 @@ class SourceSerializer(serializers.Serializer):
     height = serializers.IntegerField(help_text='The video height', required=False)
 
     def get_url(self, source):
-        query = QueryDict(mutable=True)
-        query['mimeType'] = source.mime_type
+        query = [('mimeType', source.mime_type)]
         if source.width is not None:
-            query['width'] = f'{source.width}'
+            query.append(('width', f'{source.width}'))
         if source.height is not None:
-            query['height'] = f'{source.height}'
-        url = reverse('api:media_source', kwargs={'pk': source.item.id}) + '?' + query.urlencode()
-        if 'request' in self.context:
-            url = self.context['request'].build_absolute_uri(url)
-        return url
+            query.append(('height', f'{source.height}'))
+        return urltemplates.reverse(
+            'api:media_source', kwargs={'pk': source.item.id}, query=query,
+            request=_context_request(self))
 
 
 class MediaUploadSerializer(serializers.Serializer):
@@ -335,25 +560,36 @@ class MediaItemDetailSerializer(MediaItemSerializer):
     def get_bestSourceUrl(self, obj):
         if not obj.downloadable_by_user or len(obj.sources) == 0:
             return None
-        url = reverse('api:media_source', kwargs={'pk': obj.id})
-        if 'request' in self.context:
-            url = self.context['request'].build_absolute_uri(url)
-        return url
+        return urltemplates.reverse(
+            'api:media_source', kwargs={'pk': obj.id}, request=_context_request(self))
 
     def get_sources(self, obj):
         sources = obj.sources if obj.downloadable_by_user else []
         return SourceSerializer(sources, many=True, context=self.context).data
 
 
+class MediaItemTrendingSerializer(MediaItemSerializer):
+    """
+    A media item with the number of times it was viewed over a window of days.
+
+    """
+    class Meta(MediaItemSerializer.Meta):
+        fields = MediaItemSerializer.Meta.fields + ('views',)
+
+    views = serializers.IntegerField(
+        help_text='The number of media views in the window', read_only=True)
+
+
 class MediaItemAnalyticsSerializer(serializers.Serializer):
     """
-    The number of viewing for a particular media item on a particular day.
+    The number of viewing for a particular media item in a particular period.
 
     """
     date = serializers.DateField(
-        source='day', help_text='The day when a media was viewed', read_only=True)
+        source='day', help_text='The first day of the period when a media was viewed',
+        read_only=True)
     views = serializers.IntegerField(
-        source='num_hits', help_text='The number of media views on a day', read_only=True)
+        source='num_hits', help_text='The number of media views in the period', read_only=True)
 
 
 class MediaItemAnalyticsListSerializer(serializers.Serializer):
@@ -361,9 +597,24 @@ class MediaItemAnalyticsListSerializer(serializers.Serializer):
     A list of media analytics data points.
 
     """
-    views_per_day = MediaItemAnalyticsSerializer(source='fetched_analytics', many=True)
+    granularity = serializers.CharField(
+        help_text='The length of the period of each data point', read_only=True)
 
-    size = serializers.IntegerField(source='fetched_size')
+    views_per_day = MediaItemAnalyticsSerializer(
+        source='views', many=True,
+        help_text='Views in each period in order of increasing date. Despite the name, the '
+                  'periods are only days if the granularity is "day".')
+
+    size = serializers.IntegerField()
+
+
+class AggregateAnalyticsSerializer(MediaItemAnalyticsListSerializer):
+    """
+    Media analytics data points summed over many media items.
+
+    """
+    total_views = serializers.IntegerField(
+        help_text='The total number of views in all periods', read_only=True)
 
 
 class ChannelDetailSerializer(ChannelSerializer):
@@ -384,16 +635,9 @@ class ChannelDetailSerializer(ChannelSerializer):
     )
 
     def get_mediaUrl(self, obj):
-        # Get location of media list endpoint
-        location = reverse('api:media_list')
-
-        # Add query parameter
-        location += '?' + urlencode({'channel': obj.id})
-
-        if self.context is None or 'request' not in self.context:
-            return location
-
-        return self.context['request'].build_absolute_uri(location)
+        # Location of media list endpoint filtered by this channel
+        return urltemplates.reverse(
+            'api:media_list', query={'channel': obj.id}, request=_context_request(self))
 
 
 class PlaylistDetailSerializer(PlaylistSerializer):
@@ -446,3 +690,13 @@ class BillingAccountDetailSerializer(BillingAccountSerializer):
         read_only_fields = BillingAccountSerializer.Meta.read_only_fields + ('channels',)
 
     channels = ChannelSerializer(many=True)
+
+
+def _context_request(serializer):
+    """
+    Return the request from a serializer's context or None if there is no request.
+
+    """
+    if serializer.context is None:
+        return None
+    return serializer.context.get('request')
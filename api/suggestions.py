@@ -0,0 +1,108 @@
+"""
+Typeahead suggestions.
+
+Full-text search only matches whole lexemes and so is unsuitable for suggesting completions as a
+user types. :py:func:`~.suggest` instead matches the titles of media items, channels and playlists
+and the names of tags using the trigram indexes created by the pg_trgm extension. A suggestion
+matches if any word in it starts with the typed text or if some part of it is similar to the typed
+text, which allows for typos.
+
+All types of suggestion are fetched with a single ``UNION ALL`` query. Each branch is limited to
+the number of suggestions requested so that no branch reads more rows than necessary.
+
+"""
+import re
+
+from django.db import models
+
+import mediaplatform.models as mpmodels
+
+from . import search
+
+#: Resource type for tags.
+TAG = 'tag'
+
+#: Types of suggestion.
+SUGGESTION_TYPES = search.RESOURCE_TYPES + (TAG,)
+
+#: Minimum length of text for which suggestions are made. Trigram indexes cannot narrow down
+#: matches for shorter text.
+MIN_LENGTH = 3
+
+#: Maximum length of text for which suggestions are made.
+MAX_LENGTH = 100
+
+#: Fields included in each suggestion.
+SUGGESTION_FIELDS = ('suggestion_type', 'suggestion_id', 'text', 'score')
+
+
+def suggest(querysets, text, limit):
+    """
+    Return suggestions for *text*.
+
+    :param querysets: a dict mapping resource types to querysets of resources of that type. Each
+        queryset should already be filtered to those resources the user may view. Tags are
+        suggested from the tags of the media items in the :py:data:`api.search.MEDIA_ITEM`
+        queryset.
+    :param text: the text typed by the user
+    :param limit: the maximum number of suggestions to return
+
+    Returns a list of at most *limit* dicts with the keys listed in
+    :py:data:`~.SUGGESTION_FIELDS` in order of decreasing score. The id is ``None`` for tags.
+
+    """
+    text = ' '.join(text.split())
+    if len(text) < MIN_LENGTH:
+        return []
+
+    branches = [
+        _matching_queryset(resource_type, queryset, 'id', 'title', text, limit)
+        for resource_type, queryset in querysets.items()
+    ]
+
+    # Tags are only suggested if they are applied to a media item which the user may view so
+    # that suggestions do not reveal the tags of private items. This is checked for each tag
+    # matched by the trigram index rather than by listing the tags of every viewable item.
+    branches.append(_matching_queryset(
+        TAG,
+        mpmodels.Tag.objects.filter(item_count__gt=0).applied_to_any(querysets[search.MEDIA_ITEM]),
+        None, 'name', text, limit))
+
+    combined = branches[0].union(*branches[1:], all=True)
+    return list(combined.order_by('-score', 'text')[:limit])
+
+
+def _matching_queryset(suggestion_type, queryset, id_field, text_field, text, limit):
+    """
+    Return a values queryset for one branch of the suggestions query which selects
+    :py:data:`~.SUGGESTION_FIELDS` for at most *limit* objects in *queryset* whose *text_field*
+    matches *text*.
+
+    """
+    # A PostgreSQL regular expression which matches text at the start of a word. Python's escaping
+    # is compatible with PostgreSQL's advanced regular expressions.
+    word_prefix_regex = r'\m' + re.escape(text)
+
+    queryset = queryset.filter(
+        models.Q(**{f'{text_field}__iregex': word_prefix_regex}) |
+        models.Q(**{f'{text_field}__trigram_word_similar': text})
+    )
+
+    # All annotations are added in the same order for each branch so that the columns of the
+    # branches line up.
+    return (
+        queryset
+        .annotate(
+            suggestion_type=models.Value(suggestion_type, output_field=models.CharField()),
+            suggestion_id=(
+                models.F(id_field) if id_field is not None
+                else models.Value(None, output_field=models.CharField())
+            ),
+            text=models.F(text_field),
+            score=models.Func(
+                models.Value(text), models.F(text_field), function='word_similarity',
+                output_field=models.FloatField()),
+        )
+        .order_by('-score', 'text')
+        .values(*SUGGESTION_FIELDS)[:limit]
+    )
@@ -0,0 +1,81 @@
+import datetime
+import decimal
+import json
+import unittest
+
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import renderers as drfrenderers
+
+from .. import renderers
+from .. import views
+from .test_views import ViewTestCase
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+class JSONRendererTestCase(unittest.TestCase):
+    DATA = {
+        'when': datetime.datetime(2018, 1, 2, 3, 4, 5, 678000, tzinfo=datetime.timezone.utc),
+        'day': datetime.date(2018, 1, 2),
+        'amount': decimal.Decimal('1.25'),
+        'text': 'line separator \u2028 and \N{EN DASH}',
+        'nested': [{'a': 1, 'b': None, 'c': True}],
+        1: 'non-string key',
+    }
+
+    def test_matches_drf(self):
+        """Output is identical to DRF's JSON renderer."""
+        self.assertEqual(
+            renderers.JSONRenderer().render(self.DATA),
+            drfrenderers.JSONRenderer().render(self.DATA))
+
+    def test_none(self):
+        """Rendering None gives an empty body."""
+        self.assertEqual(renderers.JSONRenderer().render(None), b'')
+
+    def test_indent(self):
+        """Indented output is supported."""
+        rendered = renderers.JSONRenderer().render(
+            {'a': 1}, 'application/json; indent=4', {})
+        self.assertEqual(json.loads(rendered), {'a': 1})
+        self.assertIn(b'\n    ', rendered)
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class MessagePackRendererTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        """Rendered data can be unpacked and values are encoded as the JSON renderer would."""
+        data = {
+            'when': datetime.datetime(2018, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            'items': [1, 'two', None],
+        }
+        self.assertEqual(
+            msgpack.unpackb(renderers.MessagePackRenderer().render(data), raw=False),
+            json.loads(renderers.JSONRenderer().render(data)))
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class ContentNegotiationTestCase(ViewTestCase):
+    def test_msgpack_list(self):
+        """The media list can be requested as MessagePack."""
+        request = self.factory.get('/', HTTP_ACCEPT='application/msgpack')
+        response = views.MediaItemListView().as_view()(request)
+        response.render()
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(
+            set(item['id'] for item in data['results']),
+            set(item.id for item in self.viewable_by_anon))
+
+    def test_json_is_default(self):
+        """JSON is rendered if no particular media type is requested."""
+        response = views.MediaItemListView().as_view()(self.get_request)
+        response.render()
+        self.assertTrue(response['Content-Type'].startswith('application/json'))
+        self.assertEqual(
+            set(item['id'] for item in json.loads(response.content)['results']),
+            set(item.id for item in
+                self.non_deleted_media.viewable_by_user(AnonymousUser())))
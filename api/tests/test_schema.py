@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import schema
+
+
+class SchemaTestCase(TestCase):
+    def setUp(self):
+        self.schema_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.schema_dir.cleanup)
+
+        overrides = override_settings(
+            API_SCHEMA_DIR=self.schema_dir.name, API_SCHEMA_CODE_VERSION='test-version')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        schema.code_version.cache_clear()
+        self.addCleanup(schema.code_version.cache_clear)
+        schema._ARTIFACTS.clear()
+        self.addCleanup(schema._ARTIFACTS.clear)
+
+    def test_schema_served(self):
+        """The schema is served as JSON with an ETag."""
+        r = self.client.get(reverse('schema-json', kwargs={'format': '.json'}))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['Content-Type'], 'application/json')
+        self.assertIn('ETag', r)
+        document = json.loads(r.content)
+        self.assertEqual(document['basePath'], '/api')
+        self.assertIn('/media/', document['paths'])
+
+    def test_yaml(self):
+        """The schema is available as YAML."""
+        r = self.client.get(reverse('schema-json', kwargs={'format': '.yaml'}))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['Content-Type'], 'application/yaml')
+
+    def test_conditional_get(self):
+        """A request with a matching If-None-Match header gets a 304 response."""
+        url = reverse('schema-json', kwargs={'format': '.json'})
+        etag = self.client.get(url)['ETag']
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 304)
+
+    def test_artifact_written(self):
+        """Generating the schema on first use writes an artifact for the code version."""
+        self.client.get(reverse('schema-json', kwargs={'format': '.json'}))
+        path = os.path.join(self.schema_dir.name, 'test-version', 'swagger.json')
+        self.assertTrue(os.path.isfile(path))
+
+    def test_generated_once(self):
+        """The schema is only generated once per code version."""
+        url = reverse('schema-json', kwargs={'format': '.json'})
+        with mock.patch('api.schema.generate', wraps=schema.generate) as generate:
+            self.client.get(url)
+            self.client.get(url)
+            schema._ARTIFACTS.clear()
+            self.client.get(url)
+        self.assertEqual(generate.call_count, 1)
+
+    def test_existing_artifact_used(self):
+        """An existing artifact is served without generating the schema."""
+        path = schema.artifact_path('json')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as fobj:
+            fobj.write(b'{"swagger": "2.0"}')
+
+        with mock.patch('api.schema.generate') as generate:
+            r = self.client.get(reverse('schema-json', kwargs={'format': '.json'}))
+        generate.assert_not_called()
+        self.assertEqual(json.loads(r.content), {'swagger': '2.0'})
+
+    def test_version_change_regenerates(self):
+        """A new code version results in a new artifact."""
+        schema.write_artifacts()
+        with override_settings(API_SCHEMA_CODE_VERSION='other-version'):
+            schema.code_version.cache_clear()
+            self.assertEqual(len(schema.write_artifacts()), len(schema.FORMATS))
+        self.assertTrue(os.path.isfile(schema.artifact_path('json', version='other-version')))
+
+    def test_write_artifacts_skips_existing(self):
+        """Artifacts which exist for the current version are not regenerated unless forced."""
+        self.assertEqual(len(schema.write_artifacts()), len(schema.FORMATS))
+        self.assertEqual(schema.write_artifacts(), [])
+        self.assertEqual(len(schema.write_artifacts(force=True)), len(schema.FORMATS))
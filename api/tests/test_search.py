@@ -0,0 +1,19 @@
+import decimal
+import unittest
+
+from .. import search
+
+
+class PositionTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        """An encoded position decodes to an identical position."""
+        position = search.Position(
+            rank=decimal.Decimal('0.06079271'), resource_type=search.CHANNEL, id='abc')
+        self.assertEqual(search.Position.decode(position.encode()), position)
+
+    def test_invalid(self):
+        """Invalid positions raise ValueError."""
+        for encoded in ['', 'not base64!', search.Position(
+                rank=decimal.Decimal(1), resource_type='other', id='abc').encode()]:
+            with self.assertRaises(ValueError):
+                search.Position.decode(encoded)
@@ -3,6 +3,7 @@ from unittest import mock
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.test import TestCase
+from rest_framework import serializers as drfserializers
 from rest_framework.test import APIRequestFactory
 
 import mediaplatform.models as mpmodels
@@ -24,6 +25,33 @@ class MediaItemSerializerTestCase(TestCase):
         f.assert_called()
 
 
+class MediaItemSerializerFieldsTestCase(TestCase):
+    def test_fields_built_once_per_class(self):
+        """Model introspection happens only once for multiple serializer instances."""
+        serializers.MediaItemDetailSerializer._cached_prototype_fields = None
+        get_fields = drfserializers.ModelSerializer.get_fields
+        with mock.patch.object(
+                drfserializers.ModelSerializer, 'get_fields', autospec=True,
+                side_effect=get_fields) as f:
+            serializers.MediaItemDetailSerializer().fields
+            serializers.MediaItemDetailSerializer().fields
+        f.assert_called_once()
+
+    def test_fields_are_not_shared(self):
+        """Each serializer instance has its own bound fields."""
+        s1, s2 = serializers.MediaItemSerializer(), serializers.MediaItemSerializer()
+        self.assertIsNot(s1.fields['title'], s2.fields['title'])
+        self.assertIs(s1.fields['title'].parent, s1)
+        self.assertIs(s2.fields['title'].parent, s2)
+
+    def test_language_validation(self):
+        """Invalid language codes are rejected and valid or blank ones accepted."""
+        for language, is_valid in [('xx1', False), ('eng', True), ('', True)]:
+            serializer = serializers.MediaItemSerializer(
+                data={'language': language}, partial=True)
+            self.assertEqual(serializer.is_valid(), is_valid)
+
+
 class ChannelSerializerTestCase(TestCase):
     def test_create(self):
         with mock.patch('mediaplatform.models.Channel.objects.create') as f:
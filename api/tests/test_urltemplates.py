@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import urlencode
+from rest_framework.test import APIRequestFactory
+
+from .. import urltemplates
+
+
+class ReverseTestCase(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.request = self.factory.get('/')
+
+    def test_matches_django_reverse(self):
+        """Templated URLs match those generated by Django's reverse()."""
+        for viewname, kwargs in [
+                ('api:media_list', {}),
+                ('api:media_item', {'pk': 'abc-_123'}),
+                ('api:media_source', {'pk': 'xyz'}),
+                ('api:media_source_with_ext', {'pk': 'xyz', 'extension': 'mp4'}),
+                ('api:media_poster', {'pk': 'xyz', 'width': 720, 'extension': 'jpg'}),
+                ('api:billing_account', {'pk': 'bacct'}),
+                ('ui:media_item', {'pk': 'xyz'}),
+                ('ui:media_embed', {'pk': 'xyz'}),
+                ('ui:playlist_rss', {'pk': 'xyz'}),
+                ]:
+            self.assertEqual(
+                urltemplates.reverse(viewname, kwargs=kwargs),
+                reverse(viewname, kwargs=kwargs))
+
+    def test_absolute_uri(self):
+        """Passing a request results in an absolute URI."""
+        self.assertEqual(
+            urltemplates.reverse('api:media_item', kwargs={'pk': 'xyz'}, request=self.request),
+            self.request.build_absolute_uri(reverse('api:media_item', kwargs={'pk': 'xyz'})))
+
+    def test_query(self):
+        """A query string is appended if passed."""
+        query = [('mimeType', 'video/mp4'), ('width', '640')]
+        self.assertEqual(
+            urltemplates.reverse('api:media_source', kwargs={'pk': 'xyz'}, query=query),
+            reverse('api:media_source', kwargs={'pk': 'xyz'}) + '?' + urlencode(query))
+
+    def test_values_are_quoted(self):
+        """Values are quoted in the same way as Django's reverse()."""
+        kwargs = {'pk': 'a b%c'}
+        self.assertEqual(
+            urltemplates.reverse('api:media_item', kwargs=kwargs),
+            reverse('api:media_item', kwargs=kwargs))
+
+    def test_prefix_cached_on_request(self):
+        """The absolute URI prefix is only computed once per request."""
+        build_absolute_uri = mock.Mock(wraps=self.request.build_absolute_uri)
+        self.request.build_absolute_uri = build_absolute_uri
+
+        first = urltemplates.reverse('api:media_item', kwargs={'pk': 'xyz'}, request=self.request)
+        second = urltemplates.reverse('api:media_item', kwargs={'pk': 'abc'}, request=self.request)
+
+        build_absolute_uri.assert_called_once_with('/')
+        self.assertEqual(
+            first, 'http://testserver' + reverse('api:media_item', kwargs={'pk': 'xyz'}))
+        self.assertEqual(
+            second, 'http://testserver' + reverse('api:media_item', kwargs={'pk': 'abc'}))
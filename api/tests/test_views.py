@@ -3,15 +3,21 @@ from unittest import mock
 
 from dateutil import parser as dateparser
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.models import AnonymousUser, Permission
+from django.core.cache import cache
 from django.http import QueryDict
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from jwplatform.errors import JWPlatformInternalError, JWPlatformRateLimitExceededError
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIRequestFactory, force_authenticate
 
+from legacysms import analytics as legacyanalytics
+import legacysms.models as legacymodels
 import mediaplatform_jwp.api.delivery as api
 import mediaplatform.models as mpmodels
+from mediaplatform import searchbackends
 
 from . import create_stats_table, delete_stats_table, add_stat
 from .. import views
@@ -271,6 +277,26 @@ class MediaItemListViewTestCase(ViewTestCase):
         for item in response_data['results']:
             self.assertIn(item['id'], expected_ids)
 
+    def test_tag_filter(self):
+        """Items can be filtered by tag with any of several tags or with all of them."""
+        items = []
+        for tags in [['xyzzy-a'], ['xyzzy-a', 'xyzzy-b'], ['xyzzy-c']]:
+            item = mpmodels.MediaItem.objects.create(channel=self.channel, tags=tags)
+            item.view_permission.is_public = True
+            item.view_permission.save()
+            items.append(item)
+
+        def filtered_ids(query):
+            response = self.view(self.factory.get('/?' + query))
+            self.assertEqual(response.status_code, 200)
+            return {result['id'] for result in response.data['results']}
+
+        self.assertEqual(filtered_ids('tag=xyzzy-a'), {items[0].id, items[1].id})
+        self.assertEqual(filtered_ids('tag=xyzzy-a,xyzzy-c'), {item.id for item in items})
+        self.assertEqual(filtered_ids('tag=xyzzy-a&tag=xyzzy-b'), {items[1].id})
+        self.assertEqual(filtered_ids('tag=xyzzy-b,xyzzy-c&tag=xyzzy-a'), {items[1].id})
+        self.assertEqual(filtered_ids('tag=xyzzy-d'), set())
+
     def test_search_by_title(self):
         """Items can be searched by title."""
         item = mpmodels.MediaItem.objects.first()
@@ -299,6 +325,22 @@ class MediaItemListViewTestCase(ViewTestCase):
         self.assert_search_result(item, positive_query='Banana', negative_query='Pineapple')
         self.assert_search_result(item, positive_query='Banana', negative_query='Pineapple')
 
+    def test_search_backend(self):
+        """Searches use the configured search backend."""
+        item = mpmodels.MediaItem.objects.first()
+        item.title = 'some bananas'
+        item.view_permission.is_public = True
+        item.view_permission.save()
+        item.save()
+
+        with override_settings(SEARCH_BACKEND={
+                'BACKEND': 'mediaplatform.searchbackends.LocalBackend',
+                'OPTIONS': {'index': 'test-media-items'}}):
+            backend = searchbackends.get_backend()
+            self.addCleanup(backend.delete_index)
+            backend.rebuild()
+            self.assert_search_result(item, positive_query='bananas', negative_query='Pineapple')
+
     def test_search_ordering(self):
         """Items are sorted by relevance from search endpoint."""
         items = mpmodels.MediaItem.objects.all()[:2]
@@ -354,6 +396,178 @@ class MediaItemListViewTestCase(ViewTestCase):
         return response_data['results']
 
 
+class MediaItemFacetsTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.view = views.MediaItemListView().as_view()
+
+    def test_no_facets(self):
+        """Facets are not included unless requested."""
+        response_data = self.view(self.get_request).data
+        self.assertNotIn('facets', response_data)
+
+    def test_counts(self):
+        """Facet counts match the viewable items."""
+        response_data = self.get_facets('channel,type,language,year,tag')
+        self.assertEqual(set(response_data.keys()), {'channel', 'type', 'language', 'year', 'tag'})
+
+        expected_channel_counts = {}
+        expected_tag_counts = {}
+        for item in self.viewable_by_anon:
+            if item.channel_id is not None:
+                expected_channel_counts[item.channel_id] = (
+                    expected_channel_counts.get(item.channel_id, 0) + 1)
+            for tag in set(item.tags):
+                expected_tag_counts[tag] = expected_tag_counts.get(tag, 0) + 1
+
+        self.assertEqual(
+            {value['value']: value['count'] for value in response_data['channel']},
+            expected_channel_counts)
+        self.assertEqual(
+            {value['value']: value['count'] for value in response_data['tag']},
+            expected_tag_counts)
+        self.assertEqual(
+            sum(value['count'] for value in response_data['type']),
+            self.viewable_by_anon.count())
+
+    def test_ordering_and_limit(self):
+        """Only the most common values of a facet are returned, most common first."""
+        channel = self.channels.get(id='channel1')
+        for tags in [['a', 'b', 'c'], ['a', 'b'], ['a']]:
+            item = mpmodels.MediaItem.objects.create(channel=channel, tags=tags)
+            item.view_permission.is_public = True
+            item.view_permission.save()
+
+        request = self.factory.get('/', {'facets': 'tag', 'facet_limit': 2})
+        tag_counts = self.view(request).data['facets']['tag']
+        self.assertEqual(tag_counts, [{'value': 'a', 'count': 3}, {'value': 'b', 'count': 2}])
+
+    def test_year(self):
+        """Years are integers."""
+        years = {
+            item.published_at.year for item in self.viewable_by_anon
+            if item.published_at is not None
+        }
+        self.assertNotEqual(years, set())
+        self.assertEqual({value['value'] for value in self.get_facets('year')['year']}, years)
+
+    def test_search_filtered(self):
+        """Facets are counted over the items matching the search."""
+        item = self.viewable_by_anon.first()
+        item.title = 'xyzzy'
+        item.save()
+        request = self.factory.get('/', {'facets': 'channel', 'search': 'xyzzy'})
+        self.assertEqual(
+            self.view(request).data['facets']['channel'],
+            [{'value': item.channel_id, 'count': 1}])
+
+    def test_unknown_facet(self):
+        """An unknown facet is a bad request."""
+        response = self.view(self.factory.get('/', {'facets': 'channel,colour'}))
+        self.assertEqual(response.status_code, 400)
+
+    def test_anonymous_cached(self):
+        """Facet counts for anonymous users are cached."""
+        with mock.patch('api.facets.facet_counts', return_value={}) as facet_counts:
+            self.get_facets('channel')
+            self.get_facets('channel')
+        self.assertEqual(facet_counts.call_count, 1)
+
+    def test_authenticated_not_cached(self):
+        """Facet counts for authenticated users are not cached."""
+        with mock.patch('api.facets.facet_counts', return_value={}) as facet_counts:
+            for _ in range(2):
+                request = self.factory.get('/', {'facets': 'channel'})
+                force_authenticate(request, user=self.user)
+                self.view(request)
+        self.assertEqual(facet_counts.call_count, 2)
+
+    def get_facets(self, names):
+        response = self.view(self.factory.get('/', {'facets': names}))
+        self.assertEqual(response.status_code, 200)
+        return response.data['facets']
+
+
+class SearchSnapshotPaginationTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.view = views.MediaItemListView().as_view()
+        channel = self.channels.get(id='channel1')
+        self.items = []
+        for title in ['xyzzy xyzzy xyzzy', 'xyzzy xyzzy', 'xyzzy']:
+            item = mpmodels.MediaItem.objects.create(channel=channel, title=title)
+            item.view_permission.is_public = True
+            item.view_permission.save()
+            self.items.append(item)
+
+    def test_pagination(self):
+        """Following the next link returns the results in order of relevance."""
+        self.assertEqual(self.get_all_ids(), [item.id for item in self.items])
+
+    def test_stable_pages(self):
+        """Later pages come from the snapshot taken when the first page was fetched."""
+        response_data = self.view(self.factory.get('/', {'search': 'xyzzy', 'page_size': 1})).data
+        self.assertEqual(response_data['results'][0]['id'], self.items[0].id)
+
+        # Make the last item the most relevant. The remaining pages do not change.
+        self.items[2].description = 'xyzzy xyzzy xyzzy xyzzy xyzzy'
+        self.items[2].save()
+
+        query = QueryDict(response_data['next'].split('?', 1)[1])
+        response_data = self.view(self.factory.get('/', query)).data
+        self.assertEqual(response_data['results'][0]['id'], self.items[1].id)
+
+        # A new search reflects the change.
+        self.assertEqual(self.get_all_ids()[0], self.items[2].id)
+
+    def test_previous_link(self):
+        """The previous link of the second page is the first page."""
+        response_data = self.view(self.factory.get('/', {'search': 'xyzzy', 'page_size': 1})).data
+        self.assertIsNone(response_data['previous'])
+        query = QueryDict(response_data['next'].split('?', 1)[1])
+        response_data = self.view(self.factory.get('/', query)).data
+        self.assertNotIn('cursor=', response_data['previous'])
+
+    def test_no_longer_viewable(self):
+        """Items which are no longer viewable are omitted from later pages."""
+        response_data = self.view(self.factory.get('/', {'search': 'xyzzy', 'page_size': 1})).data
+        self.items[1].view_permission.reset()
+        self.items[1].view_permission.save()
+
+        query = QueryDict(response_data['next'].split('?', 1)[1])
+        response_data = self.view(self.factory.get('/', query)).data
+        self.assertEqual(response_data['results'], [])
+        self.assertIsNotNone(response_data['next'])
+
+    def test_per_user_snapshot(self):
+        """Snapshots are not shared between users with different permissions."""
+        self.items[1].view_permission.reset()
+        self.items[1].view_permission.crsids.append(self.user.username)
+        self.items[1].view_permission.save()
+
+        request = self.factory.get('/', {'search': 'xyzzy', 'page_size': 1})
+        force_authenticate(request, user=self.user)
+        self.view(request)
+
+        self.assertEqual(self.get_all_ids(), [self.items[0].id, self.items[2].id])
+
+    def test_invalid_cursor(self):
+        """An invalid cursor results in a 404."""
+        response = self.view(self.factory.get('/', {'search': 'xyzzy', 'cursor': 'not-a-cursor'}))
+        self.assertEqual(response.status_code, 404)
+
+    def get_all_ids(self):
+        ids, query = [], {'search': 'xyzzy', 'page_size': 1}
+        while True:
+            response_data = self.view(self.factory.get('/', query)).data
+            ids.extend(result['id'] for result in response_data['results'])
+            if response_data['next'] is None:
+                return ids
+            query = QueryDict(response_data['next'].split('?', 1)[1])
+
+
 class MediaItemViewTestCase(ViewTestCase):
     def setUp(self):
         super().setUp()
@@ -546,6 +760,107 @@ class MediaItemViewTestCase(ViewTestCase):
             getattr(self.non_deleted_media.get(id='populated'), model_field_name), original_value)
 
 
+class MediaItemBulkUpdateViewTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.view = views.MediaItemBulkUpdateView().as_view()
+
+        # A channel editable by the user containing some editable items.
+        self.channel = mpmodels.Channel.objects.create(
+            title='editable channel', billing_account=self.channels[0].billing_account)
+        self.channel.edit_permission.crsids.append(self.user.username)
+        self.channel.edit_permission.save()
+        self.items = [
+            mpmodels.MediaItem.objects.create(channel=self.channel, title=f'item {index}')
+            for index in range(3)
+        ]
+
+        # Run on_commit callbacks immediately since test cases never commit.
+        self.on_commit_patcher = mock.patch(
+            'django.db.transaction.on_commit', side_effect=lambda f: f())
+        self.on_commit_patcher.start()
+        self.addCleanup(self.on_commit_patcher.stop)
+
+    def test_update(self):
+        """Fields and view permissions of all items are updated."""
+        response = self.patch([
+            {'id': item.id, 'title': f'new title {index}', 'tags': ['a', 'b'],
+             'viewPermission': {'crsids': ['spqr1'], 'isPublic': True}}
+            for index, item in enumerate(self.items)
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item['id'] for item in response.data['items']}, {item.id for item in self.items})
+
+        for index, item in enumerate(self.items):
+            new_item = mpmodels.MediaItem.objects.get(id=item.id)
+            self.assertEqual(new_item.title, f'new title {index}')
+            self.assertEqual(new_item.tags, ['a', 'b'])
+            self.assertEqual(new_item.description, item.description)
+            self.assertGreater(new_item.updated_at, item.updated_at)
+            self.assertEqual(new_item.view_permission.crsids, ['spqr1'])
+            self.assertTrue(new_item.view_permission.is_public)
+
+    def test_single_sync(self):
+        """A single signal covering all of the items is sent."""
+        with mock.patch('mediaplatform.signals.media_items_bulk_updated.send') as send:
+            self.patch([{'id': item.id, 'title': 'x'} for item in self.items])
+        send.assert_called_once()
+        self.assertEqual(
+            set(send.call_args[1]['item_ids']), {item.id for item in self.items})
+
+    def test_anonymous(self):
+        """An anonymous user cannot bulk update."""
+        response = self.patch([{'id': self.items[0].id, 'title': 'x'}], authenticate=False)
+        self.assertEqual(response.status_code, 403)
+
+    def test_not_editable(self):
+        """If any item is not editable, no item is updated."""
+        not_editable = self.non_deleted_media.get(id='populated')
+        response = self.patch([
+            {'id': self.items[0].id, 'title': 'x'},
+            {'id': not_editable.id, 'title': 'x'},
+        ])
+        self.assertIn(response.status_code, (403, 404))
+        self.assertEqual(
+            mpmodels.MediaItem.objects.get(id=self.items[0].id).title, self.items[0].title)
+        self.assertNotEqual(mpmodels.MediaItem.objects.get(id=not_editable.id).title, 'x')
+
+    def test_missing_item(self):
+        """A missing item results in a 404 and no item is updated."""
+        response = self.patch([
+            {'id': self.items[0].id, 'title': 'x'},
+            {'id': 'this-media-id-does-not-exist', 'title': 'x'},
+        ])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(
+            mpmodels.MediaItem.objects.get(id=self.items[0].id).title, self.items[0].title)
+
+    def test_invalid(self):
+        """Invalid changes are rejected."""
+        for items in [
+                [],
+                [{'id': self.items[0].id, 'language': 'not-a-language'}],
+                [{'id': self.items[0].id, 'title': ''}],
+                [{'id': self.items[0].id}, {'id': self.items[0].id}],
+                [{'title': 'no id'}]]:
+            response = self.patch(items)
+            self.assertEqual(response.status_code, 400, items)
+
+    def test_channel_immutable(self):
+        """The channel of an item cannot be changed by a bulk update."""
+        response = self.patch([{'id': self.items[0].id, 'channelId': 'channel2'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            mpmodels.MediaItem.objects.get(id=self.items[0].id).channel_id, self.channel.id)
+
+    def patch(self, items, authenticate=True):
+        request = self.factory.patch('/', {'items': items}, format='json')
+        if authenticate:
+            force_authenticate(request, user=self.user)
+        return self.view(request)
+
+
 class MediaItemSourceViewTestCase(ViewTestCase):
     def setUp(self):
         super().setUp()
@@ -788,6 +1103,60 @@ class UploadEndpointTestCase(ViewTestCase):
         self.item.channel.edit_permission.save()
 
 
+class MediaItemRefreshViewTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = mpmodels.MediaItem.objects.get(id='populated')
+        self.item.view_permission.reset()
+        self.item.view_permission.crsids.append(self.user.username)
+        self.item.view_permission.save()
+        self.item.channel.edit_permission.reset()
+        self.item.channel.edit_permission.save()
+
+        synchronise_patcher = mock.patch('mediaplatform_jwp.tasks.synchronise_resource')
+        self.synchronise_resource = synchronise_patcher.start()
+        self.addCleanup(synchronise_patcher.stop)
+
+    def test_needs_edit_permission(self):
+        """If user has view but not edit permission, refreshing is forbidden."""
+        self.client.force_login(self.user)
+        response = self.post_for_item()
+        self.assertEqual(response.status_code, 403)
+        self.synchronise_resource.assert_not_called()
+
+    def test_refresh(self):
+        """POST-ing to the endpoint synchronises the item's JWP video and returns the item."""
+        self.item.channel.edit_permission.crsids.append(self.user.username)
+        self.item.channel.edit_permission.save()
+        self.client.force_login(self.user)
+        response = self.post_for_item()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.item.id)
+        self.synchronise_resource.assert_called_once_with(
+            'video', self.item.jwp.key, retry=False)
+
+    def test_rate_limited(self):
+        """If the JWP rate limit has been exceeded, the refresh fails with a 503."""
+        self.synchronise_resource.side_effect = JWPlatformRateLimitExceededError()
+        self.assertEqual(self.post_for_editor().status_code, 503)
+        self.synchronise_resource.assert_called_once()
+
+    def test_jwp_error(self):
+        """If JWP returns an error, the refresh fails with a 502."""
+        self.synchronise_resource.side_effect = JWPlatformInternalError()
+        self.assertEqual(self.post_for_editor().status_code, 502)
+
+    def post_for_editor(self):
+        self.item.channel.edit_permission.crsids.append(self.user.username)
+        self.item.channel.edit_permission.save()
+        self.client.force_login(self.user)
+        return self.post_for_item()
+
+    def post_for_item(self, **kwargs):
+        return self.client.post(
+            reverse('api:media_refresh', kwargs={'pk': self.item.pk}), **kwargs)
+
+
 class MediaItemAnalyticsViewCase(ViewTestCase):
     def setUp(self):
         super().setUp()
@@ -803,6 +1172,7 @@ class MediaItemAnalyticsViewCase(ViewTestCase):
         media_id = item.sms.id
         add_stat(day=datetime.date(2018, 5, 17), num_hits=3, media_id=media_id)
         add_stat(day=datetime.date(2018, 3, 22), num_hits=4, media_id=media_id)
+        legacyanalytics.update_view_rollups(datetime.date(2018, 6, 1))
 
         # test
         response = views.MediaItemAnalyticsView().as_view()(self.get_request, pk=item.id)
@@ -811,13 +1181,39 @@ class MediaItemAnalyticsViewCase(ViewTestCase):
 
         views_per_day = response.data['views_per_day']
 
-        self.assertEqual(views_per_day[0]['date'], '2018-05-17')
-        self.assertEqual(views_per_day[0]['views'], 3)
-        self.assertEqual(views_per_day[1]['date'], '2018-03-22')
-        self.assertEqual(views_per_day[1]['views'], 4)
+        self.assertEqual(views_per_day[0]['date'], '2018-03-22')
+        self.assertEqual(views_per_day[0]['views'], 4)
+        self.assertEqual(views_per_day[1]['date'], '2018-05-17')
+        self.assertEqual(views_per_day[1]['views'], 3)
 
         self.assertEqual(response.data['size'], 12345)
 
+    def test_granularity_and_range(self):
+        """Check that views can be counted per period over a range of dates"""
+        item = self.non_deleted_media.get(id='populated')
+        media_id = item.sms.id
+        add_stat(day=datetime.date(2018, 3, 22), num_hits=4, media_id=media_id)
+        add_stat(day=datetime.date(2018, 5, 17), num_hits=3, media_id=media_id)
+        add_stat(day=datetime.date(2018, 5, 31), num_hits=2, media_id=media_id)
+        legacyanalytics.update_view_rollups(datetime.date(2018, 6, 1))
+
+        request = self.factory.get('/', {'granularity': 'month', 'from': '2018-04-10'})
+        response = views.MediaItemAnalyticsView().as_view()(request, pk=item.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['granularity'], 'month')
+        self.assertEqual(
+            [(point['date'], point['views']) for point in response.data['views_per_day']],
+            [('2018-05-01', 5)])
+
+    def test_invalid_parameters(self):
+        """Check that invalid granularities and dates are rejected"""
+        item = self.non_deleted_media.get(id='populated')
+        for params in [{'granularity': 'fortnight'}, {'from': '2018-02-30'}, {'to': 'today'}]:
+            response = views.MediaItemAnalyticsView().as_view()(
+                self.factory.get('/', params), pk=item.id)
+            self.assertEqual(response.status_code, 400)
+
     def test_no_legacy_sms(self):
         """
         Check that no analytics are returned if a media item doesn't have a legacysms.MediaItem
@@ -839,6 +1235,75 @@ class MediaItemAnalyticsViewCase(ViewTestCase):
         self.assertEqual(response.data['size'], 54321)
 
 
+class MediaItemTrendingViewTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.view = views.MediaItemTrendingView().as_view()
+        self.popular, self.less_popular = self.viewable_by_anon.filter(sms__isnull=True)[:2]
+        self.not_visible = self.non_deleted_media.filter(sms__isnull=True).exclude(
+            id__in=self.viewable_by_anon.values('id')).first()
+
+        for sms_id, (item, views_7_days, views_30_days) in enumerate([
+                (self.popular, 10, 20), (self.less_popular, 5, 50), (self.not_visible, 100, 100)],
+                start=9000):
+            legacymodels.MediaItem.objects.create(id=sms_id, item=item)
+            legacymodels.MediaViewTotals.objects.create(
+                media_id=sms_id, views_7_days=views_7_days, views_30_days=views_30_days,
+                views_365_days=views_30_days)
+
+    def test_default_window(self):
+        """Items the user may view are returned in order of decreasing views in the last week."""
+        response = self.view(self.get_request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['window'], 7)
+        self.assertEqual(
+            [(item['id'], item['views']) for item in response.data['results']],
+            [(self.popular.id, 10), (self.less_popular.id, 5)])
+
+    def test_window(self):
+        """The window may be specified."""
+        response = self.view(self.factory.get('/?window=30'))
+        self.assertEqual(
+            [item['id'] for item in response.data['results']],
+            [self.less_popular.id, self.popular.id])
+
+    def test_invalid_window(self):
+        """Unsupported windows are rejected."""
+        for window in ['14', 'week']:
+            response = self.view(self.factory.get('/', {'window': window}))
+            self.assertEqual(response.status_code, 400)
+
+
+class MediaItemRelatedViewTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.view = views.MediaItemRelatedView().as_view()
+        self.item = self.viewable_by_anon.first()
+        self.visible = self.viewable_by_anon.exclude(id=self.item.id).first()
+        self.not_visible = self.non_deleted_media.exclude(
+            id__in=self.viewable_by_anon.values('id')).first()
+        mpmodels.RelatedMediaItems.objects.create(
+            item=self.item, computed_at=timezone.now(),
+            related_ids=[self.not_visible.id, 'does-not-exist', self.visible.id])
+
+    def test_related_items(self):
+        """Only related items which the user may view are returned."""
+        response = self.view(self.get_request, pk=self.item.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.visible.id])
+
+    def test_not_computed(self):
+        """An empty list is returned if related items have not been computed."""
+        response = self.view(self.get_request, pk=self.visible.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_item_not_visible(self):
+        """A 404 is returned if the user may not view the item."""
+        response = self.view(self.get_request, pk=self.not_visible.id)
+        self.assertEqual(response.status_code, 404)
+
+
 class ChannelListViewTestCase(ViewTestCase):
     def setUp(self):
         super().setUp()
@@ -1110,6 +1575,105 @@ class ChannelViewTestCase(ViewTestCase):
             getattr(self.channels.get(id=self.channel.id), model_field_name), original_value)
 
 
+class AggregateAnalyticsTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        create_stats_table()
+        self.addCleanup(delete_stats_table)
+        cache.clear()
+
+        self.channel = mpmodels.Channel.objects.get(id='channel1')
+        self.billing_account = self.channel.billing_account
+
+        item = self.non_deleted_media.get(id='populated')
+        item.jwp.resource.data['size'] = 12345
+        item.jwp.resource.save()
+        other_item = mpmodels.MediaItem.objects.create(channel=self.channel)
+        legacymodels.MediaItem.objects.create(id=9200, item=other_item)
+
+        add_stat(day=datetime.date(2018, 5, 17), num_hits=3, media_id=item.sms.id)
+        add_stat(day=datetime.date(2018, 5, 17), num_hits=5, media_id=9200)
+        add_stat(day=datetime.date(2018, 4, 2), num_hits=4, media_id=9200)
+        legacyanalytics.update_view_rollups(datetime.date(2018, 6, 1))
+
+        self.expected_size = sum(
+            item.fetched_size
+            for item in self.non_deleted_media.filter(channel=self.channel)
+            .select_related('jwp__resource')
+        )
+
+    def test_channel(self):
+        """Views and sizes are summed over the items in a channel."""
+        self.channel.edit_permission.crsids.append(self.user.username)
+        self.channel.edit_permission.save()
+
+        response = self.get_channel_analytics()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(point['date'], point['views']) for point in response.data['views_per_day']],
+            [('2018-04-02', 4), ('2018-05-17', 8)])
+        self.assertEqual(response.data['total_views'], 12)
+        self.assertEqual(response.data['size'], self.expected_size)
+
+    def test_channel_granularity(self):
+        """Channel analytics support the same parameters as media item analytics."""
+        self.channel.edit_permission.crsids.append(self.user.username)
+        self.channel.edit_permission.save()
+
+        response = self.get_channel_analytics({'granularity': 'year', 'to': '2018-12-31'})
+        self.assertEqual(
+            [(point['date'], point['views']) for point in response.data['views_per_day']],
+            [('2018-01-01', 12)])
+
+    def test_channel_requires_edit_permission(self):
+        """Channel analytics are only available to those who can edit the channel."""
+        response = self.get_channel_analytics()
+        self.assertEqual(response.status_code, 403)
+
+    def test_channel_cached(self):
+        """Channel analytics are cached until they are invalidated."""
+        self.channel.edit_permission.crsids.append(self.user.username)
+        self.channel.edit_permission.save()
+
+        self.assertEqual(self.get_channel_analytics().data['total_views'], 12)
+        add_stat(day=datetime.date(2018, 6, 2), num_hits=1, media_id=9200)
+        legacyanalytics.update_view_rollups(datetime.date(2018, 6, 2))
+        self.assertEqual(self.get_channel_analytics().data['total_views'], 12)
+
+        legacyanalytics.invalidate_aggregates()
+        self.assertEqual(self.get_channel_analytics().data['total_views'], 13)
+
+    def test_billing_account(self):
+        """Views are summed over the items in all channels of a billing account."""
+        self.billing_account.channel_create_permission.crsids.append(self.user.username)
+        self.billing_account.channel_create_permission.save()
+
+        response = self.get_billing_account_analytics()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_views'], 12)
+        self.assertEqual(response.data['size'], sum(
+            item.fetched_size
+            for item in self.non_deleted_media.filter(
+                channel__billing_account=self.billing_account)
+            .select_related('jwp__resource')
+        ))
+
+    def test_billing_account_requires_permission(self):
+        """Billing account analytics are only available to those who can create channels."""
+        response = self.get_billing_account_analytics()
+        self.assertEqual(response.status_code, 403)
+
+    def get_channel_analytics(self, params=None):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=self.user)
+        return views.ChannelAnalyticsView().as_view()(request, pk=self.channel.id)
+
+    def get_billing_account_analytics(self, params=None):
+        request = self.factory.get('/', params)
+        force_authenticate(request, user=self.user)
+        return views.BillingAccountAnalyticsView().as_view()(request, pk=self.billing_account.id)
+
+
 class PlaylistListViewTestCase(ViewTestCase):
     def setUp(self):
         super().setUp()
@@ -1518,6 +2082,205 @@ class BillingAccountViewTestCase(ViewTestCase):
     # TODO: test mutable/immutable fields when billing account becomes mutable.
 
 
+class SearchViewTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.view = views.SearchView().as_view()
+        channel = self.channels.get(id='channel1')
+
+        self.public_item = mpmodels.MediaItem.objects.create(
+            channel=channel, title='xyzzy xyzzy item')
+        self.public_item.view_permission.is_public = True
+        self.public_item.view_permission.save()
+
+        self.private_item = mpmodels.MediaItem.objects.create(
+            channel=channel, title='xyzzy private item')
+
+        self.channel = mpmodels.Channel.objects.create(
+            title='xyzzy channel', billing_account=channel.billing_account)
+        self.playlist = mpmodels.Playlist.objects.create(
+            channel=channel, title='xyzzy playlist', description='xyzzy xyzzy xyzzy')
+
+    def test_types(self):
+        """Results include all types of resource which are viewable."""
+        results = self.search('xyzzy')['results']
+        self.assertEqual(
+            {(result['type'], result['id']) for result in results},
+            {
+                ('mediaItem', self.public_item.id),
+                ('channel', self.channel.id),
+                ('playlist', self.playlist.id),
+            })
+        for result in results:
+            self.assertIn(result['id'], result['url'])
+
+    def test_ordering(self):
+        """Results are in order of decreasing rank."""
+        ranks = [result['rank'] for result in self.search('xyzzy')['results']]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_permissions(self):
+        """Only viewable media items are returned."""
+        ids = {result['id'] for result in self.search('private')['results']}
+        self.assertNotIn(self.private_item.id, ids)
+
+    def test_pagination(self):
+        """Following the next link returns the remaining results without duplicates."""
+        all_results = self.search('xyzzy')['results']
+        results, query = [], {'q': 'xyzzy', 'page_size': 1}
+        while True:
+            response_data = self.view(self.factory.get('/', query)).data
+            results.extend(response_data['results'])
+            if response_data['next'] is None:
+                break
+            query = QueryDict(response_data['next'].split('?', 1)[1])
+        self.assertEqual(
+            [result['id'] for result in results], [result['id'] for result in all_results])
+
+    def test_no_query(self):
+        """A search without terms is a bad request."""
+        response = self.view(self.factory.get('/'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        """An invalid cursor results in a 404."""
+        response = self.view(self.factory.get('/', {'q': 'xyzzy', 'cursor': 'not-a-cursor'}))
+        self.assertEqual(response.status_code, 404)
+
+    def search(self, q):
+        response = self.view(self.factory.get('/', {'q': q}))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+
+class TagListViewTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.view = views.TagListView().as_view()
+        for tags in [['xyzzy-common', 'xyzzy-rare'], ['xyzzy-common']]:
+            item = mpmodels.MediaItem.objects.create(tags=tags)
+            item.view_permission.is_public = True
+            item.view_permission.save()
+        mpmodels.MediaItem.objects.create(tags=['xyzzy-unused'], deleted_at=timezone.now())
+        mpmodels.MediaItem.objects.create(tags=['xyzzy-common', 'xyzzy-private'])
+
+    def test_counts(self):
+        """Tags are listed with their item counts in order of decreasing count."""
+        results = self.view(self.get_request).data['results']
+        counts = {result['name']: result['itemCount'] for result in results}
+        self.assertEqual(counts['xyzzy-common'], 3)
+        self.assertEqual(counts['xyzzy-rare'], 1)
+        self.assertEqual(
+            [result['itemCount'] for result in results],
+            sorted((result['itemCount'] for result in results), reverse=True))
+
+    def test_unused_tags_omitted(self):
+        """Tags only used by deleted items are not listed."""
+        results = self.view(self.get_request).data['results']
+        self.assertNotIn('xyzzy-unused', {result['name'] for result in results})
+
+    def test_url(self):
+        """Each tag links to the media items with that tag."""
+        results = self.view(self.get_request).data['results']
+        for result in results:
+            self.assertIn('tag=', result['url'])
+
+    def test_private_tags_omitted(self):
+        """Tags only applied to media items which the user may not view are not listed."""
+        results = self.view(self.get_request).data['results']
+        self.assertNotIn('xyzzy-private', {result['name'] for result in results})
+
+    def test_view_all_permission(self):
+        """Users who may view all media items are given all tags in use."""
+        view_permission = Permission.objects.get(
+            codename='view_mediaitem', content_type__app_label='mediaplatform')
+        self.user.user_permissions.add(view_permission)
+
+        # Re-fetch the user to avoid the permissions cache
+        user = get_user_model().objects.get(pk=self.user.pk)
+        request = self.factory.get('/')
+        force_authenticate(request, user=user)
+
+        results = self.view(request).data['results']
+        counts = {result['name']: result['itemCount'] for result in results}
+        self.assertEqual(counts['xyzzy-private'], 1)
+        self.assertEqual(counts['xyzzy-common'], 3)
+
+
+class SuggestionsViewTestCase(ViewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.view = views.SuggestionsView().as_view()
+        channel = self.channels.get(id='channel1')
+
+        self.item = mpmodels.MediaItem.objects.create(
+            channel=channel, title='Introduction to quantum mechanics', tags=['quantumness'])
+        self.item.view_permission.is_public = True
+        self.item.view_permission.save()
+
+        self.private_item = mpmodels.MediaItem.objects.create(
+            channel=channel, title='Quantum secrets', tags=['quantum-confidential'])
+
+        # Make sure the Django cache is empty
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_prefix(self):
+        """Suggestions match the start of words."""
+        results = self.suggest('quant')
+        self.assertIn(('mediaItem', self.item.id), {(r['type'], r['id']) for r in results})
+        self.assertIn(('tag', 'quantumness'), {(r['type'], r['text']) for r in results})
+
+    def test_fuzzy(self):
+        """Suggestions allow for typos."""
+        results = self.suggest('mechanisc')
+        self.assertIn(self.item.id, {r['id'] for r in results})
+
+    def test_permissions(self):
+        """Media items which cannot be viewed are not suggested."""
+        self.assertNotIn(self.private_item.id, {r['id'] for r in self.suggest('secrets')})
+
+    def test_tag_permissions(self):
+        """Tags which are only applied to media items which cannot be viewed are not suggested."""
+        texts = {r['text'] for r in self.suggest('quant') if r['type'] == 'tag'}
+        self.assertIn('quantumness', texts)
+        self.assertNotIn('quantum-confidential', texts)
+
+    def test_short_text(self):
+        """No suggestions are made for very short text."""
+        self.assertEqual(self.suggest('qu'), [])
+
+    def test_limit(self):
+        """The limit is respected and is capped."""
+        for index in range(5):
+            mpmodels.Playlist.objects.create(
+                channel=self.channels.get(id='channel1'), title=f'Quantum playlist {index}')
+        self.assertEqual(len(self.suggest('quantum', limit=2)), 2)
+        response = self.view(self.factory.get('/', {'q': 'quantum', 'limit': 10000}))
+        self.assertLessEqual(len(response.data['results']), views.SUGGESTIONS_MAX_LIMIT)
+
+    def test_anonymous_cached(self):
+        """Suggestions for anonymous users are cached."""
+        with mock.patch('api.suggestions.suggest', return_value=[]) as suggest:
+            self.suggest('quant')
+            self.suggest('Quant')
+        suggest.assert_called_once()
+
+    def test_authenticated_not_cached(self):
+        """Suggestions for authenticated users are not cached."""
+        with mock.patch('api.suggestions.suggest', return_value=[]) as suggest:
+            for _ in range(2):
+                request = self.factory.get('/', {'q': 'quant'})
+                force_authenticate(request, user=self.user)
+                self.view(request)
+        self.assertEqual(suggest.call_count, 2)
+
+    def suggest(self, q, **kwargs):
+        response = self.view(self.factory.get('/', {'q': q, **kwargs}))
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+
 DELIVERY_VIDEO_FIXTURE = {
     'key': 'mock1',
     'title': 'Mock 1',
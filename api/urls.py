@@ -11,10 +11,14 @@ app_name = 'api'
 
 urlpatterns = [
     path('media/', views.MediaItemListView.as_view(), name='media_list'),
+    path('media:bulk', views.MediaItemBulkUpdateView.as_view(), name='media_bulk_update'),
+    path('media/trending', views.MediaItemTrendingView.as_view(), name='media_trending'),
     path('media/<pk>', views.MediaItemView.as_view(), name='media_item'),
     path('media/<pk>/upload', views.MediaItemUploadView.as_view(), name='media_upload'),
+    path('media/<pk>/refresh', views.MediaItemRefreshView.as_view(), name='media_refresh'),
     path('media/<pk>/analytics', views.MediaItemAnalyticsView.as_view(),
          name='media_item_analytics'),
+    path('media/<pk>/related', views.MediaItemRelatedView.as_view(), name='media_related'),
     path('media/<pk>/source', views.MediaItemSourceView.as_view(), name='media_source'),
     # This path is included because itunes doesn't accept an rss feed enclosure url without an
     # extension. Note that MediaItemSourceView will ignore whatever <extension> is set to and it is
@@ -27,10 +31,17 @@ urlpatterns = [
          views.MediaItemPosterView.as_view(), name='media_poster'),
     path('channels/', views.ChannelListView.as_view(), name='channel_list'),
     path('channels/<pk>', views.ChannelView.as_view(), name='channel'),
+    path('channels/<pk>/analytics', views.ChannelAnalyticsView.as_view(),
+         name='channel_analytics'),
     path('playlists/', views.PlaylistListView.as_view(), name='playlist_list'),
     path('playlists/<pk>', views.PlaylistView.as_view(), name='playlist'),
     path('profile/', views.ProfileView.as_view(), name='profile'),
+    path('search', views.SearchView.as_view(), name='search'),
+    path('suggestions', views.SuggestionsView.as_view(), name='suggestions'),
+    path('tags', views.TagListView.as_view(), name='tag_list'),
 
     path('billingAccounts/', views.BillingAccountListView.as_view(), name='billing_account_list'),
     path('billingAccounts/<slug:pk>', views.BillingAccountView.as_view(), name='billing_account'),
+    path('billingAccounts/<slug:pk>/analytics', views.BillingAccountAnalyticsView.as_view(),
+         name='billing_account_analytics'),
 ]
@@ -2,25 +2,48 @@
 Views implementing the API endpoints.
 
 """
+from base64 import b64decode, b64encode
+import hashlib
+import json
 import logging
+from urllib import parse as urlparse
 
 import automationlookup
 from django.conf import settings
-from django.contrib.postgres.search import SearchRank, SearchQuery
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.http import Http404
 from django.shortcuts import redirect
+from django.utils import dateparse, timezone
+from django.utils.decorators import method_decorator
 from django_filters import rest_framework as df_filters
 from drf_yasg import inspectors, openapi
+from drf_yasg.utils import no_body, swagger_auto_schema
+from jwplatform.errors import JWPlatformError, JWPlatformRateLimitExceededError
 from rest_framework import generics, pagination, filters
-from rest_framework.exceptions import ParseError
+from rest_framework.exceptions import APIException, NotFound, ParseError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 import requests
 
+from legacysms import analytics as legacyanalytics
+import legacysms.models as legacymodels
+from mediaplatform import bulk
 import mediaplatform.models as mpmodels
+from mediaplatform import searchbackends
+from mediaplatform import signals as mpsignals
 from mediaplatform_jwp.api import delivery
+import mediaplatform_jwp.models as jwpmodels
+from mediaplatform_jwp import tasks as jwptasks
 
+from . import analytics
+from . import facets
 from . import permissions
+from . import renderers
+from . import search
 from . import serializers
+from . import suggestions
 
 
 LOG = logging.getLogger(__name__)
@@ -33,6 +56,36 @@ POSTER_IMAGE_DEFAULT_WIDTH = 720
 #: Allowed poster image extensions
 POSTER_IMAGE_VALID_EXTENSIONS = ['jpg']
 
+#: Default number of suggestions
+SUGGESTIONS_DEFAULT_LIMIT = 10
+
+#: Maximum number of suggestions
+SUGGESTIONS_MAX_LIMIT = 20
+
+#: Lifetime in seconds of suggestions cached for anonymous users
+SUGGESTIONS_CACHE_TIMEOUT = 60
+
+#: Default number of values returned for each facet
+FACETS_DEFAULT_LIMIT = 10
+
+#: Maximum number of values returned for each facet
+FACETS_MAX_LIMIT = 50
+
+#: Lifetime in seconds of facet counts cached for anonymous users
+FACETS_CACHE_TIMEOUT = 60
+
+#: Query parameters which do not affect facet counts
+FACETS_IGNORED_PARAMS = ('cursor', 'page_size', 'ordering', 'format')
+
+#: Default window in days for trending media items
+TRENDING_DEFAULT_WINDOW = 7
+
+#: Number of trending media items returned
+TRENDING_RESULTS = 20
+
+#: Number of most viewed media items which are considered before filtering by permission
+TRENDING_CANDIDATES = 500
+
 
 class ListPagination(pagination.CursorPagination):
     page_size = 50
@@ -40,6 +93,132 @@ class ListPagination(pagination.CursorPagination):
     max_page_size = 300
 
 
+class SearchSnapshotPagination(ListPagination):
+    """
+    Cursor pagination which, for requests with search terms, pages through a snapshot of the
+    ranked list of ids matching the search.
+
+    Ranking search results requires the rank of every matching row to be computed. With plain
+    cursor pagination this happens for every page and so deep pages are as expensive as the first.
+    Additionally, results can move between pages as resources change. Instead, the ids of all
+    results, in order, are stored in the Django cache for :py:attr:`~.snapshot_timeout` seconds.
+    Each page is then a slice of the snapshot and only the objects on that page are fetched.
+    Objects which are no longer visible to the user are omitted from the page.
+
+    The snapshot is keyed by the query parameters of the request and by a fingerprint of the
+    requesting user's permissions. The first page of results always creates a new snapshot so that
+    a new search reflects the current state of the database. If the snapshot expires while a
+    client is paging, it is re-created.
+
+    Requests without search terms are paginated as for :py:class:`~.ListPagination`.
+
+    """
+    #: Lifetime of a snapshot in seconds.
+    snapshot_timeout = 300
+
+    #: Maximum number of ids in a snapshot. Results beyond this are not reachable by paging.
+    snapshot_max_length = 10000
+
+    #: Query parameters which do not affect the results in a snapshot.
+    snapshot_ignored_params = ('cursor', 'page_size', 'format')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        search_terms = request.query_params.get(api_settings.SEARCH_PARAM, '').strip()
+        if search_terms == '' or view is None:
+            self.snapshot_offset = None
+            return super().paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.snapshot_offset = self.decode_snapshot_cursor(request)
+
+        ids = self.get_snapshot(queryset, request, view, refresh=self.snapshot_offset == 0)
+        page_ids = ids[self.snapshot_offset:self.snapshot_offset + self.page_size]
+        self.snapshot_has_next = self.snapshot_offset + self.page_size < len(ids)
+
+        # Fetch the objects for this page without any search filtering and put them in snapshot
+        # order.
+        objects = {obj.id: obj for obj in view.get_queryset().filter(id__in=page_ids)}
+        return [objects[id] for id in page_ids if id in objects]
+
+    def get_snapshot(self, queryset, request, view, refresh=False):
+        """
+        Return the list of ids for the search from the cache, creating the snapshot if necessary or
+        if *refresh* is ``True``.
+
+        """
+        params = sorted(
+            (key, value) for key, value in request.query_params.lists()
+            if key not in self.snapshot_ignored_params
+        )
+        cache_key = 'api:search-snapshot:{}'.format(hashlib.sha256(json.dumps([
+            type(view).__name__, self.get_permission_fingerprint(request), params
+        ]).encode('utf8')).hexdigest())
+
+        ids = cache.get(cache_key) if not refresh else None
+        if ids is None:
+            ordering = self.get_ordering(request, queryset, view)
+            ids = list(
+                queryset.order_by(*ordering, 'id')
+                .values_list('id', flat=True)[:self.snapshot_max_length]
+            )
+            cache.set(cache_key, ids, self.snapshot_timeout)
+        return ids
+
+    def get_permission_fingerprint(self, request):
+        """
+        Return a string which is the same for all requests which may view the same resources.
+
+        """
+        user = request.user
+        if user is None or user.is_anonymous:
+            return 'anonymous'
+        return f'user:{user.pk}'
+
+    def decode_snapshot_cursor(self, request):
+        """
+        Return the offset into the snapshot encoded in the request's cursor.
+
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return 0
+
+        try:
+            tokens = urlparse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'))
+            offset = int(tokens['s'][0])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if offset < 0:
+            raise NotFound(self.invalid_cursor_message)
+        return offset
+
+    def encode_snapshot_cursor(self, offset):
+        """
+        Return the URL for the page of the snapshot starting at *offset*.
+
+        """
+        if offset == 0:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        encoded = b64encode(urlparse.urlencode({'s': offset}).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.snapshot_offset is None:
+            return super().get_next_link()
+        if not self.snapshot_has_next:
+            return None
+        return self.encode_snapshot_cursor(self.snapshot_offset + self.page_size)
+
+    def get_previous_link(self):
+        if self.snapshot_offset is None:
+            return super().get_previous_link()
+        if self.snapshot_offset == 0:
+            return None
+        return self.encode_snapshot_cursor(max(0, self.snapshot_offset - self.page_size))
+
+
 class FullTextSearchFilter(filters.SearchFilter):
     """
     Custom filter based on :py:class:`rest_framework.filters.SearchFilter` specialised to search
@@ -50,6 +229,9 @@ class FullTextSearchFilter(filters.SearchFilter):
     default but can be overridden by setting search_rank_annotation on the view. If the search is
     empty then this rank will always be zero.
 
+    Searching and ranking is performed by the search backend returned by
+    :py:func:`mediaplatform.searchbackends.get_backend`.
+
     """
     def filter_queryset(self, request, queryset, view):
         search_terms = self.get_search_terms(request)
@@ -66,14 +248,10 @@ class FullTextSearchFilter(filters.SearchFilter):
                 search_rank_annotation: models.Value(0, output_field=models.FloatField())
             })
 
-        # Otherwise, form a query which is the logical OR of all the query terms.
-        query = SearchQuery(search_terms[0])
-        for t in search_terms[1:]:
-            query = query | SearchQuery(t)
-
-        return queryset.annotate(**{
-            search_rank_annotation: SearchRank(models.F(search_fields[0]), query)
-        }).filter(**{search_fields[0]: query})
+        # Otherwise, delegate to the search backend which matches any of the query terms.
+        return searchbackends.get_backend().filter_queryset(
+            queryset, search_terms, field=search_fields[0],
+            rank_annotation=search_rank_annotation, user=request.user)
 
 
 class ViewMixinBase:
@@ -86,11 +264,13 @@ class ViewMixinBase:
     detail serialisers.
 
     It also defines an appropriate permission class to forbid non-editors from performing "unsafe"
-    operations on the objects.
+    operations on the objects and the renderers from :py:mod:`api.renderers`.
 
     """
     permission_classes = [permissions.MediaPlatformPermission]
 
+    renderer_classes = renderers.API_RENDERER_CLASSES
+
     def filter_media_item_qs(self, qs):
         """
         Filters a MediaItem queryset so that only the appropriate objects are returned for the
@@ -268,6 +448,13 @@ class MediaItemFilter(df_filters.FilterSet):
         help_text='Only media items from this playlist will be listed',
         queryset=_user_playlists)
 
+    tag = df_filters.CharFilter(
+        label='Tag', method='filter_tag',
+        help_text=(
+            'Only media items with this tag will be listed. Separate tags with commas to list '
+            'items with any of the tags. Repeat the parameter to list items matching all of them.'
+        ))
+
     def filter_playlist(self, queryset, name, value):
         """
         Filter media items to only those which appear in a selected playlist. Since the playlist
@@ -276,13 +463,54 @@ class MediaItemFilter(df_filters.FilterSet):
         """
         return queryset.filter(id__in=value.media_items)
 
+    def filter_tag(self, queryset, name, value):
+        """
+        Filter media items by tag. The filter field only sees the last value of the parameter and
+        so all values are read from the query. Each value is a comma-separated list of tags of
+        which an item must have at least one. Both the overlap and containment operators used are
+        supported by the GIN index on tags.
 
+        """
+        for value in self.data.getlist(name):
+            tags = [tag.strip() for tag in value.split(',') if tag.strip() != '']
+            if len(tags) == 1:
+                queryset = queryset.filter(tags__contains=tags)
+            elif len(tags) > 1:
+                queryset = queryset.filter(tags__overlap=tags)
+        return queryset
+
+
+@method_decorator(name='get', decorator=swagger_auto_schema(manual_parameters=[
+    openapi.Parameter(
+        name='facets', in_=openapi.IN_QUERY,
+        description=(
+            'Comma-separated list of facets to count. If present, the response includes a '
+            '"facets" object mapping each facet to its most common values and the number of '
+            'matching items with each value. Supported facets: '
+            f'{", ".join(facets.FACETS)}.'),
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter(
+        name='facet_limit', in_=openapi.IN_QUERY,
+        description=(
+            f'Maximum number of values returned for each facet. Default {FACETS_DEFAULT_LIMIT}, '
+            f'at most {FACETS_MAX_LIMIT}.'),
+        type=openapi.TYPE_INTEGER
+    ),
+]))
 class MediaItemListView(MediaItemListMixin, generics.ListCreateAPIView):
     """
     List and search Media items. If no other ordering is specified, results are returned in order
     of decreasing search relevance (if there is any search) and then by decreasing publication
     date.
 
+    If the "facets" parameter is present, the response includes counts of matching items for the
+    most common values of each requested facet. All facets are counted by a single query. Counts
+    for anonymous users are cached for a short time since they do not depend on the user.
+
+    If the search backend uses an external engine (see :py:mod:`mediaplatform.searchbackends`),
+    a search lists at most the backend's ``max_results`` most relevant items, 1000 by default.
+
     """
     filter_backends = (filters.OrderingFilter, FullTextSearchFilter,
                        df_filters.DjangoFilterBackend)
@@ -290,7 +518,7 @@ class MediaItemListView(MediaItemListMixin, generics.ListCreateAPIView):
     # the rank is a fixed value and the publication date dominates.
     ordering = ('-search_rank', '-publishedAt')
     ordering_fields = ('publishedAt', 'updatedAt')
-    pagination_class = ListPagination
+    pagination_class = SearchSnapshotPagination
     search_fields = ('text_search_vector',)
     serializer_class = serializers.MediaItemSerializer
     filterset_class = MediaItemFilter
@@ -299,6 +527,53 @@ class MediaItemListView(MediaItemListMixin, generics.ListCreateAPIView):
         qs = super().get_queryset()
         return qs.annotate(publishedAt=models.F('published_at'), updatedAt=models.F('updated_at'))
 
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+
+        facet_names = [
+            name.strip() for name in request.query_params.get('facets', '').split(',')
+            if name.strip() != ''
+        ]
+        if len(facet_names) == 0:
+            return response
+
+        unknown_names = set(facet_names) - set(facets.FACETS)
+        if len(unknown_names) > 0:
+            raise ParseError(
+                f'Unknown facets: {", ".join(sorted(unknown_names))}. '
+                f'Supported facets: {", ".join(facets.FACETS)}')
+
+        try:
+            limit = int(request.query_params.get('facet_limit', FACETS_DEFAULT_LIMIT))
+        except ValueError:
+            raise ParseError('facet_limit must be an integer')
+        limit = max(1, min(limit, FACETS_MAX_LIMIT))
+
+        if request.user.is_anonymous:
+            params = sorted(
+                (key, value) for key, value in request.query_params.lists()
+                if key not in FACETS_IGNORED_PARAMS
+            )
+            cache_key = 'api:facets:{}'.format(
+                hashlib.sha256(json.dumps(params).encode('utf8')).hexdigest())
+            counts = cache.get(cache_key)
+            if counts is None:
+                counts = self.get_facet_counts(facet_names, limit)
+                cache.set(cache_key, counts, FACETS_CACHE_TIMEOUT)
+        else:
+            counts = self.get_facet_counts(facet_names, limit)
+
+        response.data['facets'] = counts
+        return response
+
+    def get_facet_counts(self, facet_names, limit):
+        """
+        Return counts for the facets named in *facet_names* over the filtered media items.
+
+        """
+        return facets.facet_counts(
+            self.filter_queryset(self.get_queryset()), facet_names, limit)
+
 
 class MediaItemView(MediaItemMixin, generics.RetrieveUpdateAPIView):
     """
@@ -308,6 +583,66 @@ class MediaItemView(MediaItemMixin, generics.RetrieveUpdateAPIView):
     serializer_class = serializers.MediaItemDetailSerializer
 
 
+class MediaItemBulkUpdateView(MediaItemListMixin, generics.GenericAPIView):
+    """
+    Update many media items at once. The request body contains a list of items. Each item has the
+    id of a media item and the changes to make to it. The user must have the edit permission for
+    all of the items. Either all of the changes are made or none are.
+
+    Modified items are synchronised with JWP by a single background task rather than one update
+    per item.
+
+    """
+    serializer_class = serializers.MediaItemBulkUpdateSerializer
+
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = {change.pop('id'): change for change in serializer.validated_data['items']}
+
+        with transaction.atomic():
+            items = list(
+                self.get_queryset().filter(id__in=changes.keys())
+                .select_related('view_permission')
+            )
+            missing_ids = changes.keys() - {item.id for item in items}
+            if len(missing_ids) > 0:
+                raise NotFound(f'Media items not found: {", ".join(sorted(missing_ids))}')
+            for item in items:
+                self.check_object_permissions(request, item)
+
+            item_fields, permission_fields = set(), set()
+            for item in items:
+                change = changes[item.id]
+                for name, value in change.pop('view_permission', {}).items():
+                    setattr(item.view_permission, name, value)
+                    permission_fields.add(name)
+                for name, value in change.items():
+                    setattr(item, name, value)
+                    item_fields.add(name)
+
+            # bulk_update() does not process auto_now fields and so updated_at is set explicitly.
+            now = timezone.now()
+            for item in items:
+                item.updated_at = now
+
+            bulk.bulk_update(items, sorted(item_fields) + ['updated_at'])
+            bulk.bulk_update(
+                [item.view_permission for item in items], sorted(permission_fields))
+
+            # Since no post_save signals were sent, notify any interested parties once the changes
+            # are committed.
+            item_ids = [item.id for item in items]
+            transaction.on_commit(lambda: mpsignals.media_items_bulk_updated.send(
+                sender=mpmodels.MediaItem, item_ids=item_ids))
+
+        updated_items = self.get_queryset().filter(id__in=item_ids)
+        return Response({
+            'items': serializers.MediaItemSerializer(
+                updated_items, many=True, context=self.get_serializer_context()).data,
+        })
+
+
 class MediaItemUploadView(MediaItemMixin, generics.RetrieveUpdateAPIView):
     """
     Endpoint for retrieving an upload URL for a media item. Requires that the user have the edit
@@ -326,6 +661,63 @@ class MediaItemUploadView(MediaItemMixin, generics.RetrieveUpdateAPIView):
         return super().get_queryset().select_related('upload_endpoint')
 
 
+class JWPlatformUnavailable(APIException):
+    """
+    The JWP management API rate limit has been exceeded.
+
+    """
+    status_code = 503
+    default_detail = 'JWPlatform rate limit exceeded, try again later.'
+    default_code = 'jwplatform_unavailable'
+
+
+class JWPlatformBadGateway(APIException):
+    """
+    The JWP management API returned an error.
+
+    """
+    status_code = 502
+    default_detail = 'JWPlatform returned an error.'
+    default_code = 'jwplatform_error'
+
+
+class MediaItemRefreshView(MediaItemMixin, generics.GenericAPIView):
+    """
+    Endpoint to re-synchronise a media item from its JWP video immediately rather than waiting for
+    the next periodic synchronisation. A HTTP POST to this endpoint fetches the video using the
+    JWP management API, updates the cached video resource and synchronises the item from it.
+    Requires that the user have the edit permission for the media item. The response is the
+    refreshed media item.
+
+    The video is fetched with a single attempt so that the request is not held open while waiting
+    for the JWP rate limit to clear. If the rate limit has been exceeded, the response is a 503
+    and, if JWP returns any other error, the response is a 502.
+
+    """
+    permission_classes = MediaItemListMixin.permission_classes + [
+        permissions.MediaPlatformEditPermission
+    ]
+    serializer_class = serializers.MediaItemDetailSerializer
+
+    @swagger_auto_schema(request_body=no_body)
+    def post(self, request, *args, **kwargs):
+        item = self.get_object()
+        if not hasattr(item, 'jwp'):
+            raise NotFound('Media item has no associated JWP video')
+
+        try:
+            jwptasks.synchronise_resource(
+                jwpmodels.CachedResource.VIDEO, item.jwp.key, retry=False)
+        except JWPlatformRateLimitExceededError:
+            raise JWPlatformUnavailable()
+        except JWPlatformError as e:
+            LOG.error('Error refreshing JWP video %s: %s', item.jwp.key, e)
+            raise JWPlatformBadGateway()
+
+        # The item is fetched again since it may have been deleted along with its JWP video.
+        return Response(self.get_serializer(self.get_object()).data)
+
+
 class MediaItemSourceViewInspector(inspectors.ViewInspector):
     def get_operation(self, operation_keys):
         return openapi.Operation(
@@ -406,13 +798,213 @@ class MediaItemSourceView(MediaItemMixin, generics.RetrieveAPIView):
         raise Http404()
 
 
+# Query parameters accepted by the analytics endpoints
+_ANALYTICS_PARAMETERS = [
+    openapi.Parameter(
+        name='from', in_=openapi.IN_QUERY,
+        description='Only include periods which end on or after this date.',
+        type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE
+    ),
+    openapi.Parameter(
+        name='to', in_=openapi.IN_QUERY,
+        description='Only include periods which start on or before this date.',
+        type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE
+    ),
+    openapi.Parameter(
+        name='granularity', in_=openapi.IN_QUERY,
+        description=(
+            f'Length of the period over which views are counted. Default "{legacymodels.DAY}".'),
+        type=openapi.TYPE_STRING, enum=list(legacymodels.GRANULARITIES)
+    ),
+]
+
+
+@method_decorator(
+    name='get', decorator=swagger_auto_schema(manual_parameters=_ANALYTICS_PARAMETERS))
 class MediaItemAnalyticsView(MediaItemMixin, generics.RetrieveAPIView):
     """
     Endpoint to retrieve the analytics for a single media item.
 
+    Views are counted per day unless the "granularity" parameter specifies a longer period, in
+    which case the date of each count is the first day of its period. The "from" and "to"
+    parameters restrict the counts to periods which overlap that range of dates. Counts are read
+    from rollups which are updated daily and so do not include the current day.
+
     """
     serializer_class = serializers.MediaItemAnalyticsListSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        start, end, granularity = _analytics_params(request)
+        item = self.get_object()
+        serializer = self.get_serializer({
+            'granularity': granularity,
+            # The counts are passed to the serializer as an iterator so that the rollups are not
+            # loaded as model instances.
+            'views': item.fetch_analytics(start=start, end=end, granularity=granularity),
+            'size': item.fetched_size,
+        })
+        return Response(serializer.data)
+
+
+def _analytics_params(request):
+    """
+    Return a tuple of the start date, end date and granularity requested by the query parameters
+    of an analytics endpoint. Raises :py:class:`ParseError` if the parameters are invalid.
+
+    """
+    granularity = request.query_params.get('granularity', legacymodels.DAY)
+    if granularity not in legacymodels.GRANULARITIES:
+        raise ParseError(
+            f'granularity must be one of: {", ".join(legacymodels.GRANULARITIES)}')
+    return _date_param(request, 'from'), _date_param(request, 'to'), granularity
+
+
+def _date_param(request, name):
+    """
+    Return the date in the query parameter *name* of *request* or ``None`` if the parameter is
+    absent. Raises :py:class:`ParseError` if the parameter is not a valid ISO 8601 date.
+
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    try:
+        date = dateparse.parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise ParseError(f'{name} must be a date of the form YYYY-MM-DD')
+    return date
+
+
+class MediaItemRelatedViewInspector(inspectors.ViewInspector):
+    def get_operation(self, operation_keys):
+        return openapi.Operation(
+            operation_id='media_related',
+            responses=openapi.Responses({
+                200: openapi.Response(
+                    description='Related media items in order of decreasing relevance',
+                    schema=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'results': self.serializer_to_schema(
+                                serializers.MediaItemSerializer(many=True)),
+                        },
+                    ),
+                ),
+            }),
+            tags=['media'],
+        )
+
+
+class MediaItemRelatedView(MediaItemListMixin, generics.GenericAPIView):
+    """
+    Media items related to a media item in order of decreasing relevance. Items are related if they
+    are in the same channel or playlists, share tags or have similar text. Related items are
+    computed periodically and so may not reflect recent changes. Only items which the user may view
+    are returned.
+
+    """
+    serializer_class = serializers.MediaItemSerializer
+    swagger_schema = MediaItemRelatedViewInspector
+
+    def get(self, request, *args, pk, **kwargs):
+        # The user must be able to view the item itself.
+        if not self.get_queryset().filter(id=pk).exists():
+            raise Http404()
+
+        related_ids = (
+            mpmodels.RelatedMediaItems.objects.filter(item_id=pk)
+            .values_list('related_ids', flat=True).first()
+        ) or []
+
+        # Permission filtering is applied to the small list of related items.
+        items = {related.id: related for related in self.get_queryset().filter(id__in=related_ids)}
+
+        return Response({
+            'results': self.get_serializer(
+                [items[id] for id in related_ids if id in items], many=True).data,
+        })
+
+
+class MediaItemTrendingViewInspector(inspectors.ViewInspector):
+    def get_operation(self, operation_keys):
+        return openapi.Operation(
+            operation_id='media_trending',
+            responses=openapi.Responses({
+                200: openapi.Response(
+                    description='Media items in order of decreasing views',
+                    schema=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'window': openapi.Schema(
+                                type=openapi.TYPE_INTEGER,
+                                description='Length of the window in days'),
+                            'results': self.serializer_to_schema(
+                                serializers.MediaItemTrendingSerializer(many=True)),
+                        },
+                    ),
+                ),
+            }),
+            parameters=[
+                openapi.Parameter(
+                    name='window', in_=openapi.IN_QUERY,
+                    description=(
+                        'Length in days of the window over which views are counted. One of '
+                        + ', '.join(str(days) for days in legacyanalytics.VIEW_TOTALS_WINDOWS)
+                        + f'. Default {TRENDING_DEFAULT_WINDOW}.'),
+                    type=openapi.TYPE_INTEGER
+                ),
+            ],
+            tags=['media'],
+        )
+
+
+class MediaItemTrendingView(MediaItemListMixin, generics.GenericAPIView):
+    """
+    The most viewed media items over a recent window of days in order of decreasing views. The
+    window ends on the last day for which view totals have been computed, usually yesterday.
+
+    The most viewed items are read from precomputed totals and only then filtered to those the
+    user may view. As a result, fewer items may be returned if the user may not view many of the
+    most viewed items.
+
+    """
+    serializer_class = serializers.MediaItemTrendingSerializer
+    swagger_schema = MediaItemTrendingViewInspector
+
+    def get(self, request, *args, **kwargs):
+        try:
+            window = int(request.query_params.get('window', TRENDING_DEFAULT_WINDOW))
+        except ValueError:
+            raise ParseError('window must be an integer')
+        if window not in legacyanalytics.VIEW_TOTALS_WINDOWS:
+            raise ParseError('window must be one of: ' + ', '.join(
+                str(days) for days in legacyanalytics.VIEW_TOTALS_WINDOWS))
+
+        field = legacyanalytics.VIEW_TOTALS_WINDOWS[window]
+        views_by_sms_id = dict(
+            legacymodels.MediaViewTotals.objects
+            .filter(**{f'{field}__gt': 0})
+            .order_by(f'-{field}', 'media_id')
+            .values_list('media_id', field)[:TRENDING_CANDIDATES]
+        )
+
+        # Permission filtering is applied to the candidates only.
+        items = list(
+            self.get_queryset()
+            .filter(sms__id__in=views_by_sms_id.keys())
+            .annotate(sms_id=models.F('sms__id'))
+        )
+        for item in items:
+            item.views = views_by_sms_id[item.sms_id]
+        items.sort(key=lambda item: (-item.views, item.id))
+
+        return Response({
+            'window': window,
+            'results': self.get_serializer(items[:TRENDING_RESULTS], many=True).data,
+        })
+
 
 class MediaItemPosterViewInspector(inspectors.ViewInspector):
     def get_operation(self, operation_keys):
@@ -535,6 +1127,37 @@ class ChannelView(ChannelMixin, generics.RetrieveUpdateAPIView):
     serializer_class = serializers.ChannelDetailSerializer
 
 
+@method_decorator(
+    name='get', decorator=swagger_auto_schema(manual_parameters=_ANALYTICS_PARAMETERS))
+class ChannelAnalyticsView(ChannelMixin, generics.RetrieveAPIView):
+    """
+    Endpoint to retrieve the analytics for all media items in a channel. The user must have the
+    edit permission for the channel. Parameters are as for the media item analytics endpoint.
+
+    Aggregates are cached until the view statistics are next updated or media items are next
+    synchronised.
+
+    """
+    permission_classes = [permissions.MediaPlatformEditPermission]
+    serializer_class = serializers.AggregateAnalyticsSerializer
+
+    def get_queryset(self):
+        # Editors of SMS-derived channels may view their analytics even though the channels are
+        # not editable via the API.
+        return (
+            mpmodels.Channel.objects.all()
+            .annotate_viewable(self.request.user)
+            .annotate_has_edit_permission(self.request.user, name='editable')
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        start, end, granularity = _analytics_params(request)
+        channel = self.get_object()
+        return Response(self.get_serializer(analytics.cached_aggregate_analytics(
+            f'channel:{channel.id}', mpmodels.MediaItem.objects.filter(channel=channel),
+            start=start, end=end, granularity=granularity)).data)
+
+
 class PlaylistListMixin(ViewMixinBase):
     """
     A mixin class for DRF generic views which has all of the specialisations necessary for listing
@@ -681,3 +1304,241 @@ class BillingAccountView(BillingAccountMixin, generics.RetrieveAPIView):
 
     """
     serializer_class = serializers.BillingAccountDetailSerializer
+
+
+@method_decorator(
+    name='get', decorator=swagger_auto_schema(manual_parameters=_ANALYTICS_PARAMETERS))
+class BillingAccountAnalyticsView(BillingAccountMixin, generics.RetrieveAPIView):
+    """
+    Endpoint to retrieve the analytics for all media items in the channels of a billing account.
+    The user must be able to create channels in the billing account. Parameters are as for the
+    media item analytics endpoint.
+
+    Aggregates are cached until the view statistics are next updated or media items are next
+    synchronised.
+
+    """
+    permission_classes = [permissions.MediaPlatformEditPermission]
+    serializer_class = serializers.AggregateAnalyticsSerializer
+
+    def get_queryset(self):
+        # Only those who may create channels in the billing account may view its analytics.
+        return (
+            mpmodels.BillingAccount.objects.all()
+            .annotate(viewable=models.Value(True, output_field=models.BooleanField()))
+            .annotate_can_create_channels(self.request.user, name='editable')
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        start, end, granularity = _analytics_params(request)
+        account = self.get_object()
+        return Response(self.get_serializer(analytics.cached_aggregate_analytics(
+            f'billing_account:{account.id}',
+            mpmodels.MediaItem.objects.filter(channel__billing_account=account),
+            start=start, end=end, granularity=granularity)).data)
+
+
+class SearchViewInspector(inspectors.ViewInspector):
+    def get_operation(self, operation_keys):
+        return openapi.Operation(
+            operation_id='search',
+            responses=openapi.Responses({
+                200: openapi.Response(
+                    description='Matching resources in order of decreasing relevance',
+                    schema=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'next': openapi.Schema(
+                                type=openapi.TYPE_STRING, format=openapi.FORMAT_URI,
+                                x_nullable=True),
+                            'results': self.serializer_to_schema(
+                                serializers.SearchResultSerializer(many=True)),
+                        },
+                    ),
+                ),
+            }),
+            parameters=[
+                openapi.Parameter(
+                    name='q', in_=openapi.IN_QUERY, required=True,
+                    description='Search terms. A resource matches if it matches any term.',
+                    type=openapi.TYPE_STRING
+                ),
+                openapi.Parameter(
+                    name='cursor', in_=openapi.IN_QUERY,
+                    description='The pagination cursor value.',
+                    type=openapi.TYPE_STRING
+                ),
+                openapi.Parameter(
+                    name='page_size', in_=openapi.IN_QUERY,
+                    description='Number of results to return per page.',
+                    type=openapi.TYPE_INTEGER
+                ),
+            ],
+            tags=['search'],
+        )
+
+
+class SearchView(ViewMixinBase, generics.GenericAPIView):
+    """
+    Search media items, channels and playlists at once. Results are returned in order of
+    decreasing search relevance regardless of their type.
+
+    """
+    swagger_schema = SearchViewInspector
+    pagination_class = ListPagination
+    serializer_class = serializers.SearchResultSerializer
+
+    #: Query parameter containing the search terms.
+    search_param = 'q'
+
+    #: Query parameter containing the pagination cursor.
+    cursor_query_param = 'cursor'
+
+    def get(self, request, *args, **kwargs):
+        # Search terms are parsed in the same way as SearchFilter parses them.
+        terms = (
+            request.query_params.get(self.search_param, '')
+            .replace('\x00', '').replace(',', ' ').split()
+        )
+        if len(terms) == 0:
+            raise ParseError(f'The "{self.search_param}" parameter is required')
+
+        after = request.query_params.get(self.cursor_query_param)
+        if after is not None:
+            try:
+                after = search.Position.decode(after)
+            except ValueError:
+                raise NotFound('Invalid cursor')
+
+        # Fetch one more result than we need to determine if there is a next page.
+        page_size = self.paginator.get_page_size(request)
+        results = search.search(
+            self.get_search_querysets(), search.search_query(terms), after=after,
+            limit=page_size + 1)
+
+        next_url = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            next_url = replace_query_param(
+                request.build_absolute_uri(), self.cursor_query_param,
+                search.Position.from_result(results[-1]).encode())
+
+        return Response({
+            'next': next_url,
+            'results': self.get_serializer(results, many=True).data,
+        })
+
+    def get_search_querysets(self):
+        """
+        Return a dict mapping resource types to querysets of the resources the user may view.
+
+        """
+        user = self.request.user
+        return {
+            search.MEDIA_ITEM: mpmodels.MediaItem.objects.all().viewable_by_user(user),
+            search.CHANNEL: mpmodels.Channel.objects.all().viewable_by_user(user),
+            search.PLAYLIST: mpmodels.Playlist.objects.all().viewable_by_user(user),
+        }
+
+
+class SuggestionsViewInspector(inspectors.ViewInspector):
+    def get_operation(self, operation_keys):
+        return openapi.Operation(
+            operation_id='suggestions',
+            responses=openapi.Responses({
+                200: openapi.Response(
+                    description='Suggestions in order of decreasing relevance',
+                    schema=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'results': self.serializer_to_schema(
+                                serializers.SuggestionSerializer(many=True)),
+                        },
+                    ),
+                ),
+            }),
+            parameters=[
+                openapi.Parameter(
+                    name='q', in_=openapi.IN_QUERY, required=True,
+                    description=(
+                        'Text typed by the user. No suggestions are made if this is shorter than '
+                        f'{suggestions.MIN_LENGTH} characters.'),
+                    type=openapi.TYPE_STRING
+                ),
+                openapi.Parameter(
+                    name='limit', in_=openapi.IN_QUERY,
+                    description=(
+                        f'Maximum number of suggestions. Default {SUGGESTIONS_DEFAULT_LIMIT}, '
+                        f'at most {SUGGESTIONS_MAX_LIMIT}.'),
+                    type=openapi.TYPE_INTEGER
+                ),
+            ],
+            tags=['search'],
+        )
+
+
+class SuggestionsView(ViewMixinBase, generics.GenericAPIView):
+    """
+    Suggest media items, channels, playlists and tags whose title or name matches text typed by
+    the user. A suggestion matches if a word in it starts with the text or if part of it is similar
+    to the text.
+
+    Suggestions for anonymous users are cached for a short time since they do not depend on the
+    user.
+
+    """
+    swagger_schema = SuggestionsViewInspector
+    serializer_class = serializers.SuggestionSerializer
+
+    def get(self, request, *args, **kwargs):
+        text = request.query_params.get('q', '').replace('\x00', '')[:suggestions.MAX_LENGTH]
+
+        try:
+            limit = int(request.query_params.get('limit', SUGGESTIONS_DEFAULT_LIMIT))
+        except ValueError:
+            raise ParseError('limit must be an integer')
+        limit = max(1, min(limit, SUGGESTIONS_MAX_LIMIT))
+
+        if request.user.is_anonymous:
+            normalised_text = ' '.join(text.lower().split())
+            cache_key = 'api:suggestions:{}:{}'.format(
+                limit, hashlib.sha256(normalised_text.encode('utf8')).hexdigest())
+            results = cache.get(cache_key)
+            if results is None:
+                results = self.get_suggestions(text, limit)
+                cache.set(cache_key, results, SUGGESTIONS_CACHE_TIMEOUT)
+        else:
+            results = self.get_suggestions(text, limit)
+
+        return Response({'results': self.get_serializer(results, many=True).data})
+
+    def get_suggestions(self, text, limit):
+        """
+        Return at most *limit* suggestions for *text* which the user may view.
+
+        """
+        user = self.request.user
+        return suggestions.suggest({
+            search.MEDIA_ITEM: mpmodels.MediaItem.objects.all().viewable_by_user(user),
+            search.CHANNEL: mpmodels.Channel.objects.all().viewable_by_user(user),
+            search.PLAYLIST: mpmodels.Playlist.objects.all().viewable_by_user(user),
+        }, text, limit)
+
+
+class TagListPagination(ListPagination):
+    ordering = ('-item_count', 'name')
+
+
+class TagListView(ViewMixinBase, generics.ListAPIView):
+    """
+    Tags applied to media items in order of decreasing usage. The number of items with each tag is
+    maintained as items change and so listing tags does not count items. Only tags applied to at
+    least one media item which the user may view are listed. Counts include all media items which
+    are not deleted. Tags which are no longer used are not listed.
+
+    """
+    pagination_class = TagListPagination
+    serializer_class = serializers.TagSerializer
+
+    def get_queryset(self):
+        return mpmodels.Tag.objects.all().viewable_by_user(self.request.user)
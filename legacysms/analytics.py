@@ -0,0 +1,231 @@
+"""
+Summaries of the legacy SMS viewing statistics.
+
+The ``stats.media_stats_by_day`` table holds the number of views of each legacy SMS media item on
+each day. Ranking items by their views over a window of days would require aggregating the whole
+window of the table for every request and so the totals are instead maintained in summary tables
+by a task which is intended to be scheduled to run periodically, e.g. nightly.
+
+:py:func:`~.update_view_totals` maintains :py:class:`legacysms.models.MediaViewTotals`
+incrementally. The last day included in the totals is recorded in a
+:py:class:`legacysms.models.StatsSummary` and, when the totals are next updated, the views on days
+which have since entered each window are added and the views on days which have since left it are
+subtracted. Only the statistics for days between the old and new windows are read.
+
+:py:func:`~.update_view_rollups` similarly maintains the number of views of each item in each
+day, week, month and year in the rollup models listed in
+:py:data:`legacysms.models.ROLLUP_MODELS`. The rollups are indexed by media id and day and so a
+series of views for an item is read without scanning the statistics table.
+
+Analytics aggregated from the rollups may be cached by consumers under keys which include the value
+of :py:func:`~.aggregates_generation`. :py:func:`~.invalidate_aggregates` changes the generation
+once the rollups or the media items they are aggregated over change.
+
+"""
+import datetime
+import uuid
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import models
+
+#: Name of the :py:class:`legacysms.models.StatsSummary` for the rolling view totals
+VIEW_TOTALS = 'view_totals'
+
+#: Name of the :py:class:`legacysms.models.StatsSummary` for the view rollups
+VIEW_ROLLUPS = 'view_rollups'
+
+#: Lengths of the rolling windows in days mapped to the field of
+#: :py:class:`legacysms.models.MediaViewTotals` holding the number of views in that window
+VIEW_TOTALS_WINDOWS = {
+    7: 'views_7_days',
+    30: 'views_30_days',
+    365: 'views_365_days',
+}
+
+#: Cache key for the generation of cached aggregated analytics
+AGGREGATES_GENERATION_CACHE_KEY = 'legacysms:analytics:aggregates-generation'
+
+# Length of the longest window. An item with no views in this window has no views in any window.
+_LONGEST_WINDOW = max(VIEW_TOTALS_WINDOWS)
+
+
+def update_view_totals(last_day=None):
+    """
+    Update :py:class:`legacysms.models.MediaViewTotals` so that each window ends on *last_day*,
+    which defaults to yesterday since statistics for the current day are incomplete. The totals
+    are recomputed from scratch if they have not been computed before or if no day of the previous
+    windows is still within the new ones.
+
+    Returns the number of media items whose totals were changed.
+
+    """
+    if last_day is None:
+        last_day = timezone.now().date() - datetime.timedelta(days=1)
+
+    with transaction.atomic():
+        summary, _ = (
+            models.StatsSummary.objects.select_for_update().get_or_create(name=VIEW_TOTALS))
+
+        if summary.last_day is not None and summary.last_day >= last_day:
+            return 0
+
+        incremental = (
+            summary.last_day is not None
+            and (last_day - summary.last_day).days < _LONGEST_WINDOW
+        )
+
+        if incremental:
+            count = _add_view_totals(last_day, summary.last_day)
+        else:
+            models.MediaViewTotals.objects.all().delete()
+            count = _add_view_totals(last_day, None)
+
+        # Views which have left the windows may have reduced some totals to zero.
+        models.MediaViewTotals.objects.filter(**{
+            VIEW_TOTALS_WINDOWS[_LONGEST_WINDOW]: 0}).delete()
+
+        summary.last_day = last_day
+        summary.save()
+
+    return count
+
+
+def update_view_rollups(last_day=None):
+    """
+    Update the rollup models in :py:data:`legacysms.models.ROLLUP_MODELS` to include statistics
+    up to and including *last_day*, which defaults to yesterday. Only statistics for days after
+    the last day previously included are read and their views are added to the rollups. The
+    rollups are recomputed from scratch if they have not been computed before.
+
+    Returns the number of daily rollups which were created or changed.
+
+    """
+    if last_day is None:
+        last_day = timezone.now().date() - datetime.timedelta(days=1)
+
+    with transaction.atomic():
+        summary, _ = (
+            models.StatsSummary.objects.select_for_update().get_or_create(name=VIEW_ROLLUPS))
+
+        if summary.last_day is not None and summary.last_day >= last_day:
+            return 0
+
+        if summary.last_day is None:
+            for model in models.ROLLUP_MODELS.values():
+                model.objects.all().delete()
+
+        count = _add_view_rollups(last_day, summary.last_day)
+
+        summary.last_day = last_day
+        summary.save()
+
+        transaction.on_commit(invalidate_aggregates)
+
+    return count
+
+
+def aggregates_generation():
+    """
+    Return an opaque string identifying the current generation of aggregated analytics. Cached
+    aggregates should include it in their cache keys.
+
+    """
+    return cache.get_or_set(AGGREGATES_GENERATION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_aggregates():
+    """
+    Invalidate all cached aggregated analytics by starting a new generation. Called once updated
+    rollups have been committed and should also be called when the media items which analytics are
+    aggregated over change, e.g. after synchronisation with JWP.
+
+    """
+    cache.set(AGGREGATES_GENERATION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def _add_view_rollups(last_day, previous_last_day):
+    """
+    Add the views on days after *previous_last_day* up to and including *last_day* to the
+    rollups. The statistics table is read once and all rollups are updated by a single statement.
+    If *previous_last_day* is ``None``, all days up to *last_day* are added.
+
+    """
+    day_condition, params = 'day <= %s', [last_day]
+    if previous_last_day is not None:
+        day_condition, params = 'day > %s AND ' + day_condition, [previous_last_day] + params
+
+    # Each rollup is updated by a data-modifying common table expression. All of them are
+    # executed even though only the daily rollup is referenced by the final query.
+    inserts = []
+    for granularity, model in models.ROLLUP_MODELS.items():
+        table = model._meta.db_table
+        period = 'day' if granularity == models.DAY else f"date_trunc('{granularity}', day)::date"
+        inserts.append(f'''
+            {granularity}_rollups AS (
+                INSERT INTO {table} (media_id, day, views)
+                SELECT media_id, {period}, SUM(views) FROM new_views GROUP BY media_id, {period}
+                ON CONFLICT (media_id, day) DO UPDATE SET views = {table}.views + EXCLUDED.views
+                RETURNING 1
+            )''')
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            WITH
+            new_views AS (
+                SELECT media_id, day, SUM(num_hits)::bigint AS views
+                FROM stats.media_stats_by_day
+                WHERE media_id IS NOT NULL AND {day_condition}
+                GROUP BY media_id, day
+            ),
+            {', '.join(inserts)}
+            SELECT COUNT(*) FROM {models.DAY}_rollups
+        ''', params)
+        return cursor.fetchone()[0]
+
+
+def _add_view_totals(last_day, previous_last_day):
+    """
+    Add the change in the number of views in each window when the windows move from ending on
+    *previous_last_day* to ending on *last_day* to the totals using a single ``INSERT ... ON
+    CONFLICT`` statement. If *previous_last_day* is ``None``, the totals are assumed to be empty.
+
+    """
+    fields, expressions, params = [], [], []
+    for days, field in VIEW_TOTALS_WINDOWS.items():
+        window = datetime.timedelta(days=days)
+        fields.append(field)
+        if previous_last_day is None:
+            expressions.append('SUM(CASE WHEN day > %s THEN num_hits ELSE 0 END)')
+            params.append(last_day - window)
+        else:
+            # Days after the previous last day entered the window and days in the previous window
+            # which are not in the new one left it.
+            expressions.append(
+                'SUM(CASE WHEN day > %s THEN num_hits ELSE 0 END)'
+                ' - SUM(CASE WHEN day > %s AND day <= %s THEN num_hits ELSE 0 END)'
+            )
+            params.extend([previous_last_day, previous_last_day - window, last_day - window])
+
+    first_day_after = (
+        (previous_last_day if previous_last_day is not None else last_day)
+        - datetime.timedelta(days=_LONGEST_WINDOW)
+    )
+
+    columns = ', '.join(fields)
+    values = ', '.join(f'({expression})::bigint' for expression in expressions)
+    updates = ', '.join(
+        f'{field} = legacysms_mediaviewtotals.{field} + EXCLUDED.{field}' for field in fields)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            INSERT INTO legacysms_mediaviewtotals (media_id, {columns})
+            SELECT media_id, {values}
+            FROM stats.media_stats_by_day
+            WHERE media_id IS NOT NULL AND day > %s AND day <= %s
+            GROUP BY media_id
+            ON CONFLICT (media_id) DO UPDATE SET {updates}
+        ''', params + [first_day_after, last_day])
+        return cursor.rowcount
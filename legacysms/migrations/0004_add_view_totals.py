@@ -0,0 +1,40 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('legacysms', '0003_add_collection_playlist_field'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaViewTotals',
+            fields=[
+                ('media_id', models.BigIntegerField(editable=False, help_text='Legacy SMS media id', primary_key=True, serialize=False)),
+                ('views_7_days', models.BigIntegerField(default=0, editable=False, help_text='Number of views in the last 7 days')),
+                ('views_30_days', models.BigIntegerField(default=0, editable=False, help_text='Number of views in the last 30 days')),
+                ('views_365_days', models.BigIntegerField(default=0, editable=False, help_text='Number of views in the last 365 days')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatsSummary',
+            fields=[
+                ('name', models.CharField(editable=False, max_length=64, primary_key=True, serialize=False)),
+                ('last_day', models.DateField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='mediaviewtotals',
+            index=models.Index(fields=['-views_7_days', 'media_id'], name='legacysms_views_7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediaviewtotals',
+            index=models.Index(fields=['-views_30_days', 'media_id'], name='legacysms_views_30_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediaviewtotals',
+            index=models.Index(fields=['-views_365_days', 'media_id'], name='legacysms_views_365_idx'),
+        ),
+    ]
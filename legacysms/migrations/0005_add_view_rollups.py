@@ -0,0 +1,75 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('legacysms', '0004_add_view_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaViewsByDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('media_id', models.BigIntegerField(editable=False, help_text='Legacy SMS media id')),
+                ('day', models.DateField(editable=False, help_text='First day of the period')),
+                ('views', models.BigIntegerField(default=0, editable=False, help_text='Number of views in the period')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaViewsByWeek',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('media_id', models.BigIntegerField(editable=False, help_text='Legacy SMS media id')),
+                ('day', models.DateField(editable=False, help_text='First day of the period')),
+                ('views', models.BigIntegerField(default=0, editable=False, help_text='Number of views in the period')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaViewsByMonth',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('media_id', models.BigIntegerField(editable=False, help_text='Legacy SMS media id')),
+                ('day', models.DateField(editable=False, help_text='First day of the period')),
+                ('views', models.BigIntegerField(default=0, editable=False, help_text='Number of views in the period')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MediaViewsByYear',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('media_id', models.BigIntegerField(editable=False, help_text='Legacy SMS media id')),
+                ('day', models.DateField(editable=False, help_text='First day of the period')),
+                ('views', models.BigIntegerField(default=0, editable=False, help_text='Number of views in the period')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='mediaviewsbyday',
+            unique_together={('media_id', 'day')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='mediaviewsbyweek',
+            unique_together={('media_id', 'day')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='mediaviewsbymonth',
+            unique_together={('media_id', 'day')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='mediaviewsbyyear',
+            unique_together={('media_id', 'day')},
+        ),
+    ]
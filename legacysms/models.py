@@ -1,6 +1,22 @@
 from collections import namedtuple
+import datetime
 
-from django.db import models, connection
+from django.db import models
+
+#: Granularity of daily statistics
+DAY = 'day'
+
+#: Granularity of weekly statistics. Weeks start on Monday.
+WEEK = 'week'
+
+#: Granularity of monthly statistics
+MONTH = 'month'
+
+#: Granularity of yearly statistics
+YEAR = 'year'
+
+#: Supported granularities of statistics
+GRANULARITIES = (DAY, WEEK, MONTH, YEAR)
 
 
 class MediaItem(models.Model):
@@ -25,20 +41,25 @@ class MediaItem(models.Model):
 
     ResultRow = namedtuple('ResultRow', 'day num_hits')
 
-    def fetch_analytics(self):
+    def fetch_analytics(self, start=None, end=None, granularity=DAY):
         """
-        A helper method that returns legacy statistics for the media item.
+        A helper method that returns legacy statistics for the media item as an iterator of
+        :py:attr:`~.ResultRow` tuples in order of increasing day. The statistics are read from the
+        rollup model for *granularity*, one of :py:data:`~.GRANULARITIES`, and the day of each row
+        is the first day of its period. If *start* or *end* are not ``None``, only periods which
+        overlap the range from *start* to *end* inclusive are returned.
 
         """
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "SELECT day, num_hits FROM stats.media_stats_by_day WHERE media_id=%s",
-                [self.id]
-            )
-            return [
-                MediaItem.ResultRow._make(row)
-                for row in cursor.fetchall()
-            ]
+        rollups = ROLLUP_MODELS[granularity].objects.filter(media_id=self.id)
+        if start is not None:
+            rollups = rollups.filter(day__gte=ROLLUP_MODELS[granularity].period_start(start))
+        if end is not None:
+            rollups = rollups.filter(day__lte=end)
+
+        return (
+            MediaItem.ResultRow._make(row)
+            for row in rollups.order_by('day').values_list('day', 'views').iterator()
+        )
 
     def __str__(self):
         return 'Legacy SMS media item {}'.format(self.id)
@@ -75,3 +96,134 @@ class Collection(models.Model):
 
     def __str__(self):
         return 'Legacy SMS collection {}'.format(self.id)
+
+
+class MediaViewTotals(models.Model):
+    """
+    The number of views of a legacy SMS media item over rolling windows of days ending on the last
+    day included in the :py:data:`legacysms.analytics.VIEW_TOTALS` summary. Totals are maintained
+    by :py:func:`legacysms.analytics.update_view_totals` from the ``stats.media_stats_by_day``
+    table. Items with no views in the longest window have no totals.
+
+    """
+    #: SMS media id
+    media_id = models.BigIntegerField(
+        primary_key=True, editable=False, help_text='Legacy SMS media id')
+
+    #: Number of views in the last 7 days
+    views_7_days = models.BigIntegerField(
+        default=0, editable=False, help_text='Number of views in the last 7 days')
+
+    #: Number of views in the last 30 days
+    views_30_days = models.BigIntegerField(
+        default=0, editable=False, help_text='Number of views in the last 30 days')
+
+    #: Number of views in the last 365 days
+    views_365_days = models.BigIntegerField(
+        default=0, editable=False, help_text='Number of views in the last 365 days')
+
+    class Meta:
+        indexes = (
+            models.Index(fields=['-views_7_days', 'media_id'], name='legacysms_views_7_idx'),
+            models.Index(fields=['-views_30_days', 'media_id'], name='legacysms_views_30_idx'),
+            models.Index(fields=['-views_365_days', 'media_id'], name='legacysms_views_365_idx'),
+        )
+
+    def __str__(self):
+        return 'View totals for legacy SMS media item {}'.format(self.media_id)
+
+
+class StatsSummary(models.Model):
+    """
+    Records how much of the ``stats.media_stats_by_day`` table has been included in a summary
+    table so that the summary can be updated incrementally.
+
+    """
+    #: Name of the summary
+    name = models.CharField(max_length=64, primary_key=True, editable=False)
+
+    #: Last day of statistics included in the summary. NULL if the summary has not been computed.
+    last_day = models.DateField(null=True, editable=False)
+
+    #: Time at which the summary was last updated
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return 'Statistics summary {}'.format(self.name)
+
+
+class MediaViewsRollup(models.Model):
+    """
+    An abstract model for the number of views of a legacy SMS media item in each period of some
+    granularity. Rollups are maintained by :py:func:`legacysms.analytics.update_view_rollups` from
+    the ``stats.media_stats_by_day`` table. Periods with no views have no row.
+
+    """
+    #: SMS media id
+    media_id = models.BigIntegerField(editable=False, help_text='Legacy SMS media id')
+
+    #: First day of the period
+    day = models.DateField(editable=False, help_text='First day of the period')
+
+    #: Number of views in the period
+    views = models.BigIntegerField(
+        default=0, editable=False, help_text='Number of views in the period')
+
+    class Meta:
+        abstract = True
+        unique_together = (('media_id', 'day'),)
+
+    #: Granularity of the periods. Overridden in subclasses.
+    granularity = None
+
+    @classmethod
+    def period_start(cls, day):
+        """Return the first day of the period containing *day*."""
+        raise NotImplementedError()
+
+    def __str__(self):
+        return 'Views of legacy SMS media item {} in {} starting {}'.format(
+            self.media_id, self.granularity, self.day)
+
+
+class MediaViewsByDay(MediaViewsRollup):
+    """The number of views of a legacy SMS media item on each day."""
+    granularity = DAY
+
+    @classmethod
+    def period_start(cls, day):
+        return day
+
+
+class MediaViewsByWeek(MediaViewsRollup):
+    """The number of views of a legacy SMS media item in each week."""
+    granularity = WEEK
+
+    @classmethod
+    def period_start(cls, day):
+        return day - datetime.timedelta(days=day.weekday())
+
+
+class MediaViewsByMonth(MediaViewsRollup):
+    """The number of views of a legacy SMS media item in each month."""
+    granularity = MONTH
+
+    @classmethod
+    def period_start(cls, day):
+        return day.replace(day=1)
+
+
+class MediaViewsByYear(MediaViewsRollup):
+    """The number of views of a legacy SMS media item in each year."""
+    granularity = YEAR
+
+    @classmethod
+    def period_start(cls, day):
+        return day.replace(month=1, day=1)
+
+
+#: Rollup models keyed by granularity
+ROLLUP_MODELS = {
+    model.granularity: model
+    for model in (MediaViewsByDay, MediaViewsByWeek, MediaViewsByMonth, MediaViewsByYear)
+}
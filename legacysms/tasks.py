@@ -0,0 +1,28 @@
+"""
+Celery tasks.
+
+"""
+from celery import shared_task
+
+from . import analytics
+
+
+@shared_task(name='legacysms.update_view_totals')
+def update_view_totals():
+    """
+    Update the rolling view totals of legacy SMS media items to include yesterday's statistics.
+    This task should be scheduled to run daily. See :py:mod:`legacysms.analytics`.
+
+    """
+    analytics.update_view_totals()
+
+
+@shared_task(name='legacysms.update_view_rollups')
+def update_view_rollups():
+    """
+    Update the daily, weekly, monthly and yearly view rollups of legacy SMS media items to include
+    yesterday's statistics. This task should be scheduled to run daily. See
+    :py:mod:`legacysms.analytics`.
+
+    """
+    analytics.update_view_rollups()
@@ -0,0 +1,102 @@
+import datetime
+
+from django.test import TestCase
+
+from api.tests import add_stat, create_stats_table, delete_stats_table
+
+from .. import analytics
+from .. import models
+
+
+class UpdateViewTotalsTestCase(TestCase):
+    def setUp(self):
+        create_stats_table()
+        self.addCleanup(delete_stats_table)
+
+        self.day = datetime.date(2018, 6, 1)
+        for days_ago, num_hits in [(0, 3), (10, 4), (100, 5), (400, 6)]:
+            add_stat(day=self.day - datetime.timedelta(days=days_ago), num_hits=num_hits,
+                     media_id=1)
+        add_stat(day=self.day - datetime.timedelta(days=360), num_hits=7, media_id=2)
+        add_stat(day=self.day - datetime.timedelta(days=400), num_hits=8, media_id=3)
+
+    def test_totals(self):
+        """Views are totalled over each window ending on the last day."""
+        self.assertEqual(analytics.update_view_totals(self.day), 2)
+        self.assertEqual(self.totals(), {1: (3, 7, 12), 2: (0, 0, 7)})
+
+    def test_incremental(self):
+        """Incrementally updated totals match totals computed from scratch."""
+        analytics.update_view_totals(self.day)
+        add_stat(day=self.day + datetime.timedelta(days=1), num_hits=2, media_id=1)
+        analytics.update_view_totals(self.day + datetime.timedelta(days=10))
+        self.assertEqual(self.totals(), {1: (0, 9, 14)})
+        incremental_totals = self.totals()
+
+        models.StatsSummary.objects.filter(name=analytics.VIEW_TOTALS).update(last_day=None)
+        analytics.update_view_totals(self.day + datetime.timedelta(days=10))
+        self.assertEqual(self.totals(), incremental_totals)
+
+    def test_already_updated(self):
+        """Totals are not changed if they already include the last day."""
+        analytics.update_view_totals(self.day)
+        add_stat(day=self.day, num_hits=10, media_id=2)
+        self.assertEqual(analytics.update_view_totals(self.day), 0)
+        self.assertEqual(self.totals()[2], (0, 0, 7))
+
+    def totals(self):
+        return {
+            totals.media_id: (totals.views_7_days, totals.views_30_days, totals.views_365_days)
+            for totals in models.MediaViewTotals.objects.all()
+        }
+
+
+class UpdateViewRollupsTestCase(TestCase):
+    def setUp(self):
+        create_stats_table()
+        self.addCleanup(delete_stats_table)
+
+        # 2018-05-30 is a Wednesday
+        add_stat(day=datetime.date(2018, 5, 30), num_hits=3, media_id=1)
+        add_stat(day=datetime.date(2018, 5, 30), num_hits=3, media_id=1)
+        add_stat(day=datetime.date(2018, 6, 1), num_hits=4, media_id=1)
+        add_stat(day=datetime.date(2018, 6, 4), num_hits=5, media_id=1)
+        add_stat(day=datetime.date(2018, 6, 1), num_hits=7, media_id=2)
+
+    def test_rollups(self):
+        """Views are summed over each period."""
+        self.assertEqual(analytics.update_view_rollups(datetime.date(2018, 6, 3)), 3)
+        self.assertEqual(self.rollups(models.MediaViewsByDay), {
+            datetime.date(2018, 5, 30): 6, datetime.date(2018, 6, 1): 4})
+        self.assertEqual(self.rollups(models.MediaViewsByWeek), {datetime.date(2018, 5, 28): 10})
+        self.assertEqual(self.rollups(models.MediaViewsByMonth), {
+            datetime.date(2018, 5, 1): 6, datetime.date(2018, 6, 1): 4})
+        self.assertEqual(self.rollups(models.MediaViewsByYear), {datetime.date(2018, 1, 1): 10})
+
+    def test_incremental(self):
+        """Only views on new days are added to the rollups."""
+        analytics.update_view_rollups(datetime.date(2018, 6, 3))
+        self.assertEqual(analytics.update_view_rollups(datetime.date(2018, 6, 3)), 0)
+        self.assertEqual(analytics.update_view_rollups(datetime.date(2018, 6, 10)), 1)
+        self.assertEqual(self.rollups(models.MediaViewsByWeek), {
+            datetime.date(2018, 5, 28): 10, datetime.date(2018, 6, 4): 5})
+        self.assertEqual(self.rollups(models.MediaViewsByMonth), {
+            datetime.date(2018, 5, 1): 6, datetime.date(2018, 6, 1): 9})
+        self.assertEqual(self.rollups(models.MediaViewsByYear), {datetime.date(2018, 1, 1): 15})
+
+    def test_fetch_analytics(self):
+        """Legacy media items fetch views from the rollups."""
+        analytics.update_view_rollups(datetime.date(2018, 6, 10))
+        item = models.MediaItem(id=1)
+        self.assertEqual(
+            [(row.day, row.num_hits) for row in item.fetch_analytics(granularity=models.WEEK)],
+            [(datetime.date(2018, 5, 28), 10), (datetime.date(2018, 6, 4), 5)])
+        self.assertEqual(
+            [(row.day, row.num_hits) for row in item.fetch_analytics(
+                start=datetime.date(2018, 5, 31), end=datetime.date(2018, 6, 3))],
+            [(datetime.date(2018, 6, 1), 4)])
+
+    def rollups(self, model, media_id=1):
+        return {
+            rollup.day: rollup.views for rollup in model.objects.filter(media_id=media_id)
+        }
@@ -178,8 +178,9 @@ class MediaItemAdmin(VersionAdmin):
         """Allow searching by tag in addition to search_fields."""
         queryset, use_distinct = super().get_search_results(request, queryset, search_term)
 
-        # Also match on tags
-        queryset |= self.model.objects.filter(tags__contains=[search_term.lower()])
+        # Also match on tags. The containment operator is supported by the GIN index on tags.
+        if search_term != '':
+            queryset |= self.model.objects.filter(tags__contains=[search_term.lower()])
 
         return queryset, use_distinct
 
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db import models
 
 
 class Config(AppConfig):
@@ -8,3 +9,19 @@ class Config(AppConfig):
 
     #: The human-readable verbose name for this application.
     verbose_name = 'Media Platform'
+
+    def ready(self):
+        """
+        Perform application initialisation once the Django platform has been initialised.
+
+        """
+        # Register our custom lookups
+        from . import lookups
+        models.CharField.register_lookup(lookups.TrigramWordSimilar)
+        models.TextField.register_lookup(lookups.TrigramWordSimilar)
+
+        # Import, and thereby register, our custom signal handlers
+        from . import signalhandlers  # noqa: F401
+
+        # Import, and thereby register, our tasks
+        from . import tasks  # noqa: F401
@@ -0,0 +1,53 @@
+"""
+Helpers for updating many model instances at once.
+
+"""
+from django.db import models, transaction
+from django.db.models import functions
+
+#: Default number of objects updated by each UPDATE statement issued by :py:func:`~.bulk_update`.
+DEFAULT_BATCH_SIZE = 500
+
+
+def bulk_update(objs, fields, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Update the database columns for *fields* from the values on each object in *objs* using one
+    UPDATE statement per batch of *batch_size* objects. Returns the number of rows updated.
+
+    This has the same semantics as :py:meth:`django.db.models.query.QuerySet.bulk_update` from
+    Django 2.2 which we cannot use yet. As with that method, no signals are sent and neither
+    :py:meth:`~django.db.models.Model.save` nor ``auto_now`` fields are processed.
+
+    """
+    objs = list(objs)
+    if len(objs) == 0 or len(fields) == 0:
+        return 0
+
+    model = type(objs[0])
+    model_fields = [model._meta.get_field(name) for name in fields]
+    if any(field.primary_key or not field.concrete or field.many_to_many
+           for field in model_fields):
+        raise ValueError('bulk_update() can only be used with concrete, non-primary key fields')
+    if any(obj.pk is None for obj in objs):
+        raise ValueError('All bulk_update() objects must have a primary key set')
+
+    n_updated = 0
+    with transaction.atomic(savepoint=False):
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            updates = {}
+            for field in model_fields:
+                # Each value is wrapped in CASE WHEN pk = ... THEN ... and the whole CASE cast to
+                # the column type since PostgreSQL cannot otherwise infer the type of, e.g.,
+                # arrays.
+                case = models.Case(*[
+                    models.When(
+                        pk=obj.pk,
+                        then=models.Value(getattr(obj, field.attname), output_field=field))
+                    for obj in batch
+                ], output_field=field)
+                updates[field.attname] = functions.Cast(case, output_field=field)
+            n_updated += model._base_manager.filter(
+                pk__in=[obj.pk for obj in batch]).update(**updates)
+
+    return n_updated
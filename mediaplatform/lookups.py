@@ -0,0 +1,19 @@
+"""
+Custom lookups for model fields. These are registered in
+:py:meth:`mediaplatform.apps.Config.ready`.
+
+"""
+from django.contrib.postgres.lookups import PostgresSimpleLookup
+
+
+class TrigramWordSimilar(PostgresSimpleLookup):
+    """
+    A lookup which is true if the value is similar to some word or part of a word in the field
+    according to the pg_trgm extension's ``word_similarity()`` function. Like
+    :py:class:`django.contrib.postgres.lookups.TrigramSimilar`, it can make use of a trigram index.
+
+    This matches the lookup of the same name in Django 3.0.
+
+    """
+    lookup_name = 'trigram_word_similar'
+    operator = '%%>'
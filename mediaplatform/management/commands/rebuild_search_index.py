@@ -0,0 +1,20 @@
+"""
+The ``rebuild_search_index`` management command re-creates the index maintained by the search
+backend from the database. See :py:mod:`mediaplatform.searchbackends`.
+
+"""
+from django.core.management.base import BaseCommand
+
+from mediaplatform import searchbackends
+
+
+class Command(BaseCommand):
+    help = 'Re-create the search index from the media items in the database.'
+
+    def handle(self, *args, **options):
+        backend = searchbackends.get_backend()
+        if not backend.indexes_media_items:
+            self.stdout.write(f'{type(backend).__name__} does not maintain an index')
+            return
+        backend.rebuild()
+        self.stdout.write('Search index rebuilt')
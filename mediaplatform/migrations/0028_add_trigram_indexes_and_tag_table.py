@@ -0,0 +1,89 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+# Tables and columns which get a trigram index to support prefix and fuzzy matching.
+TRIGRAM_INDEXES = [
+    ('mediaplatform_mediaitem', 'title'),
+    ('mediaplatform_channel', 'title'),
+    ('mediaplatform_playlist', 'title'),
+    ('mediaplatform_tag', 'name'),
+]
+
+# Raw SQL which creates the trigram indexes. Django 2.1's GinIndex does not support specifying an
+# operator class and so we create them directly.
+CREATE_INDEXES_SQL = [
+    f'CREATE INDEX {table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops);'
+    for table, column in TRIGRAM_INDEXES
+]
+
+# Drop the indexes created by CREATE_INDEXES_SQL.
+DROP_INDEXES_SQL = [
+    f'DROP INDEX {table}_{column}_trgm;' for table, column in TRIGRAM_INDEXES
+]
+
+# Raw SQL which creates a trigger which ensures that the tag table contains all tags used by media
+# items.
+CREATE_TRIGGER_SQL = [
+    # A function intended to be run as a trigger on the mediaplatform.MediaItem table which adds any
+    # new tags to the tag table.
+    r'''
+    CREATE FUNCTION mediaplatform_mediaitem_tagsupdate_trigger() RETURNS trigger AS $$
+    begin
+        INSERT INTO mediaplatform_tag (name)
+            SELECT DISTINCT tag FROM unnest(new.tags) AS tag WHERE tag <> ''
+        ON CONFLICT DO NOTHING;
+        return new;
+    end
+    $$ LANGUAGE plpgsql;
+    ''',
+
+    # A trigger on the mediaplatform.MediaItem table which updates the tag table if the tags change
+    # or if a new row is inserted.
+    r'''
+    CREATE
+        TRIGGER mediaplatform_mediaitem_tagsupdate
+    AFTER
+        INSERT OR UPDATE OF tags
+    ON
+        mediaplatform_mediaitem
+    FOR EACH ROW
+        EXECUTE PROCEDURE mediaplatform_mediaitem_tagsupdate_trigger();
+    ''',
+
+    # Populate the tag table from existing media items.
+    r'''
+    INSERT INTO mediaplatform_tag (name)
+        SELECT DISTINCT tag FROM mediaplatform_mediaitem, unnest(tags) AS tag WHERE tag <> ''
+    ON CONFLICT DO NOTHING;
+    ''',
+]
+
+# Drop the trigger and trigger function created by CREATE_TRIGGER_SQL.
+DROP_TRIGGER_SQL = [
+    r'''
+    DROP TRIGGER mediaplatform_mediaitem_tagsupdate ON mediaplatform_mediaitem;
+    ''',
+    r'''
+    DROP FUNCTION mediaplatform_mediaitem_tagsupdate_trigger;
+    ''',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaplatform', '0027_create_transcription_request_model'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('name', models.CharField(editable=False, max_length=256, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.RunSQL(CREATE_INDEXES_SQL, DROP_INDEXES_SQL),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
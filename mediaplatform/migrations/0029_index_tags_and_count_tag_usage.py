@@ -0,0 +1,118 @@
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+# Raw SQL which replaces the tag trigger from migration 0028 with one which also maintains the
+# number of non-deleted media items with each tag. Only the difference between the old and new
+# tags of a row is applied so that the counts are maintained incrementally.
+CREATE_TRIGGER_SQL = [
+    r'''
+    DROP TRIGGER mediaplatform_mediaitem_tagsupdate ON mediaplatform_mediaitem;
+    ''',
+
+    # A function intended to be run as a trigger on the mediaplatform.MediaItem table which adds any
+    # new tags to the tag table and updates the item counts of tags which were added or removed. A
+    # deleted item counts as having no tags.
+    r'''
+    CREATE OR REPLACE FUNCTION mediaplatform_mediaitem_tagsupdate_trigger() RETURNS trigger AS $$
+    declare
+        old_tags text[] := '{}';
+        new_tags text[] := '{}';
+    begin
+        IF TG_OP <> 'INSERT' AND old.deleted_at IS NULL THEN
+            old_tags := old.tags;
+        END IF;
+        IF TG_OP <> 'DELETE' AND new.deleted_at IS NULL THEN
+            new_tags := new.tags;
+        END IF;
+
+        INSERT INTO mediaplatform_tag (name, item_count)
+            SELECT tag, 1 FROM (
+                SELECT unnest(new_tags) EXCEPT SELECT unnest(old_tags)
+            ) AS added(tag) WHERE tag <> ''
+        ON CONFLICT (name) DO UPDATE SET item_count = mediaplatform_tag.item_count + 1;
+
+        UPDATE mediaplatform_tag SET item_count = item_count - 1
+            WHERE name IN (SELECT unnest(old_tags) EXCEPT SELECT unnest(new_tags));
+
+        return NULL;
+    end
+    $$ LANGUAGE plpgsql;
+    ''',
+
+    # A trigger on the mediaplatform.MediaItem table which updates the tag table if the tags or
+    # deletion time change or if a row is inserted or deleted.
+    r'''
+    CREATE
+        TRIGGER mediaplatform_mediaitem_tagsupdate
+    AFTER
+        INSERT OR DELETE OR UPDATE OF tags, deleted_at
+    ON
+        mediaplatform_mediaitem
+    FOR EACH ROW
+        EXECUTE PROCEDURE mediaplatform_mediaitem_tagsupdate_trigger();
+    ''',
+
+    # Populate the counts from existing media items.
+    r'''
+    UPDATE mediaplatform_tag SET item_count = counts.item_count
+    FROM (
+        SELECT tag, COUNT(DISTINCT id) AS item_count
+        FROM mediaplatform_mediaitem, unnest(tags) AS tag
+        WHERE deleted_at IS NULL
+        GROUP BY tag
+    ) AS counts
+    WHERE mediaplatform_tag.name = counts.tag;
+    ''',
+]
+
+# Restore the trigger and trigger function created by migration 0028.
+DROP_TRIGGER_SQL = [
+    r'''
+    DROP TRIGGER mediaplatform_mediaitem_tagsupdate ON mediaplatform_mediaitem;
+    ''',
+    r'''
+    CREATE OR REPLACE FUNCTION mediaplatform_mediaitem_tagsupdate_trigger() RETURNS trigger AS $$
+    begin
+        INSERT INTO mediaplatform_tag (name)
+            SELECT DISTINCT tag FROM unnest(new.tags) AS tag WHERE tag <> ''
+        ON CONFLICT DO NOTHING;
+        return new;
+    end
+    $$ LANGUAGE plpgsql;
+    ''',
+    r'''
+    CREATE
+        TRIGGER mediaplatform_mediaitem_tagsupdate
+    AFTER
+        INSERT OR UPDATE OF tags
+    ON
+        mediaplatform_mediaitem
+    FOR EACH ROW
+        EXECUTE PROCEDURE mediaplatform_mediaitem_tagsupdate_trigger();
+    ''',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaplatform', '0028_add_trigram_indexes_and_tag_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='item_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Number of media items with this tag'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-item_count', 'name'], name='mediaplatfo_tag_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mediaitem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tags'], name='mediaplatfo_tags_gin'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,22 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import mediaplatform.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaplatform', '0029_index_tags_and_count_tag_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedMediaItems',
+            fields=[
+                ('item', models.OneToOneField(editable=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='related_items', serialize=False, to='mediaplatform.MediaItem')),
+                ('related_ids', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=11), default=mediaplatform.models._blank_array, editable=False, help_text='Ids of related media items in order of decreasing relevance', size=None)),
+                ('computed_at', models.DateTimeField(editable=False)),
+            ],
+        ),
+    ]
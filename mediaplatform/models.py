@@ -287,6 +287,7 @@ class MediaItem(models.Model):
             models.Index(fields=['published_at']),
             models.Index(fields=['deleted_at']),
             pgindexes.GinIndex(fields=['text_search_vector']),
+            pgindexes.GinIndex(fields=['tags'], name='mediaplatfo_tags_gin'),
         )
 
     VIDEO = 'video'
@@ -391,10 +392,21 @@ class MediaItem(models.Model):
     @cached_property
     def fetched_analytics(self):
         """
-        A cached property which returns legacy statistics if the media item is a legacy item.
+        A cached property which returns legacy daily statistics if the media item is a legacy
+        item.
 
         """
-        return self.sms.fetch_analytics() if hasattr(self, 'sms') else []
+        return list(self.fetch_analytics())
+
+    def fetch_analytics(self, start=None, end=None, granularity='day'):
+        """
+        Return an iterable of legacy statistics if the media item is a legacy item. See
+        :py:meth:`legacysms.models.MediaItem.fetch_analytics` for the arguments.
+
+        """
+        if not hasattr(self, 'sms'):
+            return []
+        return self.sms.fetch_analytics(start=start, end=end, granularity=granularity)
 
     @cached_property
     def fetched_size(self):
@@ -574,6 +586,24 @@ class ChannelQuerySet(PermissionQuerySetMixin, models.QuerySet):
         """
         return self.filter(self._editable_condition(user))
 
+    def annotate_has_edit_permission(self, user, name='has_edit_permission'):
+        """
+        Annotate the query set with a boolean indicating if the user has the edit permission for
+        the channel. Unlike :py:meth:`~.annotate_editable`, SMS-derived channels are not excluded
+        and so this is suitable for read-only resources which are reserved for editors.
+
+        """
+        return self.annotate(**{
+            name: models.Case(
+                models.When(
+                    self._permission_condition('edit_permission', user),
+                    then=models.Value(True)
+                ),
+                default=models.Value(False),
+                output_field=models.BooleanField()
+            ),
+        })
+
 
 class ChannelManager(models.Manager):
     """
@@ -966,6 +996,94 @@ class TranscriptionRequest(models.Model):
         )
 
 
+class TagQuerySet(models.QuerySet):
+    def applied_to_any(self, media_items):
+        """
+        Filter the queryset to only those tags which are applied to at least one of the media
+        items in the *media_items* queryset. Each tag is checked by looking for an item whose tags
+        contain it, which can use the GIN index on :py:attr:`MediaItem.tags`, and so this should be
+        applied to querysets which are already narrowed down to a few tags or which are sliced.
+
+        """
+        items_with_tag = media_items.filter(tags__contains=models.Func(
+            models.OuterRef('name'), function='ARRAY', template='%(function)s[%(expressions)s]',
+            output_field=pgfields.ArrayField(models.CharField(max_length=256))))
+
+        return (
+            self.annotate(applied_to_item=models.Exists(items_with_tag))
+            .filter(applied_to_item=True)
+        )
+
+    def viewable_by_user(self, user):
+        """
+        Filter the queryset to only those tags which are applied to a media item which can be
+        viewed by the passed Django user. See :py:meth:`~.applied_to_any`.
+
+        """
+        # Users who may view all items may view any tag which is in use.
+        if user is not None and user.has_perm('mediaplatform.view_mediaitem'):
+            return self.filter(item_count__gt=0)
+
+        return self.applied_to_any(MediaItem.objects.all().viewable_by_user(user))
+
+
+class Tag(models.Model):
+    """
+    A distinct tag which has been applied to a media item. The tags themselves are stored in
+    :py:attr:`MediaItem.tags`. This table exists so that the set of tags can be searched
+    efficiently and is maintained by a database trigger when media items are created, deleted or
+    their tags change. It should not be modified directly.
+
+    The name has a trigram index to support prefix and fuzzy matching.
+
+    The number of items with each tag is updated incrementally by the same trigger and so is
+    correct whether items are changed by the API, the admin or the JWP synchronisation. Tags are
+    not removed when their count drops to zero.
+
+    """
+    class Meta:
+        indexes = (
+            models.Index(fields=['-item_count', 'name'], name='mediaplatfo_tag_count_idx'),
+        )
+
+    #: Tag as it appears on media items
+    name = models.CharField(max_length=256, primary_key=True, editable=False)
+
+    #: Number of media items which are not deleted and have this tag
+    item_count = models.IntegerField(
+        default=0, editable=False, help_text='Number of media items with this tag')
+
+    objects = TagQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+
+class RelatedMediaItems(models.Model):
+    """
+    The media items most related to a media item. Related items are precomputed by
+    :py:func:`mediaplatform.related.update_related_items` since finding them requires comparing an
+    item with many others. The related items include items the user may not be able to view and
+    so must be filtered by permission when they are used.
+
+    """
+    #: Media item whose related items these are
+    item = models.OneToOneField(
+        MediaItem, primary_key=True, on_delete=models.CASCADE, related_name='related_items',
+        editable=False)
+
+    #: Ids of related media items in order of decreasing relevance
+    related_ids = pgfields.ArrayField(
+        models.CharField(max_length=_TOKEN_LENGTH), default=_blank_array, editable=False,
+        help_text='Ids of related media items in order of decreasing relevance')
+
+    #: Time at which the related items were computed
+    computed_at = models.DateTimeField(editable=False)
+
+    def __str__(self):
+        return f'Related items for {self.item_id}'
+
+
 @receiver(post_save, sender=MediaItem)
 def _media_item_post_save_handler(*args, sender, instance, created, raw, **kwargs):
     """
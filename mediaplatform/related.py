@@ -0,0 +1,126 @@
+"""
+Precomputed related media items.
+
+Finding the media items related to an item compares it with every other item which shares a
+channel, a playlist or a tag with it or whose text matches its title. This is too expensive to do
+on every page view and so :py:func:`~.update_related_items` computes the most related items for
+each media item in advance and stores their ids in
+:py:class:`mediaplatform.models.RelatedMediaItems`. The
+:py:func:`mediaplatform.tasks.update_related_items` task is intended to be scheduled to run
+periodically, e.g. nightly.
+
+The relatedness score of a candidate item is the weighted sum of:
+
+* whether it is in the same channel,
+* the number of playlists which contain both items,
+* the number of tags the items share, and
+* the full-text rank of the candidate for any of the words in the item's title.
+
+Related items are computed by a single ``INSERT ... SELECT`` statement for each batch of items.
+
+"""
+from django.db import connection
+
+from . import models
+
+#: Maximum number of related items stored for each media item
+MAX_RELATED_ITEMS = 20
+
+#: Score for a candidate in the same channel
+CHANNEL_WEIGHT = 1.0
+
+#: Score for each playlist containing both the item and the candidate
+PLAYLIST_WEIGHT = 2.0
+
+#: Score for each tag shared by the item and the candidate
+TAG_WEIGHT = 1.0
+
+#: Multiplier for the full-text rank of the candidate for the words in the item's title. Ranks are
+#: usually less than 0.1.
+TEXT_WEIGHT = 10.0
+
+#: Number of media items whose related items are computed by each statement
+DEFAULT_BATCH_SIZE = 200
+
+# The title of the item is converted to a query which matches any of its words by replacing the
+# "&" operators in the query returned by plainto_tsquery() with "|".
+_UPDATE_SQL = '''
+    INSERT INTO mediaplatform_relatedmediaitems (item_id, related_ids, computed_at)
+    SELECT
+        item.id,
+        ARRAY(
+            SELECT candidate.id
+            FROM mediaplatform_mediaitem AS candidate
+            WHERE
+                candidate.id <> item.id
+                AND candidate.deleted_at IS NULL
+                AND (
+                    candidate.channel_id = item.channel_id
+                    OR candidate.tags && item.tags
+                    OR candidate.text_search_vector @@ item_query.query
+                    OR candidate.id IN (
+                        SELECT unnest(playlist.media_items)
+                        FROM mediaplatform_playlist AS playlist
+                        WHERE
+                            playlist.deleted_at IS NULL
+                            AND playlist.media_items @> ARRAY[item.id]
+                    )
+                )
+            ORDER BY
+                (
+                    CASE
+                        WHEN candidate.channel_id = item.channel_id THEN %(channel_weight)s
+                        ELSE 0
+                    END
+                    + %(playlist_weight)s * (
+                        SELECT COUNT(*) FROM mediaplatform_playlist AS playlist
+                        WHERE
+                            playlist.deleted_at IS NULL
+                            AND playlist.media_items @> ARRAY[item.id, candidate.id]
+                    )
+                    + %(tag_weight)s * cardinality(ARRAY(
+                        SELECT unnest(candidate.tags) INTERSECT SELECT unnest(item.tags)
+                    ))
+                    + %(text_weight)s * ts_rank(candidate.text_search_vector, item_query.query)
+                ) DESC,
+                candidate.id
+            LIMIT %(limit)s
+        ),
+        now()
+    FROM
+        mediaplatform_mediaitem AS item
+        CROSS JOIN LATERAL (
+            SELECT
+                replace(plainto_tsquery('pg_catalog.english', item.title)::text, '&', '|')::tsquery
+                AS query
+        ) AS item_query
+    WHERE item.id = ANY(%(item_ids)s)
+    ON CONFLICT (item_id) DO UPDATE
+        SET related_ids = EXCLUDED.related_ids, computed_at = EXCLUDED.computed_at
+'''
+
+
+def update_related_items(item_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Compute and store the related items for the media items with ids in *item_ids*. If
+    *item_ids* is ``None``, related items are computed for all media items which are not deleted.
+    Returns the number of media items whose related items were stored.
+
+    """
+    if item_ids is None:
+        item_ids = models.MediaItem.objects.order_by('id').values_list('id', flat=True)
+    item_ids = list(item_ids)
+
+    count = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(item_ids), batch_size):
+            cursor.execute(_UPDATE_SQL, {
+                'item_ids': item_ids[start:start + batch_size],
+                'channel_weight': CHANNEL_WEIGHT,
+                'playlist_weight': PLAYLIST_WEIGHT,
+                'tag_weight': TAG_WEIGHT,
+                'text_weight': TEXT_WEIGHT,
+                'limit': MAX_RELATED_ITEMS,
+            })
+            count += cursor.rowcount
+    return count
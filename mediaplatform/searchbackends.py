@@ -0,0 +1,599 @@
+"""
+Full-text search backends for media items.
+
+The API's full-text search filter delegates to a *search backend* returned by
+:py:func:`~.get_backend`. The backend is configured by the
+:py:data:`~mediawebapp.settings.base.SEARCH_BACKEND` setting which, like Django's ``CACHES``
+setting, is a dict with the dotted path to a backend class in ``BACKEND`` and keyword arguments for
+its constructor in ``OPTIONS``.
+
+:py:class:`~.PostgresBackend` is the default. It ranks the ``text_search_vector`` of each
+object using PostgreSQL's full-text search.
+
+:py:class:`~.OpenSearchBackend` searches media items using an external `OpenSearch
+<https://opensearch.org/>`_ (or Elasticsearch) compatible engine. Each media item is indexed as a
+document which includes the *principals* allowed to view and edit it and so the engine only returns
+items which the user may view. Documents are sent to the engine in bulk by
+:py:meth:`~.OpenSearchBackend.index_media_items`. Changes to media items are queued by
+:py:func:`~.schedule_index` which is called from signal handlers and the JWP synchronisation and
+are sent by a single task once the surrounding transaction commits. Searches of other resources
+fall back to PostgreSQL.
+
+:py:class:`~.LocalBackend` is an OpenSearch backend whose engine is a
+:py:class:`~.LocalSearchEngine` running in-process. It supports only the requests made by
+:py:class:`~.OpenSearchBackend` and is intended for development and testing without an external
+engine.
+
+"""
+import functools
+import json
+import logging
+import operator
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.signals import setting_changed
+from django.db import models, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import requests
+
+from . import models as mpmodels
+
+LOG = logging.getLogger(__name__)
+
+#: Principal for permissions which allow everyone.
+PUBLIC = 'public'
+
+#: Principal for permissions which allow all signed in users.
+SIGNED_IN = 'signed-in'
+
+#: Mappings used when creating an OpenSearch index for media items.
+MEDIA_ITEM_MAPPINGS = {
+    'properties': {
+        'title': {'type': 'text', 'analyzer': 'english'},
+        'description': {'type': 'text', 'analyzer': 'english'},
+        'tags': {'type': 'text', 'analyzer': 'english'},
+        'published_at': {'type': 'date'},
+        'ready': {'type': 'boolean'},
+        'view_principals': {'type': 'keyword'},
+        'edit_principals': {'type': 'keyword'},
+    },
+}
+
+#: Fields searched in media item documents with their relative weights.
+MEDIA_ITEM_SEARCH_FIELDS = ['title^3', 'tags^2', 'description']
+
+_PENDING = threading.local()
+
+
+@functools.lru_cache(maxsize=1)
+def get_backend():
+    """
+    Return the search backend configured by the SEARCH_BACKEND setting. The backend is created
+    once and shared.
+
+    """
+    config = settings.SEARCH_BACKEND
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def _clear_backend(*args, setting, **kwargs):
+    if setting == 'SEARCH_BACKEND':
+        get_backend.cache_clear()
+
+
+def schedule_index(item_ids):
+    """
+    Schedule the documents for the media items with ids in *item_ids* to be sent to the search
+    backend once the current transaction commits. Ids from all calls within a transaction are sent
+    by a single task. Does nothing if the backend does not index media items.
+
+    """
+    if not get_backend().indexes_media_items:
+        return
+
+    pending = getattr(_PENDING, 'item_ids', None)
+    if pending is None:
+        pending = _PENDING.item_ids = set()
+    pending.update(item_ids)
+
+    # If the transaction is rolled back, the ids remain pending and are sent with those of the next
+    # transaction to commit. Indexing an item which has not changed is harmless.
+    transaction.on_commit(_send_pending)
+
+
+def _send_pending():
+    item_ids = getattr(_PENDING, 'item_ids', None)
+    if not item_ids:
+        return
+    _PENDING.item_ids = set()
+
+    # Imported here to avoid a circular import since tasks imports this module.
+    from . import tasks
+    tasks.index_media_items.delay(sorted(item_ids))
+
+
+def permission_principals(permission):
+    """
+    Return a list of the principals allowed by a :py:class:`mediaplatform.models.Permission`.
+
+    """
+    principals = []
+    if permission.is_public:
+        principals.append(PUBLIC)
+    if permission.is_signed_in:
+        principals.append(SIGNED_IN)
+    principals.extend(f'crsid:{crsid}' for crsid in permission.crsids)
+    principals.extend(f'group:{groupid}' for groupid in permission.lookup_groups)
+    principals.extend(f'inst:{instid}' for instid in permission.lookup_insts)
+    return principals
+
+
+def user_principals(user):
+    """
+    Return a list of the principals which match a user. Any of these principals in a permission
+    grants the user that permission.
+
+    """
+    principals = [PUBLIC]
+    if user is not None and not user.is_anonymous:
+        groupids, instids = mpmodels._lookup_groupids_and_instids_for_user(user)
+        principals.append(SIGNED_IN)
+        principals.append(f'crsid:{user.username}')
+        principals.extend(f'group:{groupid}' for groupid in groupids)
+        principals.extend(f'inst:{instid}' for instid in instids)
+    return principals
+
+
+class PostgresBackend:
+    """
+    Search using PostgreSQL full-text search over the ``text_search_vector`` field of the searched
+    objects. Nothing needs to be indexed since the search vectors are maintained by database
+    triggers.
+
+    """
+    #: Whether media item documents need to be sent to this backend when items change.
+    indexes_media_items = False
+
+    def filter_queryset(self, queryset, terms, *, field, rank_annotation, user):
+        """
+        Filter *queryset* to those objects matching any of the search terms in *terms* and annotate
+        each object with its rank in the annotation named *rank_annotation*. *field* is the name
+        of the search vector field of the objects. *queryset* should already be filtered to those
+        objects *user* may view.
+
+        """
+        query = functools.reduce(operator.or_, (SearchQuery(term) for term in terms))
+        return queryset.annotate(**{
+            rank_annotation: SearchRank(models.F(field), query)
+        }).filter(**{field: query})
+
+    def index_media_items(self, item_ids):
+        """
+        Send the current state of the media items with ids in *item_ids* to the backend. Items
+        which do not exist or are deleted are removed from the backend.
+
+        """
+
+    def rebuild(self):
+        """
+        Re-create any index maintained by the backend from the current state of the database.
+
+        """
+
+
+class OpenSearchBackend(PostgresBackend):
+    """
+    Search media items using an OpenSearch compatible engine. Searches of other resources use
+    PostgreSQL.
+
+    :param url: base URL of the engine
+    :param index: name of the index containing media item documents
+    :param max_results: maximum number of matching media items fetched from the engine for a
+        search. Matches beyond this are not listed and a message is logged when a search reaches
+        the limit.
+    :param bulk_size: number of documents sent to the engine in each bulk request
+    :param timeout: timeout in seconds for requests to the engine
+    :param transport: object used to make requests to the engine. If ``None``, a
+        :py:class:`~.HTTPTransport` for *url* is used.
+
+    """
+    indexes_media_items = True
+
+    def __init__(self, url=None, index='media-items', max_results=1000, bulk_size=500,
+                 timeout=10, transport=None):
+        self.index = index
+        self.max_results = max_results
+        self.bulk_size = bulk_size
+        self.transport = transport if transport is not None else HTTPTransport(url, timeout)
+
+    def filter_queryset(self, queryset, terms, *, field, rank_annotation, user):
+        if not issubclass(queryset.model, mpmodels.MediaItem):
+            return super().filter_queryset(
+                queryset, terms, field=field, rank_annotation=rank_annotation, user=user)
+
+        hits = self.search_media_items(terms, user)
+        if len(hits) == 0:
+            return queryset.none().annotate(**{
+                rank_annotation: models.Value(0, output_field=models.FloatField())
+            })
+
+        # The engine has already applied the permission conditions. The queryset applies them
+        # again so that documents which are out of date cannot reveal items.
+        return queryset.filter(id__in=[id for id, _ in hits]).annotate(**{
+            rank_annotation: models.Case(
+                *[models.When(id=id, then=models.Value(score)) for id, score in hits],
+                default=models.Value(0), output_field=models.FloatField()
+            )
+        })
+
+    def search_media_items(self, terms, user):
+        """
+        Return a list of (id, score) tuples for at most :py:attr:`~.max_results` media items
+        matching *terms* which *user* may view, in order of decreasing score.
+
+        """
+        query = {
+            'bool': {
+                'must': {
+                    'multi_match': {
+                        'query': ' '.join(terms), 'fields': MEDIA_ITEM_SEARCH_FIELDS,
+                    },
+                },
+            },
+        }
+
+        # Users with the view_mediaitem permission may view all items.
+        if user is None or not user.has_perm('mediaplatform.view_mediaitem'):
+            query['bool']['filter'] = self._viewable_filter(user_principals(user))
+
+        response = self.transport.request(
+            'POST', f'/{self.index}/_search',
+            {'size': self.max_results, '_source': False, 'query': query})
+        hits = response['hits']['hits']
+        if len(hits) >= self.max_results:
+            LOG.warning(
+                'Search for %r reached the limit of %s results. Further matches are omitted.',
+                ' '.join(terms), self.max_results)
+        return [(hit['_id'], hit['_score']) for hit in hits]
+
+    def _viewable_filter(self, principals):
+        """
+        Return a query which matches documents of media items which may be viewed by a user with
+        the passed principals. This mirrors
+        :py:meth:`mediaplatform.models.MediaItemQuerySet.viewable_by_user`.
+
+        """
+        return {
+            'bool': {
+                'should': [
+                    {
+                        'bool': {
+                            'filter': [
+                                {'terms': {'view_principals': principals}},
+                                {'term': {'ready': True}},
+                                {
+                                    'bool': {
+                                        'should': [
+                                            {
+                                                'range': {
+                                                    'published_at': {
+                                                        'lte': timezone.now().isoformat(),
+                                                    },
+                                                },
+                                            },
+                                            {
+                                                'bool': {
+                                                    'must_not': {
+                                                        'exists': {'field': 'published_at'},
+                                                    },
+                                                },
+                                            },
+                                        ],
+                                    },
+                                },
+                            ],
+                        },
+                    },
+                    {'terms': {'edit_principals': principals}},
+                ],
+                'minimum_should_match': 1,
+            },
+        }
+
+    def create_index(self):
+        """Create the media item index."""
+        self.transport.request('PUT', f'/{self.index}', {'mappings': MEDIA_ITEM_MAPPINGS})
+
+    def delete_index(self):
+        """Delete the media item index if it exists."""
+        self.transport.request('DELETE', f'/{self.index}', ignore=(404,))
+
+    def rebuild(self):
+        self.delete_index()
+        self.create_index()
+        self.index_media_items(list(
+            mpmodels.MediaItem.objects.order_by('id').values_list('id', flat=True)))
+
+    def index_media_items(self, item_ids):
+        item_ids = list(item_ids)
+        for start in range(0, len(item_ids), self.bulk_size):
+            batch_ids = item_ids[start:start + self.bulk_size]
+            documents = {
+                item.id: media_item_document(item)
+                for item in _media_items_for_indexing(batch_ids)
+            }
+
+            actions = []
+            for id in batch_ids:
+                if id in documents:
+                    actions.extend([{'index': {'_id': id}}, documents[id]])
+                else:
+                    actions.append({'delete': {'_id': id}})
+
+            response = self.transport.request('POST', f'/{self.index}/_bulk', actions)
+            if response.get('errors'):
+                failures = [
+                    item for item in response.get('items', [])
+                    if 'error' in next(iter(item.values()), {})
+                ]
+                LOG.warning(
+                    'Search engine rejected %s of %s actions. First failure: %r',
+                    len(failures), len(batch_ids), failures[:1])
+
+
+class LocalBackend(OpenSearchBackend):
+    """
+    An OpenSearch backend which uses a :py:class:`~.LocalSearchEngine` shared by all instances in
+    the process. Takes the same options as :py:class:`~.OpenSearchBackend` except *url*, *timeout*
+    and *transport*.
+
+    """
+    def __init__(self, **options):
+        super().__init__(transport=LOCAL_ENGINE, **options)
+
+
+def _media_items_for_indexing(item_ids):
+    """
+    Return a queryset of the non-deleted media items with ids in *item_ids* annotated with the
+    values required by :py:func:`~.media_item_document`.
+
+    """
+    return (
+        mpmodels.MediaItem.objects.filter(id__in=item_ids)
+        .select_related('view_permission', 'channel__edit_permission')
+        .annotate(
+            ready=models.Case(
+                models.When(
+                    models.Q(jwp__isnull=False) &
+                    ~models.Q(jwp__resource__data__status='ready'),
+                    then=models.Value(False)
+                ),
+                default=models.Value(True), output_field=models.BooleanField()
+            ),
+            sms_derived=models.Case(
+                models.When(
+                    models.Q(sms__isnull=False) | models.Q(channel__sms__isnull=False),
+                    then=models.Value(True)
+                ),
+                default=models.Value(False), output_field=models.BooleanField()
+            ),
+        )
+    )
+
+
+def media_item_document(item):
+    """
+    Return the document indexed for a media item from the queryset returned by
+    :py:func:`~._media_items_for_indexing`.
+
+    """
+    # As in MediaItemQuerySet, SMS-derived items may not be edited.
+    if item.channel is None or item.sms_derived:
+        edit_principals = []
+    else:
+        edit_principals = permission_principals(item.channel.edit_permission)
+
+    return {
+        'title': item.title,
+        'description': item.description,
+        'tags': item.tags,
+        'published_at': (
+            item.published_at.isoformat() if item.published_at is not None else None),
+        'ready': item.ready,
+        'view_principals': permission_principals(item.view_permission),
+        'edit_principals': edit_principals,
+    }
+
+
+class HTTPTransport:
+    """
+    Make requests to an OpenSearch compatible engine over HTTP.
+
+    """
+    def __init__(self, url, timeout):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, method, path, body=None, ignore=()):
+        """
+        Make a request to the engine and return the decoded response. If *body* is a list, it is
+        sent as newline-delimited JSON as required by the bulk API. Error responses raise
+        :py:exc:`requests.HTTPError` unless their status code is in *ignore*, in which case an
+        empty dict is returned.
+
+        """
+        if isinstance(body, list):
+            data = ''.join(json.dumps(line) + '\n' for line in body)
+            content_type = 'application/x-ndjson'
+        else:
+            data = json.dumps(body) if body is not None else None
+            content_type = 'application/json'
+
+        response = self.session.request(
+            method, self.url + path, data=data, headers={'Content-Type': content_type},
+            timeout=self.timeout)
+        if response.status_code in ignore:
+            return {}
+        response.raise_for_status()
+        return response.json()
+
+
+class LocalSearchEngine:
+    """
+    An in-memory stand-in for an OpenSearch compatible engine. It implements the requests made by
+    :py:class:`~.OpenSearchBackend` with the same interface as :py:class:`~.HTTPTransport`.
+
+    Only the query clauses used by :py:class:`~.OpenSearchBackend` are supported. Text is split
+    into lower case words without stemming and the score of a document is the weighted number of
+    occurrences of the query words.
+
+    """
+    def __init__(self):
+        self.indices = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, path, body=None, ignore=()):
+        parts = path.strip('/').split('/')
+        index = parts[0]
+        with self._lock:
+            if method == 'PUT' and len(parts) == 1:
+                self.indices[index] = {}
+                return {'acknowledged': True}
+            if index not in self.indices:
+                if 404 in ignore:
+                    return {}
+                raise requests.HTTPError(f'404 Client Error: no such index: {index}')
+            if method == 'DELETE' and len(parts) == 1:
+                del self.indices[index]
+                return {'acknowledged': True}
+            if method == 'POST' and parts[1:] == ['_bulk']:
+                return self._bulk(self.indices[index], body)
+            if method == 'POST' and parts[1:] == ['_search']:
+                return self._search(self.indices[index], body)
+        raise ValueError(f'Unsupported request: {method} {path}')
+
+    def _bulk(self, documents, actions):
+        results = []
+        actions = iter(actions)
+        for action in actions:
+            (action_type, metadata), = action.items()
+            if action_type == 'index':
+                documents[metadata['_id']] = next(actions)
+                results.append({'index': {'_id': metadata['_id'], 'status': 200}})
+            elif action_type == 'delete':
+                status = 200 if documents.pop(metadata['_id'], None) is not None else 404
+                results.append({'delete': {'_id': metadata['_id'], 'status': status}})
+            else:
+                raise ValueError(f'Unsupported bulk action: {action_type}')
+        return {'errors': False, 'items': results}
+
+    def _search(self, documents, body):
+        hits = []
+        for id, document in documents.items():
+            score = self._evaluate(body.get('query', {'match_all': {}}), document)
+            if score is not None:
+                hits.append({'_id': id, '_score': score})
+        hits.sort(key=lambda hit: (-hit['_score'], hit['_id']))
+        return {
+            'hits': {
+                'total': {'value': len(hits), 'relation': 'eq'},
+                'hits': hits[:body.get('size', 10)],
+            },
+        }
+
+    def _evaluate(self, query, document):
+        """
+        Return the score of *document* for *query* or ``None`` if it does not match.
+
+        """
+        (query_type, params), = query.items()
+
+        if query_type == 'match_all':
+            return 1.0
+
+        if query_type == 'bool':
+            def as_list(clauses):
+                return clauses if isinstance(clauses, list) else [clauses]
+
+            score = 0.0
+            for clause in as_list(params.get('must', [])):
+                clause_score = self._evaluate(clause, document)
+                if clause_score is None:
+                    return None
+                score += clause_score
+            for clause in as_list(params.get('filter', [])):
+                if self._evaluate(clause, document) is None:
+                    return None
+            for clause in as_list(params.get('must_not', [])):
+                if self._evaluate(clause, document) is not None:
+                    return None
+
+            should_scores = [
+                clause_score for clause_score in (
+                    self._evaluate(clause, document)
+                    for clause in as_list(params.get('should', []))
+                )
+                if clause_score is not None
+            ]
+            default_minimum = 0 if ('must' in params or 'filter' in params) else 1
+            if params.get('should') and (
+                    len(should_scores) < params.get('minimum_should_match', default_minimum)):
+                return None
+            return score + sum(should_scores)
+
+        if query_type == 'multi_match':
+            query_words = _words(params['query'])
+            score = 0.0
+            for field in params['fields']:
+                name, _, boost = field.partition('^')
+                field_words = _words(_field_values(document, name))
+                score += float(boost or 1) * sum(field_words.count(w) for w in query_words)
+            return score if score > 0 else None
+
+        if query_type == 'terms':
+            (name, values), = params.items()
+            matches = any(value in values for value in _field_values(document, name))
+            return 0.0 if matches else None
+
+        if query_type == 'term':
+            (name, value), = params.items()
+            return 0.0 if value in _field_values(document, name) else None
+
+        if query_type == 'exists':
+            return 0.0 if len(_field_values(document, params['field'])) > 0 else None
+
+        if query_type == 'range':
+            (name, bounds), = params.items()
+            comparisons = {
+                'lt': operator.lt, 'lte': operator.le, 'gt': operator.gt, 'gte': operator.ge}
+            for value in _field_values(document, name):
+                if all(comparisons[op](value, bound) for op, bound in bounds.items()):
+                    return 0.0
+            return None
+
+        raise ValueError(f'Unsupported query: {query_type}')
+
+
+def _field_values(document, name):
+    """Return a list of the non-null values of a field in a document."""
+    value = document.get(name)
+    values = value if isinstance(value, list) else [value]
+    return [value for value in values if value is not None]
+
+
+def _words(values):
+    """Return a list of the lower case words in a string or list of strings."""
+    if isinstance(values, str):
+        values = [values]
+    return [word for value in values for word in re.findall(r'\w+', value.lower())]
+
+
+#: The engine used by :py:class:`~.LocalBackend`.
+LOCAL_ENGINE = LocalSearchEngine()
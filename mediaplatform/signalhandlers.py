@@ -0,0 +1,56 @@
+"""
+Register and handle signals for the media platform application. This module is import-ed from
+:py:class:`mediaplatform.apps.Config.ready` so all models should be registered at import time.
+
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import models
+from . import searchbackends
+from . import signals
+
+
+@receiver(post_save, sender=models.MediaItem)
+@receiver(post_delete, sender=models.MediaItem)
+def media_item_changed_handler(*args, instance, raw=False, **kwargs):
+    """
+    Called after a :py:class:`mediaplatform.models.MediaItem` is saved or deleted. The item is
+    re-indexed by the search backend.
+
+    """
+    # If this is a "raw" object create (e.g. part of a test fixture), do not schedule any tasks.
+    if raw:
+        return
+
+    searchbackends.schedule_index([instance.id])
+
+
+@receiver(post_save, sender=models.Permission)
+def permission_post_save_handler(*args, instance, raw, **kwargs):
+    """
+    Called after a :py:class:`mediaplatform.models.Permission` is saved. Media items whose view
+    permission or whose channel's edit permission has changed are re-indexed by the search backend.
+
+    """
+    if raw:
+        return
+
+    if instance.allows_view_item_id is not None:
+        searchbackends.schedule_index([instance.allows_view_item_id])
+
+    if instance.allows_edit_channel_id is not None:
+        searchbackends.schedule_index(
+            models.MediaItem.objects.filter(channel_id=instance.allows_edit_channel_id)
+            .values_list('id', flat=True)
+        )
+
+
+@receiver(signals.media_items_bulk_updated, sender=models.MediaItem)
+def media_items_bulk_updated_handler(*args, item_ids, **kwargs):
+    """
+    Called when media items have been updated in bulk. The items are re-indexed by the search
+    backend.
+
+    """
+    searchbackends.schedule_index(item_ids)
@@ -0,0 +1,12 @@
+"""
+Custom signals sent by the media platform.
+
+"""
+from django.dispatch import Signal
+
+#: Sent after media items have been modified without their save() method being called, e.g. by
+#: :py:func:`mediaplatform.bulk.bulk_update`, and so without a post_save signal being sent for
+#: each. The sender is :py:class:`mediaplatform.models.MediaItem` and *item_ids* is a list of the
+#: ids of the items which were modified. The signal is sent after the modifications have been
+#: committed.
+media_items_bulk_updated = Signal(providing_args=['item_ids'])
@@ -0,0 +1,39 @@
+"""
+Celery tasks.
+
+"""
+from celery import shared_task
+import requests
+
+from . import related
+from . import searchbackends
+
+#: Maximum number of times indexing is retried if the search engine cannot be reached.
+_INDEX_MAX_RETRIES = 10
+
+#: Maximum delay in seconds between attempts to index media items.
+_INDEX_RETRY_BACKOFF_MAX = 600
+
+
+@shared_task(name='mediaplatform.index_media_items',
+             autoretry_for=(requests.ConnectionError, requests.Timeout), retry_backoff=True,
+             retry_backoff_max=_INDEX_RETRY_BACKOFF_MAX, max_retries=_INDEX_MAX_RETRIES)
+def index_media_items(item_ids):
+    """
+    Send the current state of the media items with ids in *item_ids* to the search backend.
+
+    The ids are no longer pending once this task is scheduled and so, if the search engine cannot
+    be reached, the task is retried with exponential backoff rather than the updates being lost.
+
+    """
+    searchbackends.get_backend().index_media_items(item_ids)
+
+
+@shared_task(name='mediaplatform.update_related_items')
+def update_related_items():
+    """
+    Compute the related items of all media items. This task should be scheduled to run
+    periodically. See :py:mod:`mediaplatform.related`.
+
+    """
+    related.update_related_items()
@@ -0,0 +1,49 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import bulk
+from .. import models
+
+
+class BulkUpdateTestCase(TestCase):
+    fixtures = ['mediaplatform/tests/fixtures/test_data.yaml']
+
+    def test_per_object_values(self):
+        """Each object is updated with its own values, including array and date fields."""
+        items = list(models.MediaItem.objects.all()[:3])
+        self.assertEqual(len(items), 3)
+        published_at = timezone.now().replace(microsecond=0)
+        for index, item in enumerate(items):
+            item.title = f'title {index}'
+            item.tags = [f'tag{index}'] * index
+            item.published_at = published_at + datetime.timedelta(days=index)
+
+        self.assertEqual(
+            bulk.bulk_update(items, ['title', 'tags', 'published_at'], batch_size=2), 3)
+
+        for index, item in enumerate(items):
+            item.refresh_from_db()
+            self.assertEqual(item.title, f'title {index}')
+            self.assertEqual(item.tags, [f'tag{index}'] * index)
+            self.assertEqual(item.published_at, published_at + datetime.timedelta(days=index))
+
+    def test_other_fields_unchanged(self):
+        """Fields which are not listed are not written."""
+        item = models.MediaItem.objects.all()[0]
+        original_description = item.description
+        item.title, item.description = 'new title', 'new description'
+        bulk.bulk_update([item], ['title'])
+        item.refresh_from_db()
+        self.assertEqual(item.title, 'new title')
+        self.assertEqual(item.description, original_description)
+
+    def test_no_objects(self):
+        """Passing no objects is a no-op."""
+        self.assertEqual(bulk.bulk_update([], ['title']), 0)
+
+    def test_primary_key_rejected(self):
+        """The primary key cannot be updated."""
+        with self.assertRaises(ValueError):
+            bulk.bulk_update(list(models.MediaItem.objects.all()[:1]), ['id'])
@@ -961,3 +961,67 @@ class TranscriptionRequestTestCase(ModelTestCase):
         self.request.state = None
         with self.assertRaises(IntegrityError):
             self.request.save()
+
+
+class TagTestCase(ModelTestCase):
+    model = models.Tag
+
+    def setUp(self):
+        self.item = models.MediaItem.objects.first()
+
+    def test_tags_added_on_create(self):
+        """Tags of a new media item are added to the tag table."""
+        models.MediaItem.objects.create(tags=['created-tag-1', 'created-tag-2', ''])
+        self.assertTrue(models.Tag.objects.filter(name='created-tag-1').exists())
+        self.assertTrue(models.Tag.objects.filter(name='created-tag-2').exists())
+        self.assertFalse(models.Tag.objects.filter(name='').exists())
+
+    def test_tags_added_on_update(self):
+        """New tags of an existing media item are added to the tag table."""
+        self.item.tags = self.item.tags + ['updated-tag', 'updated-tag']
+        self.item.save()
+        self.assertEqual(models.Tag.objects.filter(name='updated-tag').count(), 1)
+
+    def test_item_count(self):
+        """Item counts follow creation, tag changes, soft deletion and deletion of items."""
+        item1 = models.MediaItem.objects.create(tags=['count-a', 'count-b', 'count-a'])
+        item2 = models.MediaItem.objects.create(tags=['count-a'])
+        self.assertEqual(self.item_counts('count-a', 'count-b', 'count-c'), [2, 1, 0])
+
+        item1.tags = ['count-a', 'count-c']
+        item1.save()
+        self.assertEqual(self.item_counts('count-a', 'count-b', 'count-c'), [2, 0, 1])
+
+        item2.deleted_at = timezone.now()
+        item2.save()
+        self.assertEqual(self.item_counts('count-a', 'count-b', 'count-c'), [1, 0, 1])
+
+        item2.deleted_at = None
+        item2.save()
+        self.assertEqual(self.item_counts('count-a', 'count-b', 'count-c'), [2, 0, 1])
+
+        models.MediaItem.objects_including_deleted.filter(id=item1.id).delete()
+        self.assertEqual(self.item_counts('count-a', 'count-b', 'count-c'), [1, 0, 0])
+
+    def test_trigram_word_similar(self):
+        """The trigram_word_similar lookup allows for typos."""
+        models.MediaItem.objects.create(tags=['thermodynamics'])
+        self.assertTrue(
+            models.Tag.objects.filter(name__trigram_word_similar='thermodynamcis').exists())
+
+    def test_viewable_by_user(self):
+        """Only tags applied to a media item which the user may view are viewable."""
+        public_item = models.MediaItem.objects.create(tags=['viewable-shared', 'viewable-public'])
+        public_item.view_permission.is_public = True
+        public_item.view_permission.save()
+        models.MediaItem.objects.create(tags=['viewable-shared', 'viewable-private'])
+
+        names = ['viewable-shared', 'viewable-public', 'viewable-private']
+        self.assertEqual(
+            set(models.Tag.objects.filter(name__in=names).viewable_by_user(AnonymousUser())
+                .values_list('name', flat=True)),
+            {'viewable-shared', 'viewable-public'})
+
+    def item_counts(self, *names):
+        counts = dict(models.Tag.objects.filter(name__in=names).values_list('name', 'item_count'))
+        return [counts.get(name, 0) for name in names]
@@ -0,0 +1,62 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import models
+from .. import related
+
+
+class UpdateRelatedItemsTestCase(TestCase):
+    fixtures = ['mediaplatform/tests/fixtures/test_data.yaml']
+
+    def setUp(self):
+        channel = models.Channel.objects.first()
+        other_channel = models.Channel.objects.create(billing_account=channel.billing_account)
+
+        def create(**kwargs):
+            return models.MediaItem.objects.create(**kwargs)
+
+        self.item = create(
+            channel=channel, title='Quantum mechanics', tags=['xyzzy-1', 'xyzzy-2'])
+        self.same_channel_and_tags = create(
+            channel=channel, title='Lecture one', tags=['xyzzy-1', 'xyzzy-2'])
+        self.same_playlist = create(channel=other_channel, title='Lecture two')
+        self.same_channel = create(channel=channel, title='Lecture three')
+        self.similar_text = create(channel=other_channel, title='Quantum computing')
+        self.deleted = create(channel=channel, tags=['xyzzy-1'], deleted_at=timezone.now())
+        self.unrelated = create(channel=other_channel, title='Lecture four')
+
+        models.Playlist.objects.create(
+            channel=other_channel, media_items=[self.item.id, self.same_playlist.id])
+
+    def test_related_items(self):
+        """Related items are stored in order of decreasing relevance."""
+        self.assertEqual(related.update_related_items([self.item.id]), 1)
+        related_ids = models.RelatedMediaItems.objects.get(item=self.item).related_ids
+
+        self.assertLessEqual(len(related_ids), related.MAX_RELATED_ITEMS)
+        self.assertNotIn(self.item.id, related_ids)
+        self.assertNotIn(self.deleted.id, related_ids)
+        self.assertNotIn(self.unrelated.id, related_ids)
+        self.assertIn(self.similar_text.id, related_ids)
+
+        expected_order = [
+            self.same_channel_and_tags.id, self.same_playlist.id, self.same_channel.id]
+        self.assertEqual(
+            [id for id in related_ids if id in expected_order], expected_order)
+
+    def test_update(self):
+        """Recomputing related items replaces the stored ids."""
+        related.update_related_items([self.item.id])
+        self.same_channel_and_tags.tags = []
+        self.same_channel_and_tags.channel = None
+        self.same_channel_and_tags.save()
+        related.update_related_items([self.item.id])
+        self.assertNotIn(
+            self.same_channel_and_tags.id,
+            models.RelatedMediaItems.objects.get(item=self.item).related_ids)
+
+    def test_all_items(self):
+        """By default, related items are computed for all items in batches."""
+        count = related.update_related_items(batch_size=2)
+        self.assertEqual(count, models.MediaItem.objects.count())
+        self.assertFalse(models.RelatedMediaItems.objects.filter(item=self.deleted).exists())
@@ -0,0 +1,176 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+import requests
+
+from .. import models
+from .. import searchbackends
+from .. import signals
+from .. import tasks
+
+
+LOCAL_BACKEND = {
+    'BACKEND': 'mediaplatform.searchbackends.LocalBackend',
+    'OPTIONS': {'index': 'test-media-items'},
+}
+
+
+class LocalSearchEngineTestCase(TestCase):
+    def setUp(self):
+        self.engine = searchbackends.LocalSearchEngine()
+        self.engine.request('PUT', '/test', {'mappings': searchbackends.MEDIA_ITEM_MAPPINGS})
+        self.engine.request('POST', '/test/_bulk', [
+            {'index': {'_id': 'a'}}, {'title': 'Bananas and apples', 'tags': ['fruit']},
+            {'index': {'_id': 'b'}}, {'title': 'Bananas bananas', 'tags': []},
+            {'index': {'_id': 'c'}}, {'title': 'Oranges', 'tags': ['fruit']},
+        ])
+
+    def test_scoring(self):
+        """Documents are returned in order of decreasing score."""
+        self.assertEqual(self.search_ids('bananas'), ['b', 'a'])
+
+    def test_filter(self):
+        """Filters restrict the matching documents."""
+        query = {
+            'bool': {
+                'must': {'multi_match': {'query': 'bananas', 'fields': ['title']}},
+                'filter': [{'terms': {'tags': ['fruit']}}],
+            },
+        }
+        self.assertEqual(self.search_ids(query=query), ['a'])
+
+    def test_delete(self):
+        """Documents can be deleted in bulk."""
+        self.engine.request('POST', '/test/_bulk', [{'delete': {'_id': 'b'}}])
+        self.assertEqual(self.search_ids('bananas'), ['a'])
+
+    def test_missing_index(self):
+        """Requests for a missing index fail unless ignored."""
+        self.engine.request('DELETE', '/test')
+        self.assertEqual(self.engine.request('DELETE', '/test', ignore=(404,)), {})
+        with self.assertRaises(Exception):
+            self.engine.request('POST', '/test/_search', {})
+
+    def search_ids(self, text=None, query=None):
+        if query is None:
+            query = {'multi_match': {'query': text, 'fields': ['title', 'tags']}}
+        response = self.engine.request('POST', '/test/_search', {'query': query})
+        return [hit['_id'] for hit in response['hits']['hits']]
+
+
+@override_settings(SEARCH_BACKEND=LOCAL_BACKEND)
+class LocalBackendTestCase(TestCase):
+    fixtures = ['mediaplatform/tests/fixtures/test_data.yaml']
+
+    def setUp(self):
+        self.user = User.objects.get(username='testuser')
+
+        lookup_patcher = mock.patch('mediaplatform.models._lookup_groupids_and_instids_for_user')
+        lookup_patcher.start().return_value = ([], [])
+        self.addCleanup(lookup_patcher.stop)
+
+        self.backend = searchbackends.get_backend()
+        self.addCleanup(self.backend.delete_index)
+
+        self.public_item = models.MediaItem.objects.create(title='xyzzy public')
+        self.public_item.view_permission.is_public = True
+        self.public_item.view_permission.save()
+
+        self.user_item = models.MediaItem.objects.create(title='xyzzy xyzzy for user')
+        self.user_item.view_permission.crsids.append(self.user.username)
+        self.user_item.view_permission.save()
+
+        self.future_item = models.MediaItem.objects.create(
+            title='xyzzy future', published_at=timezone.now() + datetime.timedelta(days=1))
+        self.future_item.view_permission.is_public = True
+        self.future_item.view_permission.save()
+
+        self.backend.rebuild()
+
+    def test_anonymous(self):
+        """Anonymous users only find public, published items."""
+        self.assertEqual(self.search_ids(AnonymousUser()), [self.public_item.id])
+
+    def test_user(self):
+        """Users find items they may view in order of decreasing rank."""
+        self.assertEqual(self.search_ids(self.user), [self.user_item.id, self.public_item.id])
+
+    def test_reindex(self):
+        """Changed items are re-indexed and deleted items are removed."""
+        self.public_item.title = 'plugh'
+        self.public_item.save()
+        self.user_item.deleted_at = timezone.now()
+        self.user_item.save()
+        self.backend.index_media_items([self.public_item.id, self.user_item.id])
+
+        self.assertEqual(self.search_ids(self.user), [])
+        self.assertEqual(self.search_ids(self.user, terms=['plugh']), [self.public_item.id])
+
+    def test_other_models(self):
+        """Other models are searched using PostgreSQL."""
+        channel = models.Channel.objects.create(
+            title='xyzzy channel', billing_account=models.BillingAccount.objects.first())
+        queryset = self.backend.filter_queryset(
+            models.Channel.objects.all(), ['xyzzy'], field='text_search_vector',
+            rank_annotation='rank', user=self.user)
+        self.assertEqual([c.id for c in queryset], [channel.id])
+
+    def test_max_results(self):
+        """Searches which reach the result limit are truncated and logged."""
+        self.addCleanup(setattr, self.backend, 'max_results', self.backend.max_results)
+        self.backend.max_results = 1
+        with self.assertLogs(searchbackends.LOG, 'WARNING'):
+            self.assertEqual(len(self.search_ids(self.user)), 1)
+
+    def search_ids(self, user, terms=('xyzzy',)):
+        queryset = self.backend.filter_queryset(
+            models.MediaItem.objects.all().viewable_by_user(user), terms,
+            field='text_search_vector', rank_annotation='rank', user=user)
+        return [item.id for item in queryset.order_by('-rank', 'id')]
+
+
+class ScheduleIndexTestCase(TestCase):
+    fixtures = ['mediaplatform/tests/fixtures/test_data.yaml']
+
+    def setUp(self):
+        on_commit_patcher = mock.patch('django.db.transaction.on_commit', lambda f: f())
+        on_commit_patcher.start()
+        self.addCleanup(on_commit_patcher.stop)
+
+        delay_patcher = mock.patch('mediaplatform.tasks.index_media_items.delay')
+        self.delay = delay_patcher.start()
+        self.addCleanup(delay_patcher.stop)
+
+        # Discard ids left pending by transactions in other tests which were never committed.
+        searchbackends._PENDING.item_ids = set()
+
+    @override_settings(SEARCH_BACKEND=LOCAL_BACKEND)
+    def test_save(self):
+        """Saving an item schedules it to be indexed."""
+        item = models.MediaItem.objects.first()
+        item.save()
+        self.delay.assert_called_with([item.id])
+
+    @override_settings(SEARCH_BACKEND=LOCAL_BACKEND)
+    def test_bulk_updated(self):
+        """Items updated in bulk are scheduled to be indexed."""
+        signals.media_items_bulk_updated.send(sender=models.MediaItem, item_ids=['b', 'a'])
+        self.delay.assert_called_once_with(['a', 'b'])
+
+    def test_postgres(self):
+        """Nothing is scheduled if the backend does not index media items."""
+        models.MediaItem.objects.first().save()
+        self.delay.assert_not_called()
+
+
+class IndexMediaItemsTaskTestCase(TestCase):
+    def test_retry_on_connection_error(self):
+        """Indexing is retried if the search engine cannot be reached."""
+        with mock.patch('mediaplatform.searchbackends.get_backend') as get_backend:
+            index_media_items = get_backend.return_value.index_media_items
+            index_media_items.side_effect = [requests.ConnectionError(), None]
+            tasks.index_media_items.apply(args=[['a']])
+        self.assertEqual(index_media_items.call_count, 2)
@@ -66,8 +66,9 @@ class VideoAdmin(admin.ModelAdmin):
         """Allow searching by item tag in addition to the fields in search_fields."""
         queryset, use_distinct = super().get_search_results(request, queryset, search_term)
 
-        # Also match on item tags
-        queryset |= self.model.objects.filter(item__tags__contains=[search_term.lower()])
+        # Also match on item tags. The containment operator is supported by the GIN index on tags.
+        if search_term != '':
+            queryset |= self.model.objects.filter(item__tags__contains=[search_term.lower()])
 
         return queryset, use_distinct
 
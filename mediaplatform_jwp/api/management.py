@@ -21,6 +21,18 @@ def schedule_item_update(item):
     _perform_item_update(item)
 
 
+def schedule_items_update(item_ids):
+    """
+    Schedule a single task which synchronises the JWP videos for all of the
+    :py:class:`mediaplatform.models.MediaItem` objects whose ids are in *item_ids*. The updates are
+    rate limited. See :py:func:`mediaplatform_jwp.tasks.update_items`.
+
+    """
+    # Imported here since the tasks module indirectly imports this one.
+    from mediaplatform_jwp import tasks
+    tasks.update_items.delay(list(item_ids))
+
+
 def _perform_item_update(item):
     # Get a JWPlatform client
     jwp_client = jwp.get_jwplatform_client()
@@ -10,6 +10,27 @@ Default settings values for the :py:mod:`mediaplatform_jwp` application.
 #: Should matching JWP videos should be creatred/updated when MediaItem objects change.
 JWP_SYNC_ITEMS = True
 
+#: Maximum number of media items per minute which are pushed to JWP by the
+#: :py:func:`~mediaplatform_jwp.tasks.update_items` task. Each item requires two JWP management API
+#: calls.
+JWP_UPDATE_ITEMS_PER_MINUTE = 25
+
+#: Maximum number of pages of resources which are fetched at once when listing JWP resources.
+JWP_FETCH_CONCURRENCY = 4
+
+#: Initial rate of JWP management API calls per minute when listing JWP resources. The rate is
+#: adjusted from the rate limit reported by JWP.
+JWP_FETCH_REQUESTS_PER_MINUTE = 60
+
+#: Number of JWP resources which are cached or synchronised in each transaction by the
+#: :py:func:`~mediaplatform_jwp.tasks.synchronise` task.
+JWP_SYNC_BATCH_SIZE = 1000
+
+#: Number of shards in which media items are synchronised by concurrent Celery workers at the end
+#: of the :py:func:`~mediaplatform_jwp.tasks.synchronise` task. If 1, media items are synchronised
+#: by the task itself.
+JWP_SYNC_SHARDS = 1
+
 #: Should we force http upload links to be https?
 JWP_FORCE_HTTPS_UPLOAD = True
 
@@ -27,6 +48,13 @@ setting has a non-empty value.
 
 """
 
+JWPLATFORM_WEBHOOK_SECRET = None
+"""
+Secret with which JWPlatform signs webhook events sent to the :py:func:`~.views.webhook` view. If
+not set, webhooks are disabled and resources are only synchronised periodically.
+
+"""
+
 JWPLATFORM_SIGNATURE_TIMEOUT = 3600
 """
 Lifetime of signed URL in seconds.
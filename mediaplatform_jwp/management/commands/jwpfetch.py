@@ -22,9 +22,19 @@ perform the database metadata synchronisation. This can be useful in combination
 only video or channel resources is controlled via the ``--skip-video-fetch`` and
 ``--skip-channel-fetch`` flags.
 
+The ``--incremental`` flag may be given to fetch only those videos which have been updated since
+the last successful fetch. Videos which have been deleted from JWPlayer are not detected by an
+incremental fetch and so the command should also be run without the flag from time to time, e.g.
+nightly.
+
+The ``--key`` flag may be given, possibly more than once, to re-fetch only the videos with the
+given keys and to synchronise only their media items. This is much faster than a full
+synchronisation and is useful to fix individual stale items.
+
 """
 from django.core.management.base import BaseCommand
 
+from mediaplatform_jwp import models
 from mediaplatform_jwp import tasks
 
 
@@ -45,10 +55,23 @@ class Command(BaseCommand):
         parser.add_argument(
             '--skip-channel-fetch', action='store_true', dest='skip_channel_fetch',
             help='Do not re-fetch channels from JWP and synchronise with channels')
+        parser.add_argument(
+            '--incremental', action='store_true', dest='incremental',
+            help=('Only fetch videos updated since the last fetch. Deleted videos are not '
+                  'detected.'))
+        parser.add_argument(
+            '--key', action='append', dest='keys', metavar='KEY',
+            help='Only fetch and synchronise the video with this key. May be given more than once')
 
     def handle(self, *args, **options):
+        if options['keys'] is not None:
+            for key in options['keys']:
+                tasks.synchronise_resource(models.CachedResource.VIDEO, key)
+            return
+
         tasks.synchronise(
             sync_all=options['sync_all'],
             skip_video_fetch=options['skip_video_fetch'] or options['skip_fetch'],
-            skip_channel_fetch=options['skip_channel_fetch'] or options['skip_fetch']
+            skip_channel_fetch=options['skip_channel_fetch'] or options['skip_fetch'],
+            incremental=options['incremental']
         )
@@ -0,0 +1,59 @@
+"""
+The ``jwpwebhook`` management command sends a synthetic JWPlatform webhook event to a running
+instance of the application. It is intended for testing the webhook receiver locally without
+having to configure a webhook in JWPlatform.
+
+The event is signed with the ``JWPLATFORM_WEBHOOK_SECRET`` setting, or the secret given by the
+``--secret`` flag, in the same way that JWPlatform signs events. For example, to notify a local
+development server that a video has been updated:
+
+.. code::
+
+    ./manage.py jwpwebhook media_updated abcd1234
+
+The ``--url`` flag gives the URL of the webhook receiver. It defaults to that of a local
+development server.
+
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+import requests
+
+from mediaplatform_jwp import views
+
+
+class Command(BaseCommand):
+    help = 'Send a signed synthetic JWPlatform webhook event.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'event', choices=sorted(views.WEBHOOK_EVENTS), help='Name of the webhook event')
+        parser.add_argument('key', help='JWPlatform key of the video or channel')
+        parser.add_argument(
+            '--url', dest='url',
+            default='http://localhost:8000' + reverse('mediaplatform_jwp:webhook'),
+            help='URL of the webhook receiver')
+        parser.add_argument(
+            '--secret', dest='secret',
+            help=('Secret used to sign the event. Defaults to the JWPLATFORM_WEBHOOK_SECRET '
+                  'setting'))
+
+    def handle(self, *args, **options):
+        _, key_field = views.WEBHOOK_EVENTS[options['event']]
+        event = {'event': options['event'], key_field: options['key']}
+
+        secret = (
+            options['secret'] if options['secret'] is not None
+            else settings.JWPLATFORM_WEBHOOK_SECRET
+        )
+        if not secret:
+            raise CommandError('No webhook secret is configured')
+
+        response = requests.post(
+            options['url'], json=event,
+            headers={'Authorization': views.sign_event(event, secret=secret)})
+
+        self.stdout.write(f'{response.status_code} {response.reason}')
+        if response.status_code >= 300:
+            raise CommandError('Webhook event was not accepted')
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaplatform_jwp', '0005_add_reference_to_cached_resource'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cachedresource',
+            name='data_hash',
+            field=models.CharField(
+                blank=True, default='', editable=False, max_length=32,
+                help_text='MD5 hash of the resource data used to detect changes to the resource'
+            ),
+        ),
+        # Hash the data of existing resources so that the next update does not rewrite them.
+        migrations.RunSQL(
+            "UPDATE mediaplatform_jwp_cachedresource SET data_hash = MD5(data::text)",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaplatform_jwp', '0006_add_cached_resource_data_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchCheckpoint',
+            fields=[
+                ('type', models.CharField(
+                    choices=[('video', 'Video'), ('channel', 'Channel')], editable=False,
+                    max_length=20, primary_key=True, serialize=False)),
+                ('offset', models.IntegerField(default=0, editable=False)),
+                ('resumed', models.BooleanField(default=False, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FetchedKey',
+            fields=[
+                ('key', models.CharField(
+                    editable=False, max_length=255, primary_key=True, serialize=False)),
+                ('type', models.CharField(
+                    choices=[('video', 'Video'), ('channel', 'Channel')], db_index=True,
+                    editable=False, max_length=20)),
+            ],
+        ),
+    ]
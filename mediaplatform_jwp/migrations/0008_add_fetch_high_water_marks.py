@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaplatform_jwp', '0007_add_fetch_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fetchcheckpoint',
+            name='high_water_mark',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='FetchHighWaterMark',
+            fields=[
+                ('type', models.CharField(
+                    choices=[('video', 'Video'), ('channel', 'Channel')], editable=False,
+                    max_length=20, primary_key=True, serialize=False)),
+                ('updated', models.BigIntegerField(editable=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
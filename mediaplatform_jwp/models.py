@@ -1,3 +1,7 @@
+import collections
+import csv
+import io
+import itertools
 import json
 import logging
 
@@ -5,8 +9,8 @@ from django.conf import settings
 from django.contrib.postgres.fields import JSONField
 from django.contrib.postgres.indexes import GinIndex
 from django.db import models, transaction, connection
+from django.utils import timezone
 from django.utils.functional import cached_property
-from psycopg2.extras import execute_batch
 
 import mediaplatform.models as mpmodels
 from mediaplatform_jwp.api import delivery as jwplatform
@@ -86,6 +90,11 @@ class CachedResource(models.Model):
         help_text='The date and time at which this cached resource was last updated'
     )
 
+    data_hash = models.CharField(
+        max_length=32, blank=True, default='', editable=False,
+        help_text='MD5 hash of the resource data used to detect changes to the resource',
+    )
+
     deleted_at = models.DateTimeField(
         null=True, blank=True, default=None,
         help_text='The date and time at which this cached resource was deleted',
@@ -112,8 +121,15 @@ class CachedResource(models.Model):
         ]
 
 
+#: Counts of cached resources affected by :py:func:`~.set_resources`.
+ResourceCounts = collections.namedtuple('ResourceCounts', 'inserted updated unchanged deleted')
+
+# Number of resources sent to the database by each COPY statement in set_resources()
+_COPY_BATCH_SIZE = 5000
+
+
 @transaction.atomic
-def set_resources(resources, resource_type):
+def set_resources(resources, resource_type, delete_missing=True, record_fetched_keys=False):
     """
     Helper function which updates the cached resources and marks resources as deleted if no
     longer present.
@@ -122,11 +138,25 @@ def set_resources(resources, resource_type):
     :type resources: iterable
     :param resource_type: type of JWPlatform resource (e.g. "video")
     :type resource_type: str
+    :param delete_missing: whether resources not in *resources* should be marked as deleted
+    :type delete_missing: bool
+    :param record_fetched_keys: whether the keys of *resources* should be recorded as
+        :py:class:`~.FetchedKey` objects
+    :type record_fetched_keys: bool
 
     Iterates over all of the dicts in *resources* adding or updating corresponding
     :py:class:`~.CachedResource` models as it goes. After all resources have been added, any
     resources of the specified type which have not been created or updated are deleted from the
-    cache.
+    cache unless *delete_missing* is False. Pass False if *resources* only contains those
+    resources which have changed, e.g. when fetching resources incrementally, or when resources
+    are set in batches. In the latter case, pass True for *record_fetched_keys* and call
+    :py:func:`~.delete_unfetched_resources` once all the batches have been set.
+
+    Resources whose data is unchanged are not written to the database at all and so their
+    updated_at timestamp is left alone.
+
+    Returns a :py:class:`~.ResourceCounts` giving the number of resources which were inserted,
+    updated, unchanged and deleted.
 
     This is all run inside an atomic block. Note that these blocks can be nested so calls to
     this function can themselves be within an atomic block.
@@ -138,19 +168,22 @@ def set_resources(resources, resource_type):
     # determine a clean way to do this with the stock Django ORM. We bypass the ORM entirely
     # and roll our own SQL. The general idea is to, atomically,
     #
-    # 1. Create a temporary table to hold all the keys for the resources we inserted/updated in
-    #    the cache.
+    # 1. Create a temporary table to hold all the resources we are setting in the cache.
     #
-    # 2. Insert/update ("upsert") the resources using PostgreSQL's INSERT ... ON CONFLICT
+    # 2. Stream the resources into the temporary table using COPY, which is far faster than
+    #    individual INSERT statements.
+    #
+    # 3. Insert/update ("upsert") the resources using PostgreSQL's INSERT ... ON CONFLICT
     #    support. If we insert a new row, created_at and updated_at are set to the statement
     #    timestamp but if an existing row is updated, only the updated_at timestamp is
-    #    modified. Along the way, we record the keys of the resources which have been
-    #    "upserted" in the temporary table.
+    #    modified. Existing rows are only updated if the hash of their data differs, or they were
+    #    deleted, so that unchanged resources do not cause any writes to the table or its GIN
+    #    index.
     #
-    # 3. Mark all the resources of the appropriate type as "deleted" if their key is not in the
+    # 4. Mark all the resources of the appropriate type as "deleted" if their key is not in the
     #    temporary table.
     #
-    # 4. Drop the temporary table.
+    # 5. Drop the temporary table.
     #
     # This approach lets us send the list of new resources to the database *once* and then lets
     # the database sort out evicting/deleting resources from the cache if they weren't inserted
@@ -167,63 +200,245 @@ def set_resources(resources, resource_type):
     # [1] http://django-postgres-extra.readthedocs.io/manager/#conflict-handling
 
     with connection.cursor() as cursor:
-        # A table to hold the list of inserted or updated keys
+        # A table to hold the incoming resources. The ordinal records the order in which the
+        # resources were given so that the last of any duplicate keys wins.
         cursor.execute('''
-            CREATE TEMPORARY TABLE inserted_or_updated_keys (key TEXT)
+            CREATE TEMPORARY TABLE incoming_resources (ordinal SERIAL, key TEXT, data JSONB)
         ''')
 
-        # Using execute_batch is many times faster than executemany
-        # http://initd.org/psycopg/docs/extras.html#fast-exec
-        #
+        # Resources are sent in batches of CSV formatted rows so that neither the whole iterable
+        # nor the whole CSV document need be held in memory.
+        resources = iter(resources)
+        while True:
+            batch = list(itertools.islice(resources, _COPY_BATCH_SIZE))
+            if len(batch) == 0:
+                break
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows((data['key'], json.dumps(data)) for data in batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                'COPY incoming_resources (key, data) FROM STDIN WITH (FORMAT csv)', buffer)
+
         # There is an argument as to what "now" function we should use here, especially as the
         # test suite runs everything within one transaction so using TRANSACTION_TIMESTAMP()
-        # won't actually give any different values when we run testes.
-        #
-        # We use STATEMENT_TIMESTAMP() as a compromise.
+        # won't actually give any different values when we run testes. We use
+        # STATEMENT_TIMESTAMP()[1] for consistency with the timestamp set when resources are
+        # deleted.
         #
-        # The downside of STATEMENT_TIMESTAMP() is that execute_batch() will batch calls so the
-        # various ..._at timestamps may differ slightly for a given cache update. OTOH, I don't
-        # think anyone will really care about the ..._at timestamps down to that sort of
-        # resolution. Given that assumption, I will no doubt be proved wrong when a future data
-        # analyst berates us when they analyse our database dumps and find out that the
-        # timestamps have a little bit of non-deterministic noise.
+        # The hash is computed from the text of the JSONB value which, unlike the JSON we sent,
+        # does not depend on the order of keys. In the RETURNING clause, xmax is zero only for
+        # freshly inserted rows.
         #
         # [1] https://www.postgresql.org/docs/9.1/static/functions-datetime.html#FUNCTIONS-DATETIME-CURRENT  # noqa: E501
-        execute_batch(cursor, '''
+        cursor.execute('''
             WITH
-                insert_result
+                incoming
+            AS (
+                SELECT DISTINCT ON (key) key, data, MD5(data::text) AS data_hash
+                FROM incoming_resources
+                ORDER BY key, ordinal DESC
+            ),
+                upsert_result
             AS (
                 INSERT INTO mediaplatform_jwp_cachedresource (
-                    key, data, type, updated_at, created_at, deleted_at
-                ) VALUES (
-                    %(key)s, %(data)s, %(type)s,
-                    STATEMENT_TIMESTAMP(), STATEMENT_TIMESTAMP(), NULL
+                    key, data, data_hash, type, updated_at, created_at, deleted_at
                 )
+                SELECT
+                    key, data, data_hash, %(type)s,
+                    STATEMENT_TIMESTAMP(), STATEMENT_TIMESTAMP(), NULL
+                FROM incoming
                 ON CONFLICT (key) DO
                     UPDATE SET
-                        data = %(data)s, type = %(type)s,
-                        updated_at = STATEMENT_TIMESTAMP(), deleted_at = NULL
-                    WHERE mediaplatform_jwp_cachedresource.key = %(key)s
+                        data = EXCLUDED.data, data_hash = EXCLUDED.data_hash,
+                        type = EXCLUDED.type, updated_at = STATEMENT_TIMESTAMP(), deleted_at = NULL
+                    WHERE
+                        mediaplatform_jwp_cachedresource.data_hash
+                            IS DISTINCT FROM EXCLUDED.data_hash
+                        OR mediaplatform_jwp_cachedresource.type IS DISTINCT FROM EXCLUDED.type
+                        OR mediaplatform_jwp_cachedresource.deleted_at IS NOT NULL
                 RETURNING
-                    mediaplatform_jwp_cachedresource.key AS key
+                    (xmax = 0) AS inserted
             )
-            INSERT INTO inserted_or_updated_keys (key) SELECT key FROM insert_result
-        ''', (
-            {'key': data['key'], 'data': json.dumps(data), 'type': resource_type}
-            for data in iter(resources)
-        ))
+            SELECT
+                (SELECT COUNT(*) FROM upsert_result WHERE inserted),
+                (SELECT COUNT(*) FROM upsert_result WHERE NOT inserted),
+                (SELECT COUNT(*) FROM incoming)
+        ''', {'type': resource_type})
+        inserted, updated, total = cursor.fetchone()
+
+        deleted = 0
+        if delete_missing:
+            # Resources which are already marked as deleted are left alone.
+            cursor.execute('''
+                UPDATE
+                    mediaplatform_jwp_cachedresource
+                SET
+                    deleted_at = STATEMENT_TIMESTAMP()
+                WHERE
+                    NOT EXISTS (
+                        SELECT 1 FROM incoming_resources
+                        WHERE incoming_resources.key = mediaplatform_jwp_cachedresource.key
+                    )
+                    AND type = %(type)s
+                    AND deleted_at IS NULL
+            ''', {'type': resource_type})
+            deleted = cursor.rowcount
+
+        if record_fetched_keys:
+            cursor.execute('''
+                INSERT INTO mediaplatform_jwp_fetchedkey (key, type)
+                SELECT DISTINCT key, %(type)s FROM incoming_resources
+                ON CONFLICT (key) DO NOTHING
+            ''', {'type': resource_type})
+
+        cursor.execute('''DROP TABLE incoming_resources''')
+
+    return ResourceCounts(
+        inserted=inserted, updated=updated, unchanged=total - inserted - updated, deleted=deleted)
+
+
+@transaction.atomic
+def delete_unfetched_resources(resource_type):
+    """
+    Mark the cached resources of type *resource_type* as deleted if their keys have not been
+    recorded as :py:class:`~.FetchedKey` objects by :py:func:`~.set_resources`. The recorded keys
+    of that type are then removed ready for the next fetch. Returns the number of resources marked
+    as deleted.
 
+    """
+    with connection.cursor() as cursor:
         cursor.execute('''
             UPDATE
                 mediaplatform_jwp_cachedresource
             SET
                 deleted_at = STATEMENT_TIMESTAMP()
             WHERE
-                key NOT IN (SELECT key from inserted_or_updated_keys)
+                NOT EXISTS (
+                    SELECT 1 FROM mediaplatform_jwp_fetchedkey
+                    WHERE mediaplatform_jwp_fetchedkey.key = mediaplatform_jwp_cachedresource.key
+                )
                 AND type = %(type)s
+                AND deleted_at IS NULL
         ''', {'type': resource_type})
+        deleted = cursor.rowcount
+
+    FetchedKey.objects.filter(type=resource_type).delete()
+
+    return deleted
+
+
+def delete_resources(resource_type, keys):
+    """
+    Mark the cached resources of type *resource_type* whose keys are in *keys* as deleted. Returns
+    the number of resources marked as deleted.
+
+    """
+    return (
+        CachedResource.objects
+        .filter(type=resource_type, key__in=keys, deleted_at=None)
+        .update(deleted_at=timezone.now())
+    )
+
 
-        cursor.execute('''DROP TABLE inserted_or_updated_keys''')
+def resources_high_water_mark(resource_type):
+    """
+    Return the high-water mark recorded by the last completed fetch of the list of resources of
+    type *resource_type* or None if no such fetch has completed. See
+    :py:class:`~.FetchHighWaterMark`.
+
+    """
+    return (
+        FetchHighWaterMark.objects.filter(type=resource_type)
+        .values_list('updated', flat=True)
+        .first()
+    )
+
+
+def set_resources_high_water_mark(resource_type, updated):
+    """
+    Record *updated* as the high-water mark of resources of type *resource_type*. This should only
+    be called once a fetch of the list of resources has been cached. See
+    :py:class:`~.FetchHighWaterMark`.
+
+    """
+    FetchHighWaterMark.objects.update_or_create(type=resource_type, defaults={'updated': updated})
+
+
+class FetchCheckpoint(models.Model):
+    """
+    The progress of a fetch of all the JWPlatform resources of one type. Resources are fetched and
+    cached in batches, each in its own transaction, and the checkpoint is advanced in the same
+    transaction as each batch. If the fetch is interrupted, the checkpoint remains and the next
+    fetch resumes from it. The checkpoint is deleted once the fetch completes.
+
+    The keys of the resources cached so far are recorded as :py:class:`~.FetchedKey` objects so
+    that resources which are no longer present in JWPlatform can be marked as deleted at the end
+    of the fetch.
+
+    """
+    #: JWPlatform resource type being fetched
+    type = models.CharField(
+        max_length=20, primary_key=True, choices=CachedResource.TYPE_CHOICES, editable=False)
+
+    #: Offset into the list of resources of the next resource to fetch
+    offset = models.IntegerField(default=0, editable=False)
+
+    #: Has this fetch been resumed after being interrupted? Resources may move within the list
+    #: between the interruption and resumption and so some may have been missed.
+    resumed = models.BooleanField(default=False, editable=False)
+
+    #: Latest JWPlatform "updated" timestamp of the resources cached so far by this fetch
+    high_water_mark = models.BigIntegerField(null=True, editable=False)
+
+    #: The date and time at which the fetch started
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    #: The date and time at which the fetch last made progress
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Fetch of {self.type} resources at offset {self.offset}'
+
+
+class FetchHighWaterMark(models.Model):
+    """
+    The latest JWPlatform "updated" timestamp of the resources of one type listed by the last
+    completed fetch of those resources. Incremental fetches only fetch the resources updated since
+    the mark.
+
+    The mark is only recorded when a fetch of the list of resources completes. Single resources
+    cached in response to webhook events are not considered since resources updated before them may
+    not yet have been cached. For the same reason, the mark is not taken from the cached resources
+    themselves.
+
+    """
+    #: JWPlatform resource type
+    type = models.CharField(
+        max_length=20, primary_key=True, choices=CachedResource.TYPE_CHOICES, editable=False)
+
+    #: JWPlatform "updated" timestamp
+    updated = models.BigIntegerField(editable=False)
+
+    #: The date and time at which the mark was last recorded
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'High-water mark of {self.type} resources at {self.updated}'
+
+
+class FetchedKey(models.Model):
+    """
+    The key of a JWPlatform resource which has been cached by the current fetch of resources of its
+    type. See :py:class:`~.FetchCheckpoint`.
+
+    """
+    #: Key of the cached resource
+    key = models.CharField(max_length=255, primary_key=True, editable=False)
+
+    #: JWPlatform resource type
+    type = models.CharField(
+        max_length=20, choices=CachedResource.TYPE_CHOICES, editable=False, db_index=True)
 
 
 class Video(models.Model):
@@ -12,6 +12,7 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from mediaplatform import models as mpmodels
+from mediaplatform import signals as mpsignals
 
 from mediaplatform_jwp.api import management as management
 
@@ -71,6 +72,19 @@ def permission_post_save_handler(*args, instance, raw, **kwargs):
         management.schedule_item_update(instance.allows_view_item)
 
 
+@receiver(mpsignals.media_items_bulk_updated, sender=mpmodels.MediaItem)
+def media_items_bulk_updated_handler(*args, item_ids, **kwargs):
+    """
+    Called when media items have been updated in bulk. If JWP_SYNC_ITEMS is set then a single
+    rate-limited task is scheduled to propagate the modifications to the corresponding JWP videos.
+
+    """
+    if not _should_sync_items() or len(item_ids) == 0:
+        return
+
+    management.schedule_items_update(item_ids)
+
+
 def _should_sync_items():
     """
     Return a boolean indicating if JWP videos should be synchronised to changes in media items.
@@ -1,40 +1,80 @@
 import datetime
 import dateutil.parser
 
-from django.db import models, transaction
+from django.conf import settings
+from django.db import connection, models, transaction
 from django.db.models import expressions, functions
 from django.utils import timezone
+from psycopg2.extras import execute_values
 import pytz
 
+from mediaplatform import bulk
 import mediaplatform.models as mpmodels
+from mediaplatform import searchbackends
 import mediaplatform_jwp.models as jwpmodels
+from legacysms import analytics as legacyanalytics
 import legacysms.models as legacymodels
 import mediaplatform_jwp.models as mediajwpmodels
 from mediaplatform_jwp.api import delivery as jwp
 
-from .signalhandlers import setting_sync_items
+# The "updated" timestamp given to JWP videos which have not yet been synchronised. It is earlier
+# than that of any JWP resource.
+_UNSYNCHRONISED = -1
 
 
-@transaction.atomic
-def update_related_models_from_cache(update_all_videos=False):
+def update_related_models_from_cache(update_all_videos=False, keys=None):
     """
-    Atomically update the database to reflect the current state of the CachedResource table. If a
-    video is deleted from JWP, the corresponding MediaItem is marked as deleted. Similarly, if it
-    is deleted from the SMS (but is still in JWP for some reason), the legacysms.MediaItem model
-    associated with the MediaItem is deleted.
+    Update the database to reflect the current state of the CachedResource table. If a video is
+    deleted from JWP, the corresponding MediaItem is marked as deleted. Similarly, if it is deleted
+    from the SMS (but is still in JWP for some reason), the legacysms.MediaItem model associated
+    with the MediaItem is deleted.
 
     For video resources whose updated timestamp has increased, the JWP and SMS metadata is
     synchronised to mediaplatform.MediaItem or an associated legacysms.MediaItem as appropriate.
 
+    Similarly, channels are synchronised if the updated timestamp of their JWP channel has
+    increased. Channels which contain a newly created media item are also synchronised so that
+    the item is added to them.
+
     The update_all_videos flag may be set to True in which case a synchronisation of *all*
-    MediaItems with the associated CachedResource is performed irrespective of the
-    updated_at timestamp. Come what may, all channels are synchronised since there is no equivalent
-    of the updated timestamp for JWP channels.
+    MediaItems and Channels with the associated CachedResource is performed irrespective of the
+    updated timestamp.
+
+    If keys is not None, only the JWP videos and channels whose keys are in keys are synchronised
+    along with any channels which contain newly created media items. This is used to synchronise
+    individual resources as soon as they change. See
+    :py:func:`mediaplatform_jwp.tasks.synchronise_resource`.
+
+    The synchronisation is performed in stages. Media items and channels are created and
+    synchronised in batches of :py:data:`~.defaultsettings.JWP_SYNC_BATCH_SIZE` JWP videos or
+    channels with one transaction per batch so that no transaction holds locks on, and no batch
+    holds in memory, every media item or channel. The updated timestamp of a JWP video or channel
+    is only advanced once its media item or channel has been synchronised and so, if the
+    synchronisation is interrupted, calling this function again continues from the first one which
+    had not yet been synchronised.
+
+    The stages are also available individually as :py:func:`~.delete_models_missing_from_cache`,
+    :py:func:`~.update_media_items_from_cache` and :py:func:`~.update_channels_from_cache` so that
+    the media items may be synchronised in shards by concurrent workers. See
+    :py:func:`mediaplatform_jwp.tasks.synchronise_in_shards`.
 
     TODO: no attempt is yet made to synchronise the edit permission with that of the containing
     collection for media items. This needs a bit more thought about how the SMS permission model
     maps into the new world.
 
+    """
+    delete_models_missing_from_cache(keys=keys)
+    new_media_item_ids = update_media_items_from_cache(
+        update_all_videos=update_all_videos, keys=keys)
+    update_channels_from_cache(
+        update_all_videos=update_all_videos, keys=keys, new_media_item_ids=new_media_item_ids)
+
+
+def delete_models_missing_from_cache(keys=None):
+    """
+    Stage 1 of :py:func:`~.update_related_models_from_cache`. Mark media items and channels whose
+    JWP resources are no longer cached as deleted.
+
     """
     # 1) Delete mediaplatform_jwp.{Video,Channel} objects which are no-longer hosted by JWP and
     # mark the corresponding media items/channels as "deleted".
@@ -44,183 +84,367 @@ def update_related_models_from_cache(update_all_videos=False):
     # objects in the database which are reachable from a JWP video which is no-longer hosted on
     # JWP.
 
-    # A query for JWP videos/channels in our DB which are no-longer in JWPlatform
-    deleted_jwp_videos = jwpmodels.Video.objects.exclude(
-        key__in=mediajwpmodels.CachedResource.videos.values_list('key', flat=True))
-    deleted_jwp_channels = jwpmodels.Channel.objects.exclude(
-        key__in=mediajwpmodels.CachedResource.channels.values_list('key', flat=True))
-
-    # A query for media items which are to be deleted because they relate to a JWP video which was
-    # deleted
-    deleted_media_items = (
-        mpmodels.MediaItem.objects.filter(jwp__key__in=deleted_jwp_videos))
-
-    # A query for channels which are to be deleted because they relate to a JWP video which was
-    # deleted
-    deleted_channels = (
-        mpmodels.Channel.objects.filter(jwp__key__in=deleted_jwp_channels))
-
-    # A query for legacysms media items which are to be deleted because they relate to a media item
-    # which is to be deleted
-    deleted_sms_media_items = (
-        legacymodels.MediaItem.objects.filter(item__in=deleted_media_items))
-
-    # A query for legacysms collections which are to be deleted because they relate to a channel
-    # which is to be deleted
-    deleted_sms_collections = (
-        legacymodels.Collection.objects.filter(channel__in=deleted_channels))
-
-    # Mark 'shadow' playlists associated with deleted collections as deleted.
-    mpmodels.Playlist.objects.filter(sms__in=deleted_sms_collections).update(
-        deleted_at=timezone.now()
-    )
+    with transaction.atomic():
+        # A query for JWP videos/channels in our DB which are no-longer in JWPlatform
+        deleted_jwp_videos = _restrict_to_keys(jwpmodels.Video.objects, keys).exclude(
+            key__in=_restrict_to_keys(mediajwpmodels.CachedResource.videos, keys)
+            .values_list('key', flat=True))
+        deleted_jwp_channels = _restrict_to_keys(jwpmodels.Channel.objects, keys).exclude(
+            key__in=_restrict_to_keys(mediajwpmodels.CachedResource.channels, keys)
+            .values_list('key', flat=True))
+
+        # A query for media items which are to be deleted because they relate to a JWP video which
+        # was deleted
+        deleted_media_items = (
+            mpmodels.MediaItem.objects.filter(jwp__key__in=deleted_jwp_videos))
+
+        # A query for channels which are to be deleted because they relate to a JWP video which was
+        # deleted
+        deleted_channels = (
+            mpmodels.Channel.objects.filter(jwp__key__in=deleted_jwp_channels))
+
+        # A query for legacysms media items which are to be deleted because they relate to a media
+        # item which is to be deleted
+        deleted_sms_media_items = (
+            legacymodels.MediaItem.objects.filter(item__in=deleted_media_items))
+
+        # A query for legacysms collections which are to be deleted because they relate to a
+        # channel which is to be deleted
+        deleted_sms_collections = (
+            legacymodels.Collection.objects.filter(channel__in=deleted_channels))
+
+        # Mark 'shadow' playlists associated with deleted collections as deleted.
+        mpmodels.Playlist.objects.filter(sms__in=deleted_sms_collections).update(
+            deleted_at=timezone.now()
+        )
+
+        # Mark matching MediaItem models as deleted and delete corresponding SMS and JWP objects.
+        # The order here is important since the queries are not actually run until the
+        # corresponding update()/delete() calls. Since update() does not call any signal handlers,
+        # the search backend is explicitly told about the items which change.
+        searchbackends.schedule_index(deleted_media_items.values_list('id', flat=True))
+        deleted_sms_media_items.delete()
+        deleted_media_items.update(deleted_at=timezone.now())
+        deleted_jwp_videos.delete()
+
+        # Move media items which are in deleted channels to have no channel, mark the original
+        # channel as deleted and delete SMS/JWP objects
+        orphaned_media_items = mpmodels.MediaItem.objects.filter(channel__in=deleted_channels)
+        searchbackends.schedule_index(orphaned_media_items.values_list('id', flat=True))
+        orphaned_media_items.update(channel=None)
+        deleted_sms_collections.delete()
+        deleted_channels.update(deleted_at=timezone.now())
+        deleted_jwp_channels.delete()
+
+
+def update_media_items_from_cache(update_all_videos=False, keys=None, shard=None):
+    """
+    Stages 2 to 4 of :py:func:`~.update_related_models_from_cache`. Create and synchronise the
+    media items for JWP videos. Returns a list of the ids of the media items which were created.
+
+    If shard is not None, it is a pair (index, count) and only the JWP videos whose keys hash to
+    shard index of count are considered. Different shards touch disjoint sets of media items and
+    so may be synchronised concurrently. See :py:func:`mediaplatform_jwp.tasks.synchronise_shard`.
 
-    # Mark matching MediaItem models as deleted and delete corresponding SMS and JWP objects. The
-    # order here is important since the queries are not actually run until the corresponding
-    # update()/delete() calls.
-    deleted_sms_media_items.delete()
-    deleted_media_items.update(deleted_at=timezone.now())
-    deleted_jwp_videos.delete()
-
-    # Move media items which are in deleted channels to have no channel, mark the original
-    # channel as deleted and delete SMS/JWP objects
-    mpmodels.MediaItem.objects.filter(channel__in=deleted_channels).update(channel=None)
-    deleted_sms_collections.delete()
-    deleted_channels.update(deleted_at=timezone.now())
-    deleted_jwp_channels.delete()
-
-    # 2) Update/create JWP video resources
+    """
+    batch_size = settings.JWP_SYNC_BATCH_SIZE
+
+    # 2) Create JWP video objects for newly appearing JWP videos
     #
-    # After this stage all mediaplatform_jwp.Video objects in the database should have the same
-    # "updated" timestamp as the cached JWP resources and any newly appearing JWP videos should
-    # have associated mediaplatform_jwp.Video objects.
+    # After this stage any newly appearing JWP videos will have associated mediaplatform_jwp.Video
+    # objects. Their "updated" timestamps are left as _UNSYNCHRONISED and are only set to those of
+    # the cached JWP resources once their media items are synchronised in stage 4.
+
+    with transaction.atomic():
+        _ensure_resources(
+            jwpmodels.Video,
+            _restrict_to_shard(
+                _restrict_to_keys(mediajwpmodels.CachedResource.videos, keys), shard))
 
-    updated_jwp_video_keys = _ensure_resources(
-        jwpmodels.Video, mediajwpmodels.CachedResource.videos)
+    # 3) Insert missing mediaplatform.MediaItem objects
+    #
+    # After this stage, all mediaplatform_jwp.Video objects from the SMS which lack a
+    # mediaplatform.MediaItem will have one. The newly created mediaplatform.MediaItem objects will
+    # be blank and their JWP videos are marked as unsynchronised so that stage 4 sets their
+    # metadata.
+
+    # A queryset of the keys of all JWP Video objects which lack a mediaplatform.MediaItem and
+    # which arise from the SMS. Videos not from the SMS are filtered out by the database so that
+    # their data need not be fetched on every synchronisation. Videos whose resources have been
+    # deleted are skipped in case stage 1 has not yet removed them.
+    video_keys_needing_items = (
+        _restrict_to_shard(_restrict_to_keys(jwpmodels.Video.objects, keys), shard)
+        .filter(item__isnull=True, resource__deleted_at=None,
+                resource__data__custom__has_key='sms_media_id')
+        .order_by('key')
+        .values_list('key', flat=True)
+    )
 
-    _ensure_resources(
-        jwpmodels.Channel, mediajwpmodels.CachedResource.channels)
+    # Media items are created in batches. Each batch links its videos to their new items and so
+    # the next batch is simply the first of the videos which still need one.
+    new_media_item_ids = []
+    while True:
+        with transaction.atomic():
+            video_keys = list(video_keys_needing_items[:batch_size])
+            if len(video_keys) == 0:
+                break
+
+            # For all videos needing a mediaplatform.MediaItem, create a blank one.
+            jwp_keys_and_items = [(key, mpmodels.MediaItem()) for key in video_keys]
+
+            # Insert all the media items in an efficient manner.
+            mpmodels.MediaItem.objects.bulk_create([
+                item for _, item in jwp_keys_and_items
+            ])
+
+            # Since the bulk_create() call does not call any signal handlers, we need to manually
+            # create all of the permissions for the new items.
+            mpmodels.Permission.objects.bulk_create([
+                mpmodels.Permission(allows_view_item=item) for _, item in jwp_keys_and_items
+            ])
+
+            # Add the corresponding media item link to the JWP videos and make sure that the new
+            # items are synchronised even if their videos were previously linked to another item.
+            _set_jwp_fields(
+                jwpmodels.Video, 'item', [(key, item.id) for key, item in jwp_keys_and_items])
+            jwpmodels.Video.objects.filter(key__in=video_keys).update(updated=_UNSYNCHRONISED)
+
+        new_media_item_ids.extend(item.id for _, item in jwp_keys_and_items)
 
-    # 3) Insert missing mediaplatform.MediaItem and mediaplatform.Channel objects
+    # 4) Update metadata for changed videos
     #
-    # After this stage, all mediaplatform_jwp.Video objects which lack a mediaplatform.MediaItem
-    # and mediaplatform_jwp.Channel object which lack a mediaplatform.Channel will have one. The
-    # newly created mediaplatform.MediaItem objects will be blank but have an updated_at timestamp
-    # well before the corresponding mediaplatform_jwp.Video object.
+    # After this stage, all mediaplatform.MediaItem objects whose associated JWP video has an
+    # "updated" timestamp earlier than that of the cached JWP resource will have their metadata
+    # updated from the JWP video's custom props and the JWP video's timestamp will match the cached
+    # resource's. Note that legacysms.MediaItem objects associated with updated
+    # mediaplatform.MediaItem objects will also be updated/created/deleted as necessary.
+
+    # The JWP videos which need synchronisation in order of key along with the updated timestamp of
+    # their cached resource.
+    videos_to_synchronise = (
+        _restrict_to_shard(_restrict_to_keys(jwpmodels.Video.objects, keys), shard)
+        .annotate(resource_updated=functions.Coalesce(
+            _matching_resource_updated(mediajwpmodels.CachedResource.videos), 0))
+    )
 
-    # A queryset of all JWP Video objects which lack a mediaplatform.MediaItem annotated with the
-    # data from the corresponding CachedResource
-    videos_needing_items = (
-        jwpmodels.Video.objects
-        .filter(item__isnull=True)
+    # Unless we were asked to update the metadata in all objects, only update those which were last
+    # updated before the corresponding JWP video resource. This includes the videos of the media
+    # items created by us.
+    if not update_all_videos:
+        videos_to_synchronise = (
+            videos_to_synchronise.filter(updated__lt=models.F('resource_updated')))
+
+    videos_to_synchronise = (
+        videos_to_synchronise.order_by('key').values_list('key', 'resource_updated'))
+
+    # The media items which need update. We defer fetching all the metdata since we're going to
+    # reset it anyway. The publication date is the exception since it is only changed if the JWP
+    # video has one.
+    updated_media_items = (
+        mpmodels.MediaItem.objects.all()
+        .select_related('view_permission', 'sms')
+        .only('view_permission', 'jwp', 'sms', 'published_at')
         .annotate(data=models.Subquery(
             mediajwpmodels.CachedResource.videos
-            .filter(key=models.OuterRef('key'))
+            .filter(key=models.OuterRef('jwp__key'))
             .values_list('data')[:1]
         ))
     )
 
-    # For all videos needing a mediaplatform.MediaItem, create a blank one for videos arising from
-    # the SMS.
-    jwp_keys_and_items = [
-        (
-            video.key,
-            mpmodels.MediaItem(),
-        )
-        for video in videos_needing_items
-        if getattr(video, 'data', {}).get('custom', {}).get('sms_media_id') is not None
-    ]
+    # Set the metadata of the updated media items in batches of videos taken in order of key. Each
+    # batch is written by a fixed number of bulk queries rather than by calling save() on each
+    # object. As a result no post_save signal handlers are run and, in particular, the changes are
+    # not propagated back to JWP.
+    last_key = ''
+    while True:
+        with transaction.atomic():
+            keys_and_updated = list(videos_to_synchronise.filter(key__gt=last_key)[:batch_size])
+            if len(keys_and_updated) == 0:
+                break
 
-    # Insert all the media items in an efficient manner.
-    mpmodels.MediaItem.objects.bulk_create([
-        item for _, item in jwp_keys_and_items
-    ])
+            # Skip items with no associated JWP video
+            batch = [
+                item for item in updated_media_items.filter(
+                    jwp__key__in=[key for key, _ in keys_and_updated])
+                if item.data is not None
+            ]
+            _update_media_items_from_videos(batch)
 
-    # Since the bulk_create() call does not call any signal handlers, we need to manually create
-    # all of the permissions for the new items.
-    mpmodels.Permission.objects.bulk_create([
-        mpmodels.Permission(allows_view_item=item) for _, item in jwp_keys_and_items
-    ])
+            # Since no post_save signals were sent, explicitly tell the search backend about the
+            # items which changed.
+            searchbackends.schedule_index([item.id for item in batch])
+
+            # Record that the videos have been synchronised.
+            _set_jwp_fields(jwpmodels.Video, 'updated', keys_and_updated)
+
+        last_key = keys_and_updated[-1][0]
+
+    return new_media_item_ids
+
+
+def update_channels_from_cache(update_all_videos=False, keys=None, new_media_item_ids=()):
+    """
+    Stage 5 of :py:func:`~.update_related_models_from_cache`. Create and synchronise channels. In
+    addition to channels whose JWP channels have changed, channels containing the media items
+    whose ids are in new_media_item_ids are synchronised.
+
+    """
+    # 5) Create channels and update metadata for changed channels
+    #
+    # After this stage, all mediaplatform_jwp.Channel objects will have a mediaplatform.Channel
+    # object and all mediaplatform.Channel objects whose associated JWP channel was updated or
+    # created will have their metadata updated from the JWP channel's custom props. Note that
+    # legacysms.Channel objects associated with updated mediaplatform.Channel objects will also be
+    # updated/created/deleted as necessary.
 
-    # Add the corresponding media item link to the JWP videos.
-    for key, item in jwp_keys_and_items:
-        jwpmodels.Video.objects.filter(key=key).update(item=item)
+    batch_size = settings.JWP_SYNC_BATCH_SIZE
+
+    # As for videos, the "updated" timestamps of new JWP channels are left as _UNSYNCHRONISED and
+    # are only set to those of the cached JWP resources once their channels are synchronised.
+    with transaction.atomic():
+        _ensure_resources(
+            jwpmodels.Channel, _restrict_to_keys(mediajwpmodels.CachedResource.channels, keys))
 
     # A queryset of all JWP Channel objects which lack a mediaplatform.Channel annotated with the
     # data from the corresponding CachedResource
     jw_channels_needing_channels = (
-        jwpmodels.Channel.objects
+        _restrict_to_keys(jwpmodels.Channel.objects, keys)
         .filter(channel__isnull=True)
         .annotate(data=models.Subquery(
             mediajwpmodels.CachedResource.channels
             .filter(key=models.OuterRef('key'))
             .values_list('data')[:1]
         ))
+        .order_by('key')
     )
 
-    # For all channels needing a mediaplatform.Channel, create a blank one.
-    jwp_keys_and_channels = [
-        (
-            jw_channel.key,
-            mpmodels.Channel(billing_account=_ensure_billing_account(
-                jwp.parse_custom_field(
-                    'instid',
-                    jw_channel.data.get('custom', {}).get('sms_instid', 'instid::')
+    # Channels are created in batches. Each batch links its JWP channels to their new channels and
+    # so the next batch is simply the first of the JWP channels which still need one.
+    while True:
+        with transaction.atomic():
+            jw_channels = list(jw_channels_needing_channels[:batch_size])
+            if len(jw_channels) == 0:
+                break
+
+            # The lookup instid of the billing account for each channel needing a
+            # mediaplatform.Channel
+            jwp_keys_and_instids = [
+                (
+                    jw_channel.key,
+                    jwp.parse_custom_field(
+                        'instid',
+                        jw_channel.data.get('custom', {}).get('sms_instid', 'instid::')
+                    ),
                 )
-            )),
-        )
-        for jw_channel in jw_channels_needing_channels
-    ]
+                for jw_channel in jw_channels
+            ]
 
-    # Insert all the channels in an efficient manner.
-    mpmodels.Channel.objects.bulk_create([
-        channel for _, channel in jwp_keys_and_channels
-    ])
+            # Billing accounts for all of the instids are fetched or created at once.
+            billing_accounts = _ensure_billing_accounts(
+                {instid for _, instid in jwp_keys_and_instids})
 
-    # Since the bulk_create() call does not call any signal handlers, we need to manually create
-    # all of the permissions for the new channels.
-    mpmodels.Permission.objects.bulk_create([
-        mpmodels.Permission(allows_edit_channel=channel) for _, channel in jwp_keys_and_channels
-    ])
+            # For all channels needing a mediaplatform.Channel, create a blank one.
+            jwp_keys_and_channels = [
+                (key, mpmodels.Channel(billing_account=billing_accounts[instid]))
+                for key, instid in jwp_keys_and_instids
+            ]
 
-    # Add the corresponding media item link to the JWP channels.
-    for key, channel in jwp_keys_and_channels:
-        jwpmodels.Channel.objects.filter(key=key).update(channel=channel)
+            # Insert all the channels in an efficient manner.
+            mpmodels.Channel.objects.bulk_create([
+                channel for _, channel in jwp_keys_and_channels
+            ])
+
+            # Since the bulk_create() call does not call any signal handlers, we need to manually
+            # create all of the permissions for the new channels.
+            mpmodels.Permission.objects.bulk_create([
+                mpmodels.Permission(allows_edit_channel=channel)
+                for _, channel in jwp_keys_and_channels
+            ])
+
+            # Add the corresponding channel link to the JWP channels and make sure that the new
+            # channels are synchronised even if their JWP channels were previously linked to
+            # another channel.
+            jwp_keys = [key for key, _ in jwp_keys_and_channels]
+            _set_jwp_fields(
+                jwpmodels.Channel, 'channel',
+                [(key, channel.id) for key, channel in jwp_keys_and_channels]
+            )
+            jwpmodels.Channel.objects.filter(key__in=jwp_keys).update(updated=_UNSYNCHRONISED)
+
+    # The JWP channels which need synchronisation in order of key along with the updated timestamp
+    # of their cached resource.
+    channels_to_synchronise = jwpmodels.Channel.objects.annotate(
+        resource_updated=functions.Coalesce(
+            _matching_resource_updated(mediajwpmodels.CachedResource.channels), 0))
+
+    # Unless we were asked to update all objects, only update those channels whose JWP channel
+    # was updated, which were created by us or which contain a media item created by us. The last
+    # are included since the video may have appeared on JWP after the channel was last updated.
+    if update_all_videos:
+        channels_to_synchronise = _restrict_to_keys(channels_to_synchronise, keys)
+    else:
+        changed = models.Q(updated__lt=models.F('resource_updated'))
+        if keys is not None:
+            changed &= models.Q(key__in=keys)
+        channels_to_synchronise = channels_to_synchronise.filter(
+            changed |
+            models.Q(key__in=_jwp_channel_keys_containing_sms_media_items(
+                legacymodels.MediaItem.objects
+                .filter(item__in=new_media_item_ids)
+                .values_list('id', flat=True)
+            ))
+        )
 
-    # 4) Update metadata for changed videos
-    #
-    # After this stage, all mediaplatform.MediaItem objects whose associated JWP video is one of
-    # those in updated_jwp_video_keys will have their metadata updated from the JWP video's custom
-    # props. Note that legacysms.MediaItem objects associated with updated mediaplatform.MediaItem
-    # objects will also be updated/created/deleted as necessary.
+    channels_to_synchronise = (
+        channels_to_synchronise.order_by('key').values_list('key', 'resource_updated'))
 
-    # The media items which need update. We defer fetching all the metdata since we're going to
-    # reset it anyway.
-    updated_media_items = (
-        mpmodels.MediaItem.objects.all()
-        .select_related('view_permission')
-        # updated_at is included because, without it, the field does not get updated on save() for
-        # some reason
-        .only('view_permission', 'jwp', 'sms', 'updated_at')
+    # The channels which need update.
+    updated_channels = (
+        mpmodels.Channel.objects.all()
+        .select_related('edit_permission', 'sms__playlist')
         .annotate(data=models.Subquery(
-            mediajwpmodels.CachedResource.videos
+            mediajwpmodels.CachedResource.channels
             .filter(key=models.OuterRef('jwp__key'))
             .values_list('data')[:1]
         ))
     )
 
-    # Unless we were asked to update the metadata in all objects, only update those which were last
-    # updated before the corresponding JWP video resource OR were created by us.
-    if not update_all_videos:
-        updated_media_items = (
-            updated_media_items
-            .filter(
-                models.Q(jwp__key__in=updated_jwp_video_keys) |
-                models.Q(id__in=[item.id for _, item in jwp_keys_and_items])
-            )
-        )
+    # Set the metadata of the updated channels in batches of JWP channels taken in order of key so
+    # that only one batch of channels and their data is held in memory at once.
+    last_key = ''
+    while True:
+        with transaction.atomic():
+            keys_and_updated = list(channels_to_synchronise.filter(key__gt=last_key)[:batch_size])
+            if len(keys_and_updated) == 0:
+                break
+
+            # Skip channels with no associated JWP channel
+            _update_channels_from_jwp_channels([
+                channel for channel in updated_channels.filter(
+                    jwp__key__in=[key for key, _ in keys_and_updated])
+                if channel.data is not None
+            ])
+
+            # Record that the JWP channels have been synchronised.
+            _set_jwp_fields(jwpmodels.Channel, 'updated', keys_and_updated)
+
+        last_key = keys_and_updated[-1][0]
+
+    # Channel membership and storage sizes may have changed and so cached aggregated analytics are
+    # stale.
+    transaction.on_commit(legacyanalytics.invalidate_aggregates)
+
 
-    # Iterate over all updated media items and set the metadata
+def _update_media_items_from_videos(items):
+    """
+    Given a list of :py:class:`mediaplatform.MediaItem` objects annotated with the data of their
+    JWP video resource in a "data" attribute, update the metadata of each item, its view
+    permission and its associated legacysms.MediaItem (if any) to match the JWP video.
+
+    The new values are computed in memory and written with a fixed number of queries using
+    :py:func:`mediaplatform.bulk.bulk_update` and ``bulk_create()``. No signals are sent.
+
+    """
     max_tag_length = mpmodels.MediaItem._meta.get_field('tags').base_field.max_length
     type_map = {
         'video': mpmodels.MediaItem.VIDEO,
@@ -228,120 +452,167 @@ def update_related_models_from_cache(update_all_videos=False):
         'unknown': mpmodels.MediaItem.UNKNOWN,
     }
 
-    # We'll be modifying the MediaItem objects to be consistent with the JWP videos. We *don't*
-    # want the signal handlers then trying to modify the JWPlatform videos again so disable
-    # MediaItem -> JWP syncing if it is enabled.
-    with setting_sync_items(False):
-        for item in updated_media_items:
-            # Skip items with no associated JWP video
-            if item.data is None:
-                continue
+    # bulk_update() does not process auto_now fields and so updated_at is set explicitly.
+    now = timezone.now()
 
-            video = jwp.Video(item.data)
-            custom = video.get('custom', {})
+    # The SMS media items to save keyed by SMS media id and the ids of those to delete. If the same
+    # SMS media id is encountered more than once, the last item wins.
+    sms_media_items, deleted_sms_media_ids = {}, set()
 
-            item.title = _default_if_none(video.get('title'), '')
-            item.description = _default_if_none(video.get('description'), '')
-            item.type = type_map[_default_if_none(video.get('mediatype'), 'unknown')]
+    for item in items:
+        video = jwp.Video(item.data)
+        custom = video.get('custom', {})
 
-            item.downloadable = 'True' == jwp.parse_custom_field(
-                    'downloadable', custom.get('sms_downloadable', 'downloadable:False:'))
+        item.title = _default_if_none(video.get('title'), '')
+        item.description = _default_if_none(video.get('description'), '')
+        item.type = type_map[_default_if_none(video.get('mediatype'), 'unknown')]
 
-            published_timestamp = video.get('date')
-            if published_timestamp is not None:
-                item.published_at = datetime.datetime.fromtimestamp(
-                    published_timestamp, pytz.utc)
+        item.downloadable = 'True' == jwp.parse_custom_field(
+                'downloadable', custom.get('sms_downloadable', 'downloadable:False:'))
 
-            item.duration = _default_if_none(video.get('duration'), 0.)
+        published_timestamp = video.get('date')
+        if published_timestamp is not None:
+            item.published_at = datetime.datetime.fromtimestamp(
+                published_timestamp, pytz.utc)
 
-            # The language should be a three letter code. Use [:3] to make sure that it always is
-            # even if the JWP custom prop is somehow messed up.
-            item.language = jwp.parse_custom_field(
-                    'language', custom.get('sms_language', 'language::'))[:3]
+        item.duration = _default_if_none(video.get('duration'), 0.)
 
-            item.copyright = jwp.parse_custom_field(
-                    'copyright', custom.get('sms_copyright', 'copyright::'))
+        # The language should be a three letter code. Use [:3] to make sure that it always is
+        # even if the JWP custom prop is somehow messed up.
+        item.language = jwp.parse_custom_field(
+                'language', custom.get('sms_language', 'language::'))[:3]
 
-            # Since tags have database enforced maximum lengths, make sure to truncate them if
-            # they're too long. We also strip leading or trailing whitespace.
-            item.tags = [
-                tag.strip().lower()[:max_tag_length]
-                for tag in jwp.parse_custom_field(
-                    'keywords', custom.get('sms_keywords', 'keywords::')
-                ).split('|')
-                if tag.strip() != ''
-            ]
+        item.copyright = jwp.parse_custom_field(
+                'copyright', custom.get('sms_copyright', 'copyright::'))
 
-            # Update view permission
-            item.view_permission.reset()
-            _set_permission_from_acl(item.view_permission, video.acl)
-            item.view_permission.save()
-
-            # Update associated SMS media item (if any)
-            sms_media_id = video.media_id
-            if sms_media_id is not None:
-                # Get or create associated SMS media item. Note that hasattr is recommended in the
-                # Django docs as a way to determine isf a related objects exists.
-                # https://docs.djangoproject.com/en/dev/topics/db/examples/one_to_one/
-                if hasattr(item, 'sms') and item.sms is not None:
-                    sms_media_item = item.sms
-                else:
-                    sms_media_item = legacymodels.MediaItem(id=sms_media_id)
-
-                # Extract last updated timestamp. It should be an ISO 8601 date string.
-                last_updated = jwp.parse_custom_field(
-                    'last_updated_at', custom.get('sms_last_updated_at', 'last_updated_at::'))
-
-                # Update SMS media item
-                sms_media_item.item = item
-                if last_updated == '':
-                    sms_media_item.last_updated_at = None
-                else:
-                    sms_media_item.last_updated_at = dateutil.parser.parse(last_updated)
-
-                sms_media_item.save()
+        # Since tags have database enforced maximum lengths, make sure to truncate them if
+        # they're too long. We also strip leading or trailing whitespace.
+        item.tags = [
+            tag.strip().lower()[:max_tag_length]
+            for tag in jwp.parse_custom_field(
+                'keywords', custom.get('sms_keywords', 'keywords::')
+            ).split('|')
+            if tag.strip() != ''
+        ]
+
+        item.updated_at = now
+
+        # Update view permission
+        item.view_permission.reset()
+        _set_permission_from_acl(item.view_permission, video.acl)
+
+        # Update associated SMS media item (if any). Note that hasattr is recommended in the Django
+        # docs as a way to determine if a related objects exists.
+        # https://docs.djangoproject.com/en/dev/topics/db/examples/one_to_one/
+        existing_sms_media_item = item.sms if hasattr(item, 'sms') else None
+        sms_media_id = video.media_id
+        if sms_media_id is not None:
+            # Get or create associated SMS media item.
+            if existing_sms_media_item is not None:
+                sms_media_item = existing_sms_media_item
             else:
-                # If there is no associated SMS media item, make sure that this item doesn't have
-                # one pointing to it.
-                if hasattr(item, 'sms') and item.sms is not None:
-                    item.sms.delete()
+                sms_media_item = legacymodels.MediaItem(id=int(sms_media_id))
 
-            item.save()
+            # Extract last updated timestamp. It should be an ISO 8601 date string.
+            last_updated = jwp.parse_custom_field(
+                'last_updated_at', custom.get('sms_last_updated_at', 'last_updated_at::'))
 
-    # 5) Update metadata for changed channels
-    #
-    # After this stage, all mediaplatform.Channel objects whose associated JWP channel is one of
-    # those in updated_jwp_channel_keys will have their metadata updated from the JWP channel's
-    # custom props. Note that legacysms.Channel objects associated with updated
-    # mediaplatform.Channel objects will also be updated/created/deleted as necessary.
+            # Update SMS media item
+            sms_media_item.item = item
+            if last_updated == '':
+                sms_media_item.last_updated_at = None
+            else:
+                sms_media_item.last_updated_at = dateutil.parser.parse(last_updated)
 
-    # The channels which need update. We defer fetching all the metdata since we're going to
-    # reset it anyway.
-    updated_channels = (
-        mpmodels.Channel.objects.all()
-        .select_related('edit_permission')
-        # updated_at is included because, without it, the field does not get updated on save() for
-        # some reason
-        .only('edit_permission', 'jwp', 'sms', 'updated_at')
-        .annotate(data=models.Subquery(
-            mediajwpmodels.CachedResource.channels
-            .filter(key=models.OuterRef('jwp__key'))
-            .values_list('data')[:1]
+            sms_media_items[sms_media_item.id] = sms_media_item
+            deleted_sms_media_ids.discard(sms_media_item.id)
+        elif existing_sms_media_item is not None:
+            # If there is no associated SMS media item, make sure that this item doesn't have
+            # one pointing to it.
+            deleted_sms_media_ids.add(existing_sms_media_item.id)
+            sms_media_items.pop(existing_sms_media_item.id, None)
+
+    legacymodels.MediaItem.objects.filter(id__in=deleted_sms_media_ids).delete()
+
+    # SMS media items which already exist in the database are updated and the remainder created.
+    existing_sms_media_ids = set(
+        legacymodels.MediaItem.objects.filter(id__in=sms_media_items.keys())
+        .values_list('id', flat=True)
+    )
+    bulk.bulk_update(
+        [
+            sms_media_item for sms_media_id, sms_media_item in sms_media_items.items()
+            if sms_media_id in existing_sms_media_ids
+        ],
+        ['item', 'last_updated_at']
+    )
+    legacymodels.MediaItem.objects.bulk_create([
+        sms_media_item for sms_media_id, sms_media_item in sms_media_items.items()
+        if sms_media_id not in existing_sms_media_ids
+    ])
+
+    bulk.bulk_update(items, [
+        'title', 'description', 'type', 'downloadable', 'published_at', 'duration', 'language',
+        'copyright', 'tags', 'updated_at',
+    ])
+    bulk.bulk_update(
+        [item.view_permission for item in items],
+        ['crsids', 'lookup_groups', 'lookup_insts', 'is_public', 'is_signed_in']
+    )
+
+
+def _jwp_channel_keys_containing_sms_media_items(sms_media_ids):
+    """
+    Return a list of the keys of cached JWP channel resources whose "sms_collection_media_ids"
+    custom prop contains any of the SMS media ids in *sms_media_ids*.
+
+    """
+    sms_media_ids = [str(media_id) for media_id in sms_media_ids]
+    if len(sms_media_ids) == 0:
+        return []
+
+    # The custom prop has the form "collection_media_ids:<id>,<id>,...:" and so each id is preceded
+    # by a colon or comma and followed by a comma or colon.
+    return list(
+        mediajwpmodels.CachedResource.channels
+        .annotate(collection_media_ids=expressions.RawSQL(
+            "data -> 'custom' ->> 'sms_collection_media_ids'", [],
+            output_field=models.TextField()
         ))
+        .filter(collection_media_ids__regex=r'[:,]({})[,:]'.format('|'.join(sms_media_ids)))
+        .values_list('key', flat=True)
     )
 
-    for channel in updated_channels:
-        # Skip channels with no associated JWP channel
-        if channel.data is None:
-            continue
 
-        channel_data = jwp.Channel(channel.data)
+def _update_channels_from_jwp_channels(channels):
+    """
+    Given a list of :py:class:`mediaplatform.Channel` objects annotated with the data of their JWP
+    channel resource in a "data" attribute, update the metadata, edit permission and contents of
+    each channel along with its associated legacysms.Collection and "shadow" playlist (if any) to
+    match the JWP channel.
 
+    The SMS media ids of the contents of all of the channels are resolved to media items with a
+    single query and all changes are written with a fixed number of bulk queries. No signals are
+    sent.
+
+    """
+    # bulk_update() does not process auto_now fields and so updated_at is set explicitly.
+    now = timezone.now()
+
+    # A list of SMS media ids which "should" be in each channel. We use the
+    # "sms_collection_media_ids" custom prop as that is always set to the media ids which "should"
+    # be in the collection unlike sms_{,failed_}media_ids which is used as part of the playlist
+    # synchronisation process.
+    sms_collection_media_ids = {}
+
+    for channel in channels:
+        channel_data = jwp.Channel(channel.data)
         custom = channel_data.get('custom', {})
 
         # NB: The channel billing account is immutable and so we need not examine sms_instid here.
         channel.title = _default_if_none(channel_data.get('title'), '')
         channel.description = _default_if_none(channel_data.get('description'), '')
+        channel.updated_at = now
 
         # Update edit permission
         channel.edit_permission.reset()
@@ -361,42 +632,81 @@ def update_related_models_from_cache(update_all_videos=False):
         if group_id != '' and group_id not in channel.edit_permission.lookup_groups:
             channel.edit_permission.lookup_groups.append(group_id)
 
-        channel.edit_permission.save()
-
-        # Update contents. We use the "sms_collection_media_ids" custom prop as that is always set
-        # to the media ids which "should" be in the collection unlike sms_{,failed_}media_ids which
-        # is used as part of the playlist synchronisation process.
-        sms_collection_media_ids = [
+        sms_collection_media_ids[channel.id] = [
             int(media_id.strip())
             for media_id in jwp.parse_custom_field(
                 'collection_media_ids',
                 custom.get('sms_collection_media_ids', 'collection_media_ids::')
             ).split(',') if media_id.strip() != ''
         ]
-        collection_media_ids = (
-            mpmodels.MediaItem.objects.filter(sms__id__in=sms_collection_media_ids)
-            .only('id', 'sms__id')
+
+    # Resolve the SMS media ids of all the channels to media items with one query.
+    item_map = {
+        sms_media_id: (item_id, channel_id)
+        for sms_media_id, item_id, channel_id in (
+            mpmodels.MediaItem.objects
+            .filter(sms__id__in={
+                media_id for media_ids in sms_collection_media_ids.values()
+                for media_id in media_ids
+            })
+            .values_list('sms__id', 'id', 'channel_id')
         )
-        channel.items.set(collection_media_ids)
-
-        # Form a list of media item keys which is in the same order as sms_collection_media_ids.
-        item_map = {item.sms.id: item.id for item in collection_media_ids}
-        item_ids = [
-            item_id for item_id in (
-                item_map.get(media_id) for media_id in sms_collection_media_ids
-            ) if item_id is not None
-        ]
+    }
+
+    # For each channel, form a list of media item ids which is in the same order as
+    # sms_collection_media_ids and move the media items into the channel if they are not there
+    # already. If a media item is listed in more than one channel, the last one wins.
+    channel_item_ids, moved_item_channel_ids = {}, {}
+    for channel in channels:
+        channel_item_ids[channel.id] = []
+        for media_id in sms_collection_media_ids[channel.id]:
+            item_id, current_channel_id = item_map.get(media_id, (None, None))
+            if item_id is None:
+                continue
+            channel_item_ids[channel.id].append(item_id)
+            if current_channel_id != channel.id:
+                moved_item_channel_ids[item_id] = channel.id
+
+    # Remove media items which are no longer listed from the channels. The search backend is
+    # explicitly told about the items which change since update() does not call any signal
+    # handlers.
+    removed_media_items = (
+        mpmodels.MediaItem.objects
+        .filter(channel__in=channels)
+        .exclude(id__in={
+            item_id for item_ids in channel_item_ids.values() for item_id in item_ids
+        })
+    )
+    searchbackends.schedule_index(removed_media_items.values_list('id', flat=True))
+    removed_media_items.update(channel=None)
+
+    bulk.bulk_update(
+        [
+            mpmodels.MediaItem(id=item_id, channel_id=channel_id)
+            for item_id, channel_id in moved_item_channel_ids.items()
+        ],
+        ['channel']
+    )
+
+    # Update associated SMS collections (if any). The SMS collections to save are keyed by SMS
+    # collection id.
+    sms_channels, deleted_sms_collection_ids = {}, set()
+    new_playlists, updated_playlists = [], []
+    for channel in channels:
+        channel_data = jwp.Channel(channel.data)
+        custom = channel_data.get('custom', {})
 
-        # Update associated SMS collection (if any)
+        # Note that hasattr is recommended in the Django docs as a way to determine if a related
+        # objects exists.
+        # https://docs.djangoproject.com/en/dev/topics/db/examples/one_to_one/
+        existing_sms_channel = channel.sms if hasattr(channel, 'sms') else None
         sms_collection_id = channel_data.collection_id
         if sms_collection_id is not None:
-            # Get or create associated SMS collection. Note that hasattr is recommended in the
-            # Django docs as a way to determine if a related objects exists.
-            # https://docs.djangoproject.com/en/dev/topics/db/examples/one_to_one/
-            if hasattr(channel, 'sms') and channel.sms is not None:
-                sms_channel = channel.sms
+            # Get or create associated SMS collection.
+            if existing_sms_channel is not None:
+                sms_channel = existing_sms_channel
             else:
-                sms_channel = legacymodels.Collection(id=sms_collection_id)
+                sms_channel = legacymodels.Collection(id=int(sms_collection_id))
 
             # Extract last updated timestamp. It should be an ISO 8601 date string.
             last_updated = jwp.parse_custom_field(
@@ -412,32 +722,142 @@ def update_related_models_from_cache(update_all_videos=False):
             if sms_channel.playlist is None:
                 # If the 'shadow' playlist doesn't exist, create it.
                 sms_channel.playlist = mpmodels.Playlist(channel=channel)
-
-            sms_channel.save()
+                new_playlists.append(sms_channel.playlist)
+            else:
+                updated_playlists.append(sms_channel.playlist)
 
             # Update the Playlist
             sms_channel.playlist.title = channel.title
             sms_channel.playlist.description = channel.description
-            sms_channel.playlist.media_items = item_ids
-            sms_channel.playlist.save()
-        else:
+            sms_channel.playlist.media_items = channel_item_ids[channel.id]
+            sms_channel.playlist.updated_at = now
+
+            sms_channels[sms_channel.id] = sms_channel
+            deleted_sms_collection_ids.discard(sms_channel.id)
+        elif existing_sms_channel is not None:
             # If there is no associated SMS collection, make sure that this channel doesn't have
             # one pointing to it.
-            if hasattr(channel, 'sms') and channel.sms is not None:
-                channel.sms.delete()
+            deleted_sms_collection_ids.add(existing_sms_channel.id)
+            sms_channels.pop(existing_sms_channel.id, None)
 
-        channel.save()
+    bulk.bulk_update(channels, ['title', 'description', 'updated_at'])
+    bulk.bulk_update(
+        [channel.edit_permission for channel in channels],
+        ['crsids', 'lookup_groups', 'lookup_insts', 'is_public', 'is_signed_in']
+    )
 
+    legacymodels.Collection.objects.filter(id__in=deleted_sms_collection_ids).delete()
 
-def _ensure_billing_account(lookup_instid):
+    # Insert all the new playlists in an efficient manner. Since the bulk_create() call does not
+    # call any signal handlers, we need to manually create their view permissions.
+    mpmodels.Playlist.objects.bulk_create(new_playlists)
+    mpmodels.Permission.objects.bulk_create([
+        mpmodels.Permission(allows_view_playlist=playlist, is_public=True)
+        for playlist in new_playlists
+    ])
+    bulk.bulk_update(updated_playlists, ['title', 'description', 'media_items', 'updated_at'])
+
+    # SMS collections which already exist in the database are updated and the remainder created.
+    existing_sms_collection_ids = set(
+        legacymodels.Collection.objects.filter(id__in=sms_channels.keys())
+        .values_list('id', flat=True)
+    )
+    bulk.bulk_update(
+        [
+            sms_channel for sms_collection_id, sms_channel in sms_channels.items()
+            if sms_collection_id in existing_sms_collection_ids
+        ],
+        ['channel', 'playlist', 'last_updated_at']
+    )
+    legacymodels.Collection.objects.bulk_create([
+        sms_channel for sms_collection_id, sms_channel in sms_channels.items()
+        if sms_collection_id not in existing_sms_collection_ids
+    ])
+
+    # The channels' edit permissions and contents may have changed and so re-index their media
+    # items.
+    searchbackends.schedule_index(
+        mpmodels.MediaItem.objects.filter(channel__in=channels).values_list('id', flat=True))
+
+
+def _ensure_billing_accounts(lookup_instids):
+    """
+    Return a dict mapping each of the specified institution ids to a billing account associated
+    with it. Billing accounts which do not exist are created.
+
+    """
+    billing_accounts = {
+        billing_account.lookup_instid: billing_account
+        for billing_account in mpmodels.BillingAccount.objects.filter(
+            lookup_instid__in=lookup_instids)
+    }
+
+    new_billing_accounts = [
+        mpmodels.BillingAccount(
+            description=f'Lookup instutution {lookup_instid}', lookup_instid=lookup_instid)
+        for lookup_instid in sorted(set(lookup_instids) - billing_accounts.keys())
+    ]
+    mpmodels.BillingAccount.objects.bulk_create(new_billing_accounts)
+
+    billing_accounts.update(
+        (billing_account.lookup_instid, billing_account)
+        for billing_account in new_billing_accounts
+    )
+    return billing_accounts
+
+
+def _set_jwp_fields(jwp_model, field_name, keys_and_values):
     """
-    Return a billing account associated with the specified institution id if one exists or create
-    one if not.
+    Given a model from mediaplatform_jwp, the name of a field on that model and a list of (key,
+    value) pairs, set the field of each JWP object with a single ``UPDATE ... FROM (VALUES ...)``
+    statement. For relation fields, the values are the ids of the related objects.
 
     """
-    return mpmodels.BillingAccount.objects.get_or_create(
-            defaults={'description': f'Lookup instutution {lookup_instid}'},
-            lookup_instid=lookup_instid)[0]
+    if len(keys_and_values) == 0:
+        return
+
+    table = jwp_model._meta.db_table
+    column = jwp_model._meta.get_field(field_name).column
+
+    with connection.cursor() as cursor:
+        # execute_values() sends the values as a single VALUES list when page_size is at least the
+        # number of values. http://initd.org/psycopg/docs/extras.html#fast-exec
+        execute_values(cursor, f'''
+            UPDATE {table}
+            SET {column} = new_values.value
+            FROM (VALUES %s) AS new_values (key, value)
+            WHERE {table}.key = new_values.key
+        ''', keys_and_values, page_size=len(keys_and_values))
+
+
+def _restrict_to_keys(queryset, keys, field='key'):
+    """
+    Return queryset filtered to those objects whose field is in keys or queryset unchanged if keys
+    is None.
+
+    """
+    if keys is None:
+        return queryset
+    return queryset.filter(**{f'{field}__in': keys})
+
+
+def _restrict_to_shard(queryset, shard, field='key'):
+    """
+    Return queryset filtered to those objects whose field hashes to the shard given by the pair
+    (index, count) or queryset unchanged if shard is None. Keys are hashed using PostgreSQL's
+    hashtext() function so that the shard is computed by the database.
+
+    """
+    if shard is None:
+        return queryset
+    index, count = shard
+    return queryset.annotate(shard=models.Func(
+        models.Func(
+            functions.Cast(models.Func(models.F(field), function='hashtext'),
+                           models.BigIntegerField()),
+            function='ABS'),
+        models.Value(count), function='MOD', output_field=models.BigIntegerField(),
+    )).filter(shard=index)
 
 
 def _default_if_none(value, default):
@@ -467,59 +887,48 @@ def _ensure_resources(jwp_model, resource_queryset):
     """
     Given a model from mediaplatform_jwp and a queryset of CachedResource object corresponding to
     that model, make sure that objects of the appropriate model exist for each CachedResource
-    object and that their updated timestamps are correct.
+    object.
 
-    Returns a list of all JWP resource keys for resources which were updated/created.
-    """
+    New objects are given an updated timestamp of _UNSYNCHRONISED and the timestamps of existing
+    objects are left alone. The caller is responsible for setting the timestamps as each object is
+    synchronised.
 
+    Returns a list of the JWP resource keys of the objects which were created.
+    """
     jwp_queryset = jwp_model.objects.all()
 
-    # A query which returns all the cached video resources which do not correspond to an existing
-    # JWP video.
-    new_resources = (
+    # A query which returns the keys of all the cached resources which do not correspond to an
+    # existing JWP object. Only the keys of the new resources are needed and so their data is not
+    # fetched.
+    new_keys = list(
         resource_queryset
         .exclude(key__in=jwp_queryset.values_list('key', flat=True))
+        .values_list('key', flat=True)
     )
 
-    # Start creating a list of all JWP video object which were touched in this update
-    updated_jwp_keys = [v.key for v in new_resources.only('key')]
-
-    # Bulk insert objects for all new resources.
     jwp_queryset.bulk_create([
-        jwp_model(key=resource.key, updated=resource.data.get('updated', 0), resource=resource)
-        for resource in new_resources
-    ])
+        jwp_model(key=key, updated=_UNSYNCHRONISED, resource_id=key) for key in new_keys
+    ], batch_size=bulk.DEFAULT_BATCH_SIZE)
 
-    # A subquery which returns the corresponding CachedResource's updated timestamp for a JWP
-    # Video. We cannot simply use "data__updated" here because Django by design
+    return new_keys
+
+
+def _matching_resource_updated(resource_queryset):
+    """
+    Return a subquery which returns the updated timestamp of the CachedResource in
+    resource_queryset corresponding to a JWP object.
+
+    """
+    # We cannot simply use "data__updated" here because Django by design
     # (https://code.djangoproject.com/ticket/14104) does not support joined fields with update()
     # but the checks incorrectly interpret "data__updated" as a join and not a transform. Until
     # Django is fixed, we use a horrible workaround using RawSQL.  See
     # https://www.postgresql.org/docs/current/static/functions-json.html for the Postgres JSON
     # operators.
-    matching_resource_updated = models.Subquery(
+    return models.Subquery(
         resource_queryset
         .filter(key=models.OuterRef('key'))
         .values_list(
             functions.Cast(expressions.RawSQL("data ->> 'updated'", []), models.BigIntegerField())
         )[:1]
     )
-
-    # Add to our list of updated JWP videos
-    updated_jwp_keys.extend([
-        v.key
-        for v in jwp_queryset
-        .filter(updated__lt=matching_resource_updated)
-        .only('key')
-    ])
-
-    # For all objects whose corresponding CachedResource's updated field is later than the object's
-    # updated field, update the object.
-    (
-        jwp_queryset
-        .annotate(resource_updated=matching_resource_updated)
-        .filter(updated__lt=models.F('resource_updated'))
-        .update(updated=models.F('resource_updated'))
-    )
-
-    return updated_jwp_keys
@@ -2,26 +2,43 @@
 Celery tasks.
 
 """
+import collections
+from concurrent import futures
+import itertools
 import logging
 import random
+import threading
 import time
 
-from celery import shared_task
-from django.db import transaction
-from jwplatform.errors import JWPlatformRateLimitExceededError
+from celery import chord, shared_task
+from django.conf import settings
+from django.db import OperationalError, transaction
+from jwplatform.errors import JWPlatformNotFoundError, JWPlatformRateLimitExceededError
 
 from mediaplatform_jwp import models
 from mediaplatform_jwp import sync
 from mediaplatform_jwp.api import delivery as jwplatform
+from mediaplatform_jwp.api import management
 import mediaplatform.models
 
 
 LOG = logging.getLogger(__name__)
 
+# Number of resources requested in each page when listing resources
+_FETCH_PAGE_SIZE = 1000
+
+# Maximum number of attempts to make a JWP API call which fails due to the rate limit
+_MAX_ATTEMPTS = 10
+
+# Initial and maximum limits in seconds on the sleep after a JWP API call fails due to the rate
+# limit
+_BACKOFF_BASE_DELAY = 2
+_BACKOFF_MAX_DELAY = 120
+
 
 @shared_task(name='mediaplatform_jwp.synchronise')
-@transaction.atomic
-def synchronise(sync_all=False, skip_video_fetch=False, skip_channel_fetch=False):
+def synchronise(sync_all=False, skip_video_fetch=False, skip_channel_fetch=False,
+                incremental=False):
     """
     Synchronise the list of Cached JWP resources in the database with the actual list of resources
     using the JWP management API.
@@ -38,14 +55,51 @@ def synchronise(sync_all=False, skip_video_fetch=False, skip_channel_fetch=False
 
     If *skip_channel_fetch* is True, the cached channel resources are not re-fetched from JWP.
 
+    If *incremental* is True, only video resources which have been updated since the last
+    successful fetch are fetched from JWP and videos deleted from JWP are not detected. Routine
+    synchronisations should be incremental with an occasional full synchronisation to detect
+    deletions. Channels are always fetched in full since there are few of them.
+
+    Resources are fetched and synchronised in batches of JWP_SYNC_BATCH_SIZE, each in its own
+    transaction, so that no transaction lasts for the whole synchronisation. Progress is
+    checkpointed in the database and, if a synchronisation is interrupted, the next one resumes
+    from where it stopped. See :py:class:`mediaplatform_jwp.models.FetchCheckpoint` and
+    :py:func:`mediaplatform_jwp.sync.update_related_models_from_cache`.
+
+    If JWP_SYNC_SHARDS is greater than 1, the cached resources are synchronised into the main
+    application state by concurrent workers once the task returns. See
+    :py:func:`~.synchronise_in_shards`.
+
     """
     # Create the JWPlatform client
     client = jwplatform.get_jwplatform_client()
 
     # Fetch and cache the video resources
     if not skip_video_fetch:
-        LOG.info('Caching video resources...')
-        models.set_resources(fetch_videos(client), 'video')
+        # An interrupted full fetch is resumed even if an incremental fetch was requested since the
+        # high-water mark of a partial fetch does not reflect all of the videos.
+        updated_since = (
+            models.resources_high_water_mark(models.CachedResource.VIDEO)
+            if incremental and not models.FetchCheckpoint.objects.filter(
+                type=models.CachedResource.VIDEO).exists()
+            else None
+        )
+        if updated_since is None:
+            LOG.info('Caching video resources...')
+            _fetch_resources_in_batches(
+                models.CachedResource.VIDEO,
+                lambda offset: fetch_videos(client, offset=offset))
+        else:
+            # Incremental fetches are usually small and are cached in a single transaction along
+            # with the new high-water mark so that the mark never advances beyond an updated video
+            # which has not been cached.
+            LOG.info('Caching video resources updated since %s...', updated_since)
+            videos = list(fetch_videos(client, updated_since=updated_since))
+            with transaction.atomic():
+                counts = models.set_resources(videos, 'video', delete_missing=False)
+                models.set_resources_high_water_mark(
+                    models.CachedResource.VIDEO, _high_water_mark(videos, updated_since))
+            LOG.info('Video resources: %s', _format_counts(counts))
 
     # Print out the total number of videos cached
     LOG.info('Number of cached video resources: {}'.format(
@@ -54,16 +108,85 @@ def synchronise(sync_all=False, skip_video_fetch=False, skip_channel_fetch=False
 
     if not skip_channel_fetch:
         LOG.info('Fetching channels...')
-        models.set_resources(fetch_channels(client), 'channel')
+        _fetch_resources_in_batches(
+            models.CachedResource.CHANNEL,
+            lambda offset: fetch_channels(client, offset=offset))
 
     # Print out the total number of channels cached
     LOG.info('Number of cached channel resources: {}'.format(
         models.CachedResource.channels.count()
     ))
 
-    # Synchronise cached resources into main application state
+    # Synchronise cached resources into main application state, possibly using many workers
+    if settings.JWP_SYNC_SHARDS > 1:
+        synchronise_in_shards(update_all_videos=sync_all)
+        return
+
     sync.update_related_models_from_cache(update_all_videos=sync_all)
+    _log_model_counts()
+
+
+@shared_task(name='mediaplatform_jwp.synchronise_in_shards')
+def synchronise_in_shards(update_all_videos=False, shard_count=None):
+    """
+    Synchronise the cached resources into the main application state using concurrent workers.
+    Media items and channels whose JWP resources are no longer cached are first marked as deleted
+    so that no shard creates media items for deleted videos. The JWP videos are then partitioned
+    into *shard_count* shards, which defaults to JWP_SYNC_SHARDS, by the hash of their keys and a
+    :py:func:`~.synchronise_shard` task is dispatched for each shard. Once every shard is done,
+    :py:func:`~.finish_synchronisation_in_shards` synchronises channels.
+
+    The tasks are dispatched as a Celery chord and so a result backend must be configured.
+
+    """
+    shard_count = shard_count if shard_count is not None else settings.JWP_SYNC_SHARDS
+
+    sync.delete_models_missing_from_cache()
+
+    LOG.info('Synchronising media items in %s shards', shard_count)
+
+    chord(
+        synchronise_shard.s(shard_index, shard_count, update_all_videos=update_all_videos)
+        for shard_index in range(shard_count)
+    )(finish_synchronisation_in_shards.s(update_all_videos=update_all_videos))
+
+
+@shared_task(name='mediaplatform_jwp.synchronise_shard', autoretry_for=(OperationalError,),
+             retry_backoff=_BACKOFF_BASE_DELAY, retry_backoff_max=_BACKOFF_MAX_DELAY,
+             max_retries=_MAX_ATTEMPTS)
+def synchronise_shard(shard_index, shard_count, update_all_videos=False):
+    """
+    Create and synchronise the media items for the JWP videos in shard *shard_index* of
+    *shard_count*. Returns a list of the ids of the media items which were created. See
+    :py:func:`mediaplatform_jwp.sync.update_media_items_from_cache`.
+
+    Concurrent shards may deadlock when they update the counts of the same tags. The task is
+    retried if so and, since the progress of the synchronisation is committed with each batch, the
+    retry continues from the batch which failed.
 
+    """
+    LOG.info('Synchronising media items in shard %s of %s', shard_index + 1, shard_count)
+    return sync.update_media_items_from_cache(
+        update_all_videos=update_all_videos, shard=(shard_index, shard_count))
+
+
+@shared_task(name='mediaplatform_jwp.finish_synchronisation_in_shards')
+def finish_synchronisation_in_shards(new_media_item_ids_by_shard, update_all_videos=False):
+    """
+    Complete a synchronisation started by :py:func:`~.synchronise_in_shards` once every shard is
+    done. *new_media_item_ids_by_shard* is the list of results of the
+    :py:func:`~.synchronise_shard` tasks.
+
+    """
+    sync.update_channels_from_cache(
+        update_all_videos=update_all_videos,
+        new_media_item_ids=[
+            item_id for item_ids in new_media_item_ids_by_shard for item_id in item_ids])
+    _log_model_counts()
+
+
+def _log_model_counts():
+    """Log the total numbers of media items and channels after a synchronisation."""
     # Print out the total number of media items
     LOG.info('Number of media items: {}'.format(
         mediaplatform.models.MediaItem.objects.count()
@@ -75,57 +198,321 @@ def synchronise(sync_all=False, skip_video_fetch=False, skip_channel_fetch=False
     ))
 
 
-def fetch_videos(client):
+def _fetch_resources_in_batches(resource_type, fetch):
+    """
+    Fetch all resources of type *resource_type* and cache them in batches of JWP_SYNC_BATCH_SIZE
+    resources. *fetch* is a callable which takes an offset and returns an iterable of the resources
+    from that offset onwards.
+
+    Each batch is cached in its own transaction along with the advancing of the
+    :py:class:`mediaplatform_jwp.models.FetchCheckpoint` for the resource type. Once all resources
+    have been cached, those which were not fetched are marked as deleted and the high-water mark
+    used by incremental fetches is recorded. If the fetch was resumed after being interrupted,
+    resources may have moved in the list between the interruption and the resumption and so none
+    are marked as deleted and the high-water mark is left alone; the next full fetch will detect
+    them. A fetch which was interrupted before caching its first batch is started afresh.
+
+    """
+    with transaction.atomic():
+        checkpoint, created = (
+            models.FetchCheckpoint.objects.select_for_update().get_or_create(type=resource_type))
+        if not created and checkpoint.offset > 0:
+            LOG.info('Resuming fetch of %s resources from offset %s', resource_type,
+                     checkpoint.offset)
+            checkpoint.resumed = True
+            checkpoint.save()
+        elif not created:
+            # The previous fetch was interrupted before caching its first batch and so nothing
+            # was missed. Start afresh.
+            LOG.info('Restarting fetch of %s resources', resource_type)
+            checkpoint.resumed = False
+            checkpoint.high_water_mark = None
+            checkpoint.save()
+
+    resources = iter(fetch(checkpoint.offset))
+    while True:
+        batch = list(itertools.islice(resources, settings.JWP_SYNC_BATCH_SIZE))
+        if len(batch) == 0:
+            break
+
+        with transaction.atomic():
+            counts = models.set_resources(
+                batch, resource_type, delete_missing=False, record_fetched_keys=True)
+            checkpoint.offset += len(batch)
+            checkpoint.high_water_mark = _high_water_mark(batch, checkpoint.high_water_mark)
+            checkpoint.save()
+
+        LOG.info('Cached %s %s resources: %s', checkpoint.offset, resource_type,
+                 _format_counts(counts))
+
+    with transaction.atomic():
+        if checkpoint.resumed:
+            LOG.warning('Not marking %s resources as deleted since the fetch was resumed',
+                        resource_type)
+            models.FetchedKey.objects.filter(type=resource_type).delete()
+        else:
+            deleted = models.delete_unfetched_resources(resource_type)
+            LOG.info('Marked %s %s resources as deleted', deleted, resource_type)
+            if checkpoint.high_water_mark is not None:
+                models.set_resources_high_water_mark(resource_type, checkpoint.high_water_mark)
+        checkpoint.delete()
+
+
+def _high_water_mark(resources, high_water_mark=None):
+    """
+    Return the latest "updated" timestamp of the resource dicts in *resources* or
+    *high_water_mark* if it is later. Returns None if there are no resources and *high_water_mark*
+    is None.
+
+    """
+    timestamps = [int(resource.get('updated', 0)) for resource in resources]
+    if high_water_mark is not None:
+        timestamps.append(high_water_mark)
+    return max(timestamps, default=None)
+
+
+@shared_task(name='mediaplatform_jwp.synchronise_resource')
+def synchronise_resource(resource_type, key, retry=True):
     """
-    Returns an iterable of dicts representing all video resources in the JWPlatform database.
+    Re-fetch the single JWP resource of type *resource_type* with key *key*, update its cached
+    resource and synchronise the related models for that key alone. If the resource no longer
+    exists in JWP, its cached resource is marked as deleted. Scheduled when JWP notifies us of a
+    change to the resource (see :py:mod:`mediaplatform_jwp.views`) and called directly to refresh
+    individual media items on demand.
+
+    The resource is always re-fetched rather than taken from the notification so that notifications
+    which arrive out of order or more than once leave the cache in the current state of the
+    resource.
+
+    If *retry* is False, the resource is fetched with a single attempt and a
+    :py:exc:`jwplatform.errors.JWPlatformRateLimitExceededError` is raised rather than sleeping
+    and trying again. This is used when refreshing within a HTTP request.
 
     """
-    return _fetch_list(client.videos.list, 'videos')
+    client = jwplatform.get_jwplatform_client()
+    resource = fetch_resource(client, resource_type, key, retry=retry)
+
+    if resource is None:
+        LOG.info('JWP %s resource %s has been deleted', resource_type, key)
+        models.delete_resources(resource_type, [key])
+    else:
+        LOG.info('Caching JWP %s resource %s', resource_type, key)
+        models.set_resources([resource], resource_type, delete_missing=False)
 
+    sync.update_related_models_from_cache(keys=[key])
 
-def fetch_channels(client):
+
+def fetch_resource(client, resource_type, key, retry=True):
     """
-    Returns an iterable of dicts representing all channel resources in the JWPlatform database.
+    Returns a dict representing the JWPlatform resource of type *resource_type* with key *key* or
+    None if there is no such resource. If *retry* is False, calls which fail due to the rate limit
+    are not retried.
 
     """
-    return _fetch_list(client.channels.list, 'channels')
+    if resource_type == models.CachedResource.VIDEO:
+        show, key_kwarg = client.videos.show, 'video_key'
+    elif resource_type == models.CachedResource.CHANNEL:
+        show, key_kwarg = client.channels.show, 'channel_key'
+    else:
+        raise ValueError(f'Unknown resource type: {resource_type}')
+
+    try:
+        if retry:
+            response = _call_with_retries(show, **{key_kwarg: key})
+        else:
+            response = show(**{key_kwarg: key})
+    except JWPlatformNotFoundError:
+        return None
+
+    return response[resource_type]
 
 
-def _fetch_list(list_callable, results_key):
+@shared_task(name='mediaplatform_jwp.update_items')
+def update_items(item_ids):
+    """
+    Synchronise the JWP videos for the media items whose ids are in *item_ids* to the current state
+    of the items. At most JWP_UPDATE_ITEMS_PER_MINUTE items are synchronised per minute and updates
+    which fail due to the JWP rate limit are retried.
+
+    Items which have been deleted since the task was scheduled are skipped.
+
+    """
+    interval = 60. / settings.JWP_UPDATE_ITEMS_PER_MINUTE
+    items = (
+        mediaplatform.models.MediaItem.objects
+        .filter(id__in=item_ids)
+        .select_related('jwp', 'view_permission')
+    )
+
+    LOG.info('Updating %s JWP video(s)...', len(item_ids))
+    next_update_at = time.monotonic()
+    for item in items:
+        delay = next_update_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_update_at = time.monotonic() + interval
+
+        _call_with_retries(management._perform_item_update, item)
+
+
+def fetch_videos(client, updated_since=None, offset=0):
+    """
+    Returns an iterable of dicts representing all video resources in the JWPlatform database. If
+    *updated_since* is not None, only those videos whose "updated" timestamp is at least
+    *updated_since* are returned. Otherwise, the first *offset* videos are skipped.
+
+    """
+    if updated_since is None:
+        return _fetch_list(client.videos.list, 'videos', offset=offset)
+
+    # Videos are listed in order of decreasing update time and so no more pages need be fetched
+    # once a video which has not been updated is reached. Videos updated at exactly the high-water
+    # mark are fetched again in case some were updated in the same second after the last fetch.
+    # Pages are fetched one at a time since usually only the first is needed.
+    return itertools.takewhile(
+        lambda video: int(video.get('updated', 0)) >= updated_since,
+        _fetch_list(client.videos.list, 'videos', concurrency=1, order_by='updated:desc'))
+
+
+def fetch_channels(client, offset=0):
+    """
+    Returns an iterable of dicts representing all channel resources in the JWPlatform database
+    skipping the first *offset*.
+
+    """
+    return _fetch_list(client.channels.list, 'channels', offset=offset)
+
+
+def _format_counts(counts):
+    """Format a :py:class:`mediaplatform_jwp.models.ResourceCounts` for logging."""
+    return ', '.join(
+        f'{getattr(counts, field)} {field}' for field in models.ResourceCounts._fields)
+
+
+def _fetch_list(list_callable, results_key, concurrency=None, offset=0, **kwargs):
     """
     Returns an iterable of dicts representing all resources in the JWPlatform database returned
-    by a given callable.
+    by a given callable starting from the resource at *offset*. Additional keyword arguments are
+    passed to the callable.
+
+    Up to *concurrency* pages, by default JWP_FETCH_CONCURRENCY, are fetched at once by a pool of
+    threads but resources are yielded in order. Requests are paced by a :py:class:`~._TokenBucket`
+    whose rate is adjusted from the rate limit reported in each response. Pages are only fetched
+    ahead of the page being consumed and so no more requests are made once the iterable is closed.
 
     """
-    current_offset = 0
-    while True:
-        for retry_idx in range(10):
-            try:
-                # We fetch only manual channels since those are the ones we sync via sms2jwplayer.
-                results = list_callable(
-                    types_filter='manual',
-                    result_offset=current_offset, result_limit=1000).get(results_key, [])
-                current_offset += len(results)
+    if concurrency is None:
+        concurrency = settings.JWP_FETCH_CONCURRENCY
+
+    bucket = _TokenBucket(settings.JWP_FETCH_REQUESTS_PER_MINUTE / 60., capacity=concurrency)
+
+    def fetch_page(offset):
+        bucket.acquire()
+        # We fetch only manual channels since those are the ones we sync via sms2jwplayer.
+        response = _call_with_retries(
+            list_callable, types_filter='manual',
+            result_offset=offset, result_limit=_FETCH_PAGE_SIZE, **kwargs)
+        bucket.update(response.get('rate_limit'))
+        return response.get(results_key, [])
+
+    executor = futures.ThreadPoolExecutor(max_workers=concurrency)
+    pending_pages = collections.deque()
+    next_offset, fetched_count = offset, 0
+    try:
+        while True:
+            # Keep the pool busy fetching the pages which follow the next page
+            while len(pending_pages) < concurrency:
+                pending_pages.append(executor.submit(fetch_page, next_offset))
+                next_offset += _FETCH_PAGE_SIZE
+
+            results = pending_pages.popleft().result()
+            fetched_count += len(results)
+
+            # Stop when we get no results
+            if len(results) == 0:
                 break
-            except JWPlatformRateLimitExceededError:
-                # there was a rate limit error, sleep for a random duration to try and clear it
-                delay = random.randrange(20, 60)
-                LOG.warn(
-                    'Attempt %s failed due to rate limit error. Sleeping for %s seconds...',
-                    retry_idx + 1, delay
-                )
-                time.sleep(delay)
-        else:
-            # Only executed if the loop exited normally
-            raise RuntimeError('Aborting fetch after too many rety attempts')
 
-        # Stop when we get no results
-        if len(results) == 0:
-            break
+            # Otherwise, print our out progress
+            LOG.info(f'... resources fetched so far: {fetched_count}')
+
+            # Yield each dict in turn to the caller
+            for result in results:
+                yield result
+    finally:
+        # Pages fetched beyond the end of the list are discarded
+        for page in pending_pages:
+            page.cancel()
+        executor.shutdown(wait=False)
+
 
-        # Otherwise, print our out progress
-        LOG.info(f'... resources fetched so far: {current_offset}')
+class _TokenBucket:
+    """
+    A thread-safe token bucket which limits the rate of requests to *rate* per second on average
+    with bursts of up to *capacity* requests.
 
-        # Yield each dict in turn to the caller
-        for result in results:
-            yield result
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token from the bucket, sleeping until one is available if necessary."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+    def update(self, rate_limit):
+        """
+        Adjust the bucket from the "rate_limit" object of a JWP API response, which has the number
+        of requests "remaining" before the limit is "reset" at a UNIX timestamp. The remaining
+        requests are spread evenly over the time until the reset.
+
+        """
+        try:
+            remaining = int(rate_limit['remaining'])
+            reset = float(rate_limit['reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        with self._lock:
+            self._refill()
+            self.rate = max(remaining, 1) / max(reset - time.time(), 1.)
+            self._tokens = min(self._tokens, remaining)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+
+def _call_with_retries(f, *args, **kwargs):
+    """
+    Call *f* with the passed arguments and return the result. If the call fails due to the JWP rate
+    limit being exceeded, sleep and try again. The sleep is chosen at random up to a limit which
+    doubles with each attempt ("exponential backoff with full jitter") so that concurrent callers
+    do not retry in lockstep.
+
+    """
+    for retry_idx in range(_MAX_ATTEMPTS):
+        try:
+            return f(*args, **kwargs)
+        except JWPlatformRateLimitExceededError:
+            # there was a rate limit error, sleep for a random duration to try and clear it
+            delay = random.uniform(
+                0, min(_BACKOFF_MAX_DELAY, _BACKOFF_BASE_DELAY * 2 ** retry_idx))
+            LOG.warn(
+                'Attempt %s failed due to rate limit error. Sleeping for %.1f seconds...',
+                retry_idx + 1, delay
+            )
+            time.sleep(delay)
+
+    # Only reached if every attempt failed
+    raise RuntimeError('Aborting after too many rety attempts')
@@ -45,10 +45,36 @@ class CachedResourceTest(TestCase):
     def test_updated_at(self):
         """If a value is updated, the updated_at timestamp should be after created_at."""
         models.set_resources([{'key': 'foo', 'x': 5}], 'video')
-        models.set_resources([{'key': 'foo', 'x': 5}], 'video')
+        models.set_resources([{'key': 'foo', 'x': 6}], 'video')
         obj = self.videos.get(key='foo')
         self.assertGreater(obj.updated_at, obj.created_at)
 
+    def test_unchanged_not_written(self):
+        """If a value is unchanged, the cached resource is not written."""
+        models.set_resources([{'key': 'foo', 'x': 5, 'y': 6}], 'video')
+        models.set_resources([{'key': 'foo', 'y': 6, 'x': 5}], 'video')
+        obj = self.videos.get(key='foo')
+        self.assertEqual(obj.updated_at, obj.created_at)
+
+    def test_counts(self):
+        """The numbers of inserted, updated, unchanged and deleted resources are returned."""
+        self.assertEqual(
+            models.set_resources([
+                {'key': 'foo', 'x': 5}, {'key': 'bar', 'y': 7}, {'key': 'buzz', 'z': 1}
+            ], 'video'),
+            models.ResourceCounts(inserted=3, updated=0, unchanged=0, deleted=0))
+        self.assertEqual(
+            models.set_resources([
+                {'key': 'foo', 'x': 6}, {'key': 'bar', 'y': 7}, {'key': 'fizz', 'z': 2}
+            ], 'video'),
+            models.ResourceCounts(inserted=1, updated=1, unchanged=1, deleted=1))
+
+    def test_special_characters(self):
+        """Data containing characters which are special to CSV or JSON is stored unchanged."""
+        data = {'key': 'foo', 'title': 'A "title", with\ttabs,\nnewlines and \\ backslashes'}
+        models.set_resources([data], 'video')
+        self.assertEqual(self.videos.get(key='foo').data, data)
+
     def test_iterable_resources(self):
         """update_resource_cache() should accept an iterable."""
         def resources():
@@ -92,6 +118,38 @@ class CachedResourceTest(TestCase):
         o = self.all_videos.get(key='bar')
         self.assertIsNotNone(o.deleted_at)
 
+    def test_keep_missing(self):
+        """If delete_missing is False, resources which are not present are not deleted."""
+        models.set_resources([
+            {'key': 'foo', 'x': 5}, {'key': 'bar', 'y': 7}
+        ], 'video')
+        models.set_resources([{'key': 'foo', 'x': 6}], 'video', delete_missing=False)
+        self.assertEqual(self.videos.count(), 2)
+        self.assertEqual(self.videos.get(key='foo').data['x'], 6)
+
+    def test_batches(self):
+        """If resources are set in batches, those which were not fetched are deleted at the end."""
+        models.set_resources([
+            {'key': 'foo', 'x': 5}, {'key': 'bar', 'y': 7}, {'key': 'buzz', 'z': 9}
+        ], 'video')
+        models.set_resources(
+            [{'key': 'foo', 'x': 6}], 'video', delete_missing=False, record_fetched_keys=True)
+        models.set_resources(
+            [{'key': 'buzz', 'z': 9}], 'video', delete_missing=False, record_fetched_keys=True)
+        self.assertEqual(self.videos.count(), 3)
+        self.assertEqual(models.delete_unfetched_resources('video'), 1)
+        self.assertEqual(set(self.videos.values_list('key', flat=True)), {'foo', 'buzz'})
+        self.assertFalse(models.FetchedKey.objects.exists())
+
+    def test_high_water_mark(self):
+        """The high-water mark is recorded for each type and not taken from cached resources."""
+        models.set_resources([{'key': 'foo', 'updated': 5}], 'video')
+        self.assertIsNone(models.resources_high_water_mark('video'))
+        models.set_resources_high_water_mark('video', 7)
+        models.set_resources_high_water_mark('video', 5)
+        self.assertEqual(models.resources_high_water_mark('video'), 5)
+        self.assertIsNone(models.resources_high_water_mark('channel'))
+
     def test_reinsertion(self):
         """If a resource disappears and re-appears, the deleted_at field should be None."""
         models.set_resources([
@@ -3,6 +3,7 @@ from unittest import mock
 from django.test import TestCase, override_settings
 
 import mediaplatform.models as mpmodels
+from mediaplatform import signals as mpsignals
 
 from .. import signalhandlers
 
@@ -91,3 +92,23 @@ class MediaItemSyncTestCase(TestCase):
             i1.save()
             i1.view_permission.save()
         self.schedule_item_update.assert_not_called()
+
+
+@override_settings(JWP_SYNC_ITEMS=True)
+class MediaItemsBulkUpdatedTestCase(TestCase):
+    def setUp(self):
+        self.schedule_items_update_patcher = mock.patch(
+            'mediaplatform_jwp.api.management.schedule_items_update')
+        self.schedule_items_update = self.schedule_items_update_patcher.start()
+        self.addCleanup(self.schedule_items_update_patcher.stop)
+
+    def test_basic_functionality(self):
+        """A bulk update schedules a single update covering all of the items."""
+        mpsignals.media_items_bulk_updated.send(sender=mpmodels.MediaItem, item_ids=['a', 'b'])
+        self.schedule_items_update.assert_called_once_with(['a', 'b'])
+
+    def test_not_called_if_sync_disabled(self):
+        """Disabling synchronisation should not call schedule_items_update."""
+        with signalhandlers.setting_sync_items(False):
+            mpsignals.media_items_bulk_updated.send(sender=mpmodels.MediaItem, item_ids=['a'])
+        self.schedule_items_update.assert_not_called()
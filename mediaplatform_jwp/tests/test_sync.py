@@ -1,8 +1,11 @@
 import datetime
 import secrets
+from unittest import mock
 
+from django.db import connection
 from django.utils import timezone
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 import pytz
 
 import mediaplatform.models as mpmodels
@@ -256,6 +259,20 @@ class SyncTestCase(TestCase):
         self.assertEqual(c.items.all()[0].title, 'test title')
         self.assertEqual(c.billing_account.lookup_instid, 'UIS')
 
+    def test_billing_accounts(self):
+        """Channels with the same instid share a billing account which is created if needed."""
+        existing = mpmodels.BillingAccount.objects.create(
+            description='existing', lookup_instid='UIS')
+        set_resources_and_sync([], [
+            make_channel(instid='UIS'), make_channel(instid='ENG'), make_channel(instid='ENG'),
+        ])
+        self.assertEqual(
+            set(mpmodels.Channel.objects.values_list('billing_account__lookup_instid', flat=True)),
+            {'UIS', 'ENG'})
+        self.assertEqual(mpmodels.BillingAccount.objects.filter(lookup_instid='ENG').count(), 1)
+        self.assertEqual(
+            mpmodels.Channel.objects.filter(billing_account=existing).count(), 1)
+
     def test_basic_playlist_functionality(self):
         """If a new video and channel appears on JWP, objects are created."""
         self.assertEqual(mpmodels.MediaItem.objects.count(), 0)
@@ -296,6 +313,38 @@ class SyncTestCase(TestCase):
         playlist = mpmodels.Playlist.objects.filter(sms__id='3').first()
         self.assertEqual(len(playlist.media_items), 2)
 
+    def test_unchanged_channel_not_synchronised(self):
+        """Channels are only synchronised if their JWP channel was updated unless all items are
+        synchronised."""
+        videos = [make_video(title='test title', media_id='1')]
+        channels = [make_channel(title='test channel', media_ids=['1'], collection_id='3')]
+        set_resources_and_sync(videos, channels)
+        c = mpmodels.Channel.objects.get(sms__id='3')
+        c.title = 'changed locally'
+        c.save()
+
+        set_resources_and_sync(videos, channels)
+        self.assertEqual(mpmodels.Channel.objects.get(id=c.id).title, 'changed locally')
+
+        set_resources_and_sync(videos, channels, update_kwargs={'update_all_videos': True})
+        self.assertEqual(mpmodels.Channel.objects.get(id=c.id).title, 'test channel')
+
+    def test_new_item_in_unchanged_channel(self):
+        """If a video listed by a channel appears after the channel, it is added to the channel."""
+        videos = [make_video(title='test title', media_id='1')]
+        channels = [make_channel(title='test channel', media_ids=['1', '2'], collection_id='3')]
+        set_resources_and_sync(videos, channels)
+        c = mpmodels.Channel.objects.get(sms__id='3')
+        self.assertEqual(c.items.count(), 1)
+
+        videos.append(make_video(title='test title 2', media_id='2'))
+        set_resources_and_sync(videos, channels)
+        self.assertEqual(c.items.count(), 2)
+        playlist = mpmodels.Playlist.objects.get(sms__id='3')
+        self.assertEqual(
+            playlist.media_items,
+            [mpmodels.MediaItem.objects.get(sms__id=media_id).id for media_id in (1, 2)])
+
     def test_edit_acls(self):
         videos = [
             make_video(title='test title 1', media_id='1'),
@@ -394,6 +443,116 @@ class SyncTestCase(TestCase):
         self.assertIsNotNone(i1)
         self.assertEqual(i1.title, 'testing')
 
+    def test_metadata_update_query_count(self):
+        """The number of queries used to update metadata does not depend on the number of
+        items."""
+        def count_sync_all_queries(n_videos):
+            set_resources_and_sync(
+                [make_video(media_id=str(1000 + idx), acl=['WORLD']) for idx in range(n_videos)])
+            with CaptureQueriesContext(connection) as context:
+                sync.update_related_models_from_cache(update_all_videos=True)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_sync_all_queries(2), count_sync_all_queries(10))
+        self.assertEqual(legacymodels.MediaItem.objects.count(), 10)
+        self.assertEqual(
+            mpmodels.MediaItem.objects.filter(view_permission__is_public=True).count(), 10)
+
+    @override_settings(JWP_SYNC_BATCH_SIZE=1)
+    def test_interrupted_sync_resumed(self):
+        """If synchronisation is interrupted, the batches already synchronised are kept and the
+        next synchronisation synchronises the remaining items."""
+        set_resources(
+            [make_video(media_id=str(1000 + idx), title='testing') for idx in range(2)], 'video')
+
+        update = sync._update_media_items_from_videos
+        batches = []
+
+        def update_once(items):
+            if len(batches) > 0:
+                raise RuntimeError('interrupted')
+            batches.append(items)
+            update(items)
+
+        with mock.patch('mediaplatform_jwp.sync._update_media_items_from_videos', update_once):
+            with self.assertRaises(RuntimeError):
+                sync.update_related_models_from_cache()
+        self.assertEqual(mpmodels.MediaItem.objects.count(), 2)
+        self.assertEqual(mpmodels.MediaItem.objects.filter(title='testing').count(), 1)
+
+        sync.update_related_models_from_cache()
+        self.assertEqual(mpmodels.MediaItem.objects.filter(title='testing').count(), 2)
+
+    @override_settings(JWP_SYNC_BATCH_SIZE=1)
+    def test_interrupted_channel_sync_resumed(self):
+        """If synchronisation of channels is interrupted, the next synchronisation synchronises
+        the remaining channels."""
+        set_resources(
+            [make_channel(title='testing', collection_id=str(idx)) for idx in range(2)],
+            'channel')
+
+        update = sync._update_channels_from_jwp_channels
+        batches = []
+
+        def update_once(channels):
+            if len(batches) > 0:
+                raise RuntimeError('interrupted')
+            batches.append(channels)
+            update(channels)
+
+        with mock.patch('mediaplatform_jwp.sync._update_channels_from_jwp_channels', update_once):
+            with self.assertRaises(RuntimeError):
+                sync.update_related_models_from_cache()
+        self.assertEqual(len(batches[0]), 1)
+        self.assertEqual(mpmodels.Channel.objects.count(), 2)
+        self.assertEqual(mpmodels.Channel.objects.filter(title='testing').count(), 1)
+
+        sync.update_related_models_from_cache()
+        self.assertEqual(mpmodels.Channel.objects.filter(title='testing').count(), 2)
+
+    def test_sync_keys(self):
+        """If keys are given, only the videos with those keys are synchronised."""
+        v1, v2 = set_resources_and_sync(
+            [make_video(media_id='1234', title='one'), make_video(media_id='1235', title='two')])
+        v1['title'], v1['updated'] = 'new one', v1['updated'] + 10
+        v2['title'], v2['updated'] = 'new two', v2['updated'] + 10
+        v3 = make_video(media_id='1236', title='three')
+        set_resources([v1, v2, v3], 'video')
+
+        sync.update_related_models_from_cache(keys=[v1.key, v3.key])
+        self.assertEqual(mpmodels.MediaItem.objects.get(jwp__key=v1.key).title, 'new one')
+        self.assertEqual(mpmodels.MediaItem.objects.get(jwp__key=v2.key).title, 'two')
+        self.assertEqual(mpmodels.MediaItem.objects.get(jwp__key=v3.key).title, 'three')
+
+    def test_shards(self):
+        """Synchronising media items in shards followed by channels matches a single
+        synchronisation."""
+        videos = [make_video(media_id=str(idx), title='testing') for idx in range(10)]
+        channels = [make_channel(media_ids=[str(idx) for idx in range(10)], collection_id='3')]
+        set_resources(videos, 'video')
+        set_resources(channels, 'channel')
+
+        sync.delete_models_missing_from_cache()
+        new_item_ids = []
+        for shard_index in range(3):
+            new_item_ids.extend(sync.update_media_items_from_cache(shard=(shard_index, 3)))
+        sync.update_channels_from_cache(new_media_item_ids=new_item_ids)
+
+        self.assertEqual(len(set(new_item_ids)), 10)
+        self.assertEqual(mpmodels.MediaItem.objects.filter(title='testing').count(), 10)
+        self.assertEqual(mpmodels.Channel.objects.get(sms__id='3').items.count(), 10)
+
+    def test_deleted_resource_not_created(self):
+        """No media item is created for a video whose cached resource has been deleted."""
+        v1, v2 = make_video(media_id='1234'), make_video(media_id='1235')
+        set_resources([v1, v2], 'video')
+        sync.update_media_items_from_cache()
+        mpmodels.MediaItem.objects.filter(jwp__key=v2.key).delete()
+        set_resources([v1], 'video')
+
+        self.assertEqual(sync.update_media_items_from_cache(), [])
+        self.assertFalse(mpmodels.MediaItem.objects.filter(jwp__key=v2.key).exists())
+
     def assert_attribute_sync(self, video_attr, model_attr=None, test_value='testing'):
         """
         Assert that an attribute on the video dict is correctly transferred to the underlying
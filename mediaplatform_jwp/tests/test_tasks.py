@@ -0,0 +1,303 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from jwplatform.errors import JWPlatformNotFoundError, JWPlatformRateLimitExceededError
+
+from .. import models
+from .. import tasks
+
+
+@override_settings(JWP_UPDATE_ITEMS_PER_MINUTE=30)
+class UpdateItemsTestCase(TestCase):
+    fixtures = ['mediaplatform_jwp/tests/fixtures/mediaitems.yaml']
+
+    def setUp(self):
+        self.perform_item_update_patcher = mock.patch(
+            'mediaplatform_jwp.api.management._perform_item_update')
+        self.perform_item_update = self.perform_item_update_patcher.start()
+        self.addCleanup(self.perform_item_update_patcher.stop)
+
+        self.sleep_patcher = mock.patch('time.sleep')
+        self.sleep = self.sleep_patcher.start()
+        self.addCleanup(self.sleep_patcher.stop)
+
+    def test_basic_functionality(self):
+        """Each item is updated once."""
+        tasks.update_items(['empty', 'existing'])
+        self.assertEqual(
+            {call[0][0].id for call in self.perform_item_update.call_args_list},
+            {'empty', 'existing'})
+
+    def test_rate_limited(self):
+        """Updates are spaced out according to JWP_UPDATE_ITEMS_PER_MINUTE."""
+        with mock.patch('time.monotonic', return_value=100.):
+            tasks.update_items(['empty', 'existing'])
+        self.sleep.assert_called_once_with(2.)
+
+    def test_retries_rate_limit_errors(self):
+        """Updates which fail due to the JWP rate limit are retried."""
+        self.perform_item_update.side_effect = [JWPlatformRateLimitExceededError(), None]
+        tasks.update_items(['empty'])
+        self.assertEqual(self.perform_item_update.call_count, 2)
+
+    def test_missing_items_skipped(self):
+        """Items which do not exist are skipped."""
+        tasks.update_items(['empty', 'not-an-item'])
+        self.perform_item_update.assert_called_once()
+
+
+class FetchVideosTestCase(TestCase):
+    def setUp(self):
+        self.client = mock.MagicMock()
+
+    def test_full(self):
+        """All pages of videos are fetched."""
+        self.set_pages([[{'key': 'a'}, {'key': 'b'}], [{'key': 'c'}]])
+        self.assertEqual(
+            [video['key'] for video in tasks.fetch_videos(self.client)], ['a', 'b', 'c'])
+
+    @override_settings(JWP_FETCH_CONCURRENCY=3)
+    def test_concurrent_pages_in_order(self):
+        """Pages fetched concurrently are yielded in order."""
+        pages = [[{'key': f'{page_idx}-{idx}'} for idx in range(2)] for page_idx in range(7)]
+        self.set_pages(pages)
+        self.assertEqual(
+            [video['key'] for video in tasks.fetch_videos(self.client)],
+            [video['key'] for page in pages for video in page])
+
+    def test_updated_since(self):
+        """Only pages containing videos updated since the high-water mark are fetched."""
+        self.client.videos.list.side_effect = [
+            {'videos': [{'key': 'a', 'updated': 30}, {'key': 'b', 'updated': 20}]},
+            {'videos': [{'key': 'c', 'updated': 20}, {'key': 'd', 'updated': 10}]},
+            {'videos': [{'key': 'e', 'updated': 5}]},
+        ]
+        videos = list(tasks.fetch_videos(self.client, updated_since=20))
+        self.assertEqual([video['key'] for video in videos], ['a', 'b', 'c'])
+        self.assertEqual(self.client.videos.list.call_count, 2)
+        self.assertEqual(
+            self.client.videos.list.call_args[1]['order_by'], 'updated:desc')
+
+    def set_pages(self, pages):
+        """Make the client return each page in *pages* for the corresponding result offset."""
+        def list_videos(result_offset, result_limit, **kwargs):
+            page_idx = result_offset // result_limit
+            return {'videos': pages[page_idx] if page_idx < len(pages) else []}
+        self.client.videos.list.side_effect = list_videos
+
+
+class TokenBucketTestCase(TestCase):
+    def setUp(self):
+        self.now = 100.
+        monotonic_patcher = mock.patch('time.monotonic', side_effect=lambda: self.now)
+        monotonic_patcher.start()
+        self.addCleanup(monotonic_patcher.stop)
+
+        sleep_patcher = mock.patch('time.sleep', side_effect=self.advance)
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def advance(self, delay):
+        self.now += delay
+
+    def test_burst(self):
+        """Up to the capacity of the bucket may be acquired without sleeping."""
+        bucket = tasks._TokenBucket(1., capacity=3)
+        for _ in range(3):
+            bucket.acquire()
+        self.sleep.assert_not_called()
+
+    def test_paced(self):
+        """Once the bucket is empty, tokens are acquired at the rate of the bucket."""
+        bucket = tasks._TokenBucket(2., capacity=1)
+        for _ in range(5):
+            bucket.acquire()
+        self.assertAlmostEqual(self.now, 102.)
+
+    def test_update_from_rate_limit(self):
+        """The rate is adjusted to spread the remaining requests over the time until reset."""
+        bucket = tasks._TokenBucket(10., capacity=4)
+        with mock.patch('time.time', return_value=1000.):
+            bucket.update({'remaining': 2, 'reset': 1020})
+        self.assertAlmostEqual(bucket.rate, 0.1)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertAlmostEqual(self.now, 110.)
+
+    def test_update_missing_rate_limit(self):
+        """Responses without a rate limit leave the rate unchanged."""
+        bucket = tasks._TokenBucket(10., capacity=4)
+        bucket.update(None)
+        self.assertEqual(bucket.rate, 10.)
+
+
+class SynchroniseTestCase(TestCase):
+    def setUp(self):
+        models.set_resources([{'key': 'a', 'updated': 10}], 'video')
+        models.set_resources_high_water_mark('video', 10)
+
+        for target in ['mediaplatform_jwp.api.delivery.get_jwplatform_client',
+                       'mediaplatform_jwp.sync.update_related_models_from_cache']:
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        fetch_videos_patcher = mock.patch('mediaplatform_jwp.tasks.fetch_videos')
+        self.fetch_videos = fetch_videos_patcher.start()
+        self.addCleanup(fetch_videos_patcher.stop)
+
+        set_resources_patcher = mock.patch('mediaplatform_jwp.models.set_resources')
+        self.set_resources = set_resources_patcher.start()
+        self.addCleanup(set_resources_patcher.stop)
+
+    def test_incremental(self):
+        """Incremental synchronisation fetches updated videos and does not delete missing ones."""
+        self.fetch_videos.return_value = [{'key': 'b', 'updated': 20}]
+        tasks.synchronise(incremental=True, skip_channel_fetch=True)
+        self.fetch_videos.assert_called_once_with(mock.ANY, updated_since=10)
+        self.set_resources.assert_called_once_with(
+            [{'key': 'b', 'updated': 20}], 'video', delete_missing=False)
+        self.assertEqual(models.resources_high_water_mark('video'), 20)
+
+    def test_incremental_without_high_water_mark(self):
+        """Incremental synchronisation fetches all videos if no fetch has completed."""
+        models.FetchHighWaterMark.objects.all().delete()
+        self.fetch_videos.return_value = []
+        tasks.synchronise(incremental=True, skip_channel_fetch=True)
+        self.fetch_videos.assert_called_once_with(mock.ANY, offset=0)
+
+    def test_full(self):
+        """Full synchronisation fetches all videos in batches and deletes missing ones."""
+        self.set_resources.side_effect = models.set_resources
+        self.fetch_videos.return_value = [{'key': 'b', 'updated': 20}, {'key': 'c', 'updated': 30}]
+        with override_settings(JWP_SYNC_BATCH_SIZE=1):
+            tasks.synchronise(skip_channel_fetch=True)
+        self.fetch_videos.assert_called_once_with(mock.ANY, offset=0)
+        self.assertEqual(self.set_resources.call_count, 2)
+        self.set_resources.assert_called_with(
+            [{'key': 'c', 'updated': 30}], 'video', delete_missing=False,
+            record_fetched_keys=True)
+        self.assertEqual(
+            set(models.CachedResource.videos.values_list('key', flat=True)), {'b', 'c'})
+        self.assertFalse(models.FetchCheckpoint.objects.exists())
+        self.assertFalse(models.FetchedKey.objects.exists())
+        self.assertEqual(models.resources_high_water_mark('video'), 30)
+
+    def test_resume(self):
+        """An interrupted full synchronisation is resumed and does not delete missing videos."""
+        models.FetchCheckpoint.objects.create(type='video', offset=1)
+        self.set_resources.side_effect = models.set_resources
+        self.fetch_videos.return_value = [{'key': 'c', 'updated': 30}]
+        tasks.synchronise(incremental=True, skip_channel_fetch=True)
+        self.fetch_videos.assert_called_once_with(mock.ANY, offset=1)
+        self.assertEqual(
+            set(models.CachedResource.videos.values_list('key', flat=True)), {'a', 'c'})
+        self.assertFalse(models.FetchCheckpoint.objects.exists())
+        self.assertFalse(models.FetchedKey.objects.exists())
+        self.assertEqual(models.resources_high_water_mark('video'), 10)
+
+    def test_interrupted_first_page(self):
+        """A fetch interrupted before its first batch was cached is not treated as resumed."""
+        self.set_resources.side_effect = models.set_resources
+        self.fetch_videos.side_effect = RuntimeError('interrupted')
+        with self.assertRaises(RuntimeError):
+            tasks.synchronise(skip_channel_fetch=True)
+        self.assertEqual(models.FetchCheckpoint.objects.get(type='video').offset, 0)
+
+        self.fetch_videos.side_effect = None
+        self.fetch_videos.return_value = [{'key': 'c', 'updated': 30}]
+        tasks.synchronise(skip_channel_fetch=True)
+        self.fetch_videos.assert_called_with(mock.ANY, offset=0)
+        self.assertEqual(
+            set(models.CachedResource.videos.values_list('key', flat=True)), {'c'})
+        self.assertFalse(models.FetchCheckpoint.objects.exists())
+        self.assertFalse(models.FetchedKey.objects.exists())
+        self.assertEqual(models.resources_high_water_mark('video'), 30)
+
+
+class SynchroniseResourceTestCase(TestCase):
+    def setUp(self):
+        models.set_resources([{'key': 'a', 'updated': 10}], 'video')
+
+        client_patcher = mock.patch('mediaplatform_jwp.api.delivery.get_jwplatform_client')
+        self.client = client_patcher.start().return_value
+        self.addCleanup(client_patcher.stop)
+
+        sync_patcher = mock.patch('mediaplatform_jwp.sync.update_related_models_from_cache')
+        self.update_related_models_from_cache = sync_patcher.start()
+        self.addCleanup(sync_patcher.stop)
+
+    def test_updated(self):
+        """The resource is re-fetched, cached and synchronised alone."""
+        self.client.videos.show.return_value = {'video': {'key': 'a', 'updated': 20}}
+        tasks.synchronise_resource('video', 'a')
+        self.client.videos.show.assert_called_once_with(video_key='a')
+        self.assertEqual(models.CachedResource.videos.get(key='a').data['updated'], 20)
+        self.update_related_models_from_cache.assert_called_once_with(keys=['a'])
+
+    def test_no_retry(self):
+        """If retries are disabled, rate limit errors are raised without sleeping."""
+        self.client.videos.show.side_effect = JWPlatformRateLimitExceededError()
+        with mock.patch('time.sleep') as sleep:
+            with self.assertRaises(JWPlatformRateLimitExceededError):
+                tasks.synchronise_resource('video', 'a', retry=False)
+        sleep.assert_not_called()
+        self.client.videos.show.assert_called_once_with(video_key='a')
+        self.update_related_models_from_cache.assert_not_called()
+
+    def test_high_water_mark_unchanged(self):
+        """The high-water mark used by incremental fetches does not advance."""
+        models.set_resources_high_water_mark('video', 10)
+        self.client.videos.show.return_value = {'video': {'key': 'a', 'updated': 20}}
+        tasks.synchronise_resource('video', 'a')
+        self.assertEqual(models.resources_high_water_mark('video'), 10)
+
+    def test_other_resources_kept(self):
+        """Other cached resources are not deleted."""
+        self.client.channels.show.return_value = {'channel': {'key': 'b'}}
+        tasks.synchronise_resource('channel', 'b')
+        self.assertTrue(models.CachedResource.videos.filter(key='a').exists())
+        self.assertTrue(models.CachedResource.channels.filter(key='b').exists())
+
+    def test_deleted(self):
+        """If the resource no longer exists, its cached resource is marked as deleted."""
+        self.client.videos.show.side_effect = JWPlatformNotFoundError()
+        tasks.synchronise_resource('video', 'a')
+        self.assertFalse(models.CachedResource.videos.filter(key='a').exists())
+        self.update_related_models_from_cache.assert_called_once_with(keys=['a'])
+
+
+class SynchroniseInShardsTestCase(TestCase):
+    def setUp(self):
+        chord_patcher = mock.patch('mediaplatform_jwp.tasks.chord')
+        self.chord = chord_patcher.start()
+        self.addCleanup(chord_patcher.stop)
+
+    def test_chord(self):
+        """A task is dispatched for each shard followed by the final phase."""
+        tasks.synchronise_in_shards(update_all_videos=True, shard_count=3)
+        header = list(self.chord.call_args[0][0])
+        self.assertEqual([signature.args for signature in header], [(0, 3), (1, 3), (2, 3)])
+        self.assertTrue(all(signature.kwargs['update_all_videos'] for signature in header))
+        callback = self.chord.return_value.call_args[0][0]
+        self.assertEqual(callback.task, tasks.finish_synchronisation_in_shards.name)
+
+    def test_deletion_before_shards(self):
+        """Media items and channels are marked as deleted before the shards are dispatched."""
+        calls = mock.Mock()
+        self.chord.side_effect = lambda *args: calls.chord()
+        with mock.patch('mediaplatform_jwp.sync.delete_models_missing_from_cache',
+                        calls.delete_models_missing_from_cache):
+            tasks.synchronise_in_shards(shard_count=2)
+        self.assertEqual(
+            calls.mock_calls[:2],
+            [mock.call.delete_models_missing_from_cache(), mock.call.chord()])
+
+    @override_settings(JWP_SYNC_SHARDS=4)
+    def test_synchronise(self):
+        """Synchronisation is sharded if more than one shard is configured."""
+        with mock.patch('mediaplatform_jwp.api.delivery.get_jwplatform_client'), \
+                mock.patch('mediaplatform_jwp.sync.update_related_models_from_cache') as update:
+            tasks.synchronise(skip_video_fetch=True, skip_channel_fetch=True)
+        update.assert_not_called()
+        self.assertEqual(len(list(self.chord.call_args[0][0])), 4)
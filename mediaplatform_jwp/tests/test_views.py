@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import views
+
+
+@override_settings(JWPLATFORM_WEBHOOK_SECRET='webhook-secret')
+class WebhookTestCase(TestCase):
+    def setUp(self):
+        delay_patcher = mock.patch('mediaplatform_jwp.tasks.synchronise_resource.delay')
+        self.delay = delay_patcher.start()
+        self.addCleanup(delay_patcher.stop)
+
+    def test_media_event(self):
+        """A signed media event schedules the synchronisation of the video."""
+        r = self.post_event({'event': 'media_updated', 'media_id': 'abc'})
+        self.assertEqual(r.status_code, 202)
+        self.delay.assert_called_once_with('video', 'abc')
+
+    def test_channel_event(self):
+        """A signed channel event schedules the synchronisation of the channel."""
+        r = self.post_event({'event': 'channel_deleted', 'channel_id': 'def'})
+        self.assertEqual(r.status_code, 202)
+        self.delay.assert_called_once_with('channel', 'def')
+
+    def test_invalid_signature(self):
+        """Events signed with the wrong secret are rejected."""
+        r = self.post_event({'event': 'media_updated', 'media_id': 'abc'}, secret='wrong')
+        self.assertEqual(r.status_code, 403)
+        self.delay.assert_not_called()
+
+    def test_unsigned(self):
+        """Unsigned events are rejected."""
+        r = self.client.post(
+            reverse('mediaplatform_jwp:webhook'), {'event': 'media_updated', 'media_id': 'abc'},
+            content_type='application/json')
+        self.assertEqual(r.status_code, 403)
+        self.delay.assert_not_called()
+
+    def test_unknown_event(self):
+        """Unknown events are acknowledged but ignored."""
+        r = self.post_event({'event': 'media_liked', 'media_id': 'abc'})
+        self.assertEqual(r.status_code, 200)
+        self.delay.assert_not_called()
+
+    def test_missing_key(self):
+        """Events which do not identify a resource are rejected."""
+        r = self.post_event({'event': 'media_updated'})
+        self.assertEqual(r.status_code, 400)
+        self.delay.assert_not_called()
+
+    @override_settings(JWPLATFORM_WEBHOOK_SECRET=None)
+    def test_disabled(self):
+        """If no secret is configured, webhooks are disabled."""
+        r = self.post_event({'event': 'media_updated', 'media_id': 'abc'}, secret='any')
+        self.assertEqual(r.status_code, 404)
+        self.delay.assert_not_called()
+
+    def test_get_not_allowed(self):
+        """Events must be POST-ed."""
+        r = self.client.get(reverse('mediaplatform_jwp:webhook'))
+        self.assertEqual(r.status_code, 405)
+
+    def post_event(self, event, secret=None):
+        return self.client.post(
+            reverse('mediaplatform_jwp:webhook'), event, content_type='application/json',
+            HTTP_AUTHORIZATION=views.sign_event(event, secret=secret))
@@ -0,0 +1,14 @@
+"""
+URL routing schema for JWPlatform integration.
+
+"""
+
+from django.urls import path
+
+from . import views
+
+app_name = 'mediaplatform_jwp'
+
+urlpatterns = [
+    path('webhook', views.webhook, name='webhook'),
+]
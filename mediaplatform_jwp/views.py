@@ -0,0 +1,94 @@
+"""
+Django views.
+
+JWPlatform notifies us of changes to videos and channels by POST-ing webhook events to
+:py:func:`~.webhook`. Each event is signed with the webhook secret: the request has an
+``Authorization: Bearer ...`` header whose value is a JWT signed with the secret whose claims are
+the event. Valid events schedule the :py:func:`mediaplatform_jwp.tasks.synchronise_resource` task
+for the resource they concern so that changes in JWPlatform are reflected within seconds rather
+than at the next periodic synchronisation.
+
+"""
+import logging
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+import jwt
+
+from . import models
+from . import tasks
+
+LOG = logging.getLogger(__name__)
+
+#: Webhook events which we act upon mapped to the type of resource which they concern and the
+#: field of the event giving the key of the resource. Other events are acknowledged and ignored.
+WEBHOOK_EVENTS = {
+    'media_available': (models.CachedResource.VIDEO, 'media_id'),
+    'media_updated': (models.CachedResource.VIDEO, 'media_id'),
+    'media_reuploaded': (models.CachedResource.VIDEO, 'media_id'),
+    'media_deleted': (models.CachedResource.VIDEO, 'media_id'),
+    'conversions_complete': (models.CachedResource.VIDEO, 'media_id'),
+    'channel_created': (models.CachedResource.CHANNEL, 'channel_id'),
+    'channel_updated': (models.CachedResource.CHANNEL, 'channel_id'),
+    'channel_deleted': (models.CachedResource.CHANNEL, 'channel_id'),
+}
+
+
+@csrf_exempt
+@require_POST
+def webhook(request):
+    """
+    Receive a signed webhook event from JWPlatform and schedule the synchronisation of the
+    resource it concerns. Responds with 403 if the signature is missing or invalid and 400 if the
+    event does not identify a resource. If the JWPLATFORM_WEBHOOK_SECRET setting is not set,
+    webhooks are disabled and a 404 response is generated.
+
+    In :py:mod:`~.urls` this view is named ``mediaplatform_jwp:webhook``.
+
+    """
+    if not settings.JWPLATFORM_WEBHOOK_SECRET:
+        raise Http404()
+
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'bearer':
+        return HttpResponseForbidden()
+
+    try:
+        event = jwt.decode(token, settings.JWPLATFORM_WEBHOOK_SECRET, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        LOG.warning('Rejecting webhook event with invalid signature')
+        return HttpResponseForbidden()
+
+    event_name = event.get('event')
+    if event_name not in WEBHOOK_EVENTS:
+        LOG.info('Ignoring webhook event: %s', event_name)
+        return HttpResponse()
+
+    resource_type, key_field = WEBHOOK_EVENTS[event_name]
+    key = event.get(key_field)
+    if not isinstance(key, str) or key == '':
+        return HttpResponseBadRequest()
+
+    LOG.info('Received webhook event %s for JWP %s resource %s', event_name, resource_type, key)
+    tasks.synchronise_resource.delay(resource_type, key)
+
+    return HttpResponse(status=202)
+
+
+def sign_event(event, secret=None):
+    """
+    Return the value of the Authorization header for a webhook request carrying *event* signed
+    with *secret*, which defaults to the JWPLATFORM_WEBHOOK_SECRET setting. JWPlatform signs the
+    events it sends in the same way. Used to send synthetic events when testing.
+
+    """
+    secret = secret if secret is not None else settings.JWPLATFORM_WEBHOOK_SECRET
+    token = jwt.encode(event, secret, algorithm='HS256')
+
+    # Older versions of PyJWT return the token as bytes.
+    if isinstance(token, bytes):
+        token = token.decode('ascii')
+
+    return f'Bearer {token}'
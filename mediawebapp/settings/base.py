@@ -161,6 +161,29 @@ USE_TZ = True
 #: .. seealso:: https://docs.djangoproject.com/en/2.0/howto/static-files/
 STATIC_URL = '/static/'
 
+#: URLconf used to generate the API schema. See the comment in :py:mod:`mediawebapp.apiurls`.
+API_SCHEMA_URLCONF = 'mediawebapp.apiurls'
+
+#: Directory where pre-generated API schema artifacts are stored. See :py:mod:`api.schema`.
+API_SCHEMA_DIR = os.environ.get(
+    'DJANGO_API_SCHEMA_DIR', os.path.join(BASE_DIR, 'build', 'apischema'))
+
+#: Version of the code used to key API schema artifacts. If blank, a digest of the project's
+#: sources is used. Loaded from the ``DJANGO_API_SCHEMA_CODE_VERSION`` environment variable.
+API_SCHEMA_CODE_VERSION = os.environ.get('DJANGO_API_SCHEMA_CODE_VERSION', '')
+
+#: Backend used for full-text search of media items. See :py:mod:`mediaplatform.searchbackends`.
+#: If the ``DJANGO_SEARCH_URL`` environment variable is set, an OpenSearch compatible engine at
+#: that URL is used. Otherwise PostgreSQL full-text search is used.
+SEARCH_BACKEND = (
+    {
+        'BACKEND': 'mediaplatform.searchbackends.OpenSearchBackend',
+        'OPTIONS': {'url': os.environ['DJANGO_SEARCH_URL']},
+    }
+    if os.environ.get('DJANGO_SEARCH_URL') else
+    {'BACKEND': 'mediaplatform.searchbackends.PostgresBackend'}
+)
+
 #: Authentication backends
 AUTHENTICATION_BACKENDS = [
     'ucamwebauth.backends.RavenAuthBackend',
@@ -193,6 +216,9 @@ JWPLATFORM_API_KEY = os.environ.get('JWPLATFORM_API_KEY', '')
 #: JWPlatform API secret. Loaded from the ``JWPLATFORM_API_SECRET`` environment variable.
 JWPLATFORM_API_SECRET = os.environ.get('JWPLATFORM_API_SECRET', '')
 
+#: JWPlatform webhook secret. Loaded from the ``JWPLATFORM_WEBHOOK_SECRET`` environment variable.
+JWPLATFORM_WEBHOOK_SECRET = os.environ.get('JWPLATFORM_WEBHOOK_SECRET', '')
+
 # Load jwplayer embed player from environment. Warn if it is unset but allow the app to load.
 JWPLATFORM_EMBED_PLAYER_KEY = os.environ.get('JWPLATFORM_EMBED_PLAYER_KEY', '')
 
@@ -35,6 +35,7 @@ urlpatterns = [
     path('', include('ucamwebauth.urls')),
     path('healthz', automationcommon.views.status, name='status'),
     path('legacy/', include('legacysms.urls', namespace='legacysms')),
+    path('jwp/', include('mediaplatform_jwp.urls', namespace='mediaplatform_jwp')),
     path('', include('ui.urls', namespace='ui')),
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps},
          name='django.contrib.sitemaps.views.sitemap'),
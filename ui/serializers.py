@@ -1,9 +1,10 @@
 import logging
 import urllib.parse
 
-from django.urls import reverse
 from rest_framework import serializers
 
+from api import serializers as apiserializers
+from api import urltemplates
 from mediaplatform_jwp.api import delivery as jwplatform
 
 LOG = logging.getLogger(__name__)
@@ -47,7 +48,7 @@ class MediaItemJSONLDSerializer(JSONLDSerializer):
     jsonld_context = 'http://schema.org'
     jsonld_type = 'VideoObject'
 
-    id = serializers.HyperlinkedIdentityField(
+    id = apiserializers.HyperlinkedIdentityField(
         view_name='api:media_item', help_text='Unique URL for the media', read_only=True)
 
     name = serializers.CharField(source='title', help_text='Title of media')
@@ -94,16 +95,13 @@ class MediaItemJSONLDSerializer(JSONLDSerializer):
             return None
         return self._reverse('api:media_source', kwargs={'pk': obj.id})
 
-    def _reverse(self, *args, **kwargs):
+    def _reverse(self, viewname, kwargs=None):
         """
-        Wrapper around Django's reverse() utility function which attempts to use the request in
+        Wrapper around :py:func:`api.urltemplates.reverse` which attempts to use the request in
         the serialiser context (if any) to build an absolute URI.
 
         """
-        uri = reverse(*args, **kwargs)
-        if 'request' not in self.context:
-            return uri
-        return self.context['request'].build_absolute_uri(uri)
+        return urltemplates.reverse(viewname, kwargs=kwargs, request=self.context.get('request'))
 
 
 class MediaItemPageSerializer(serializers.Serializer):
@@ -119,7 +117,7 @@ class MediaItemRSSEntitySerializer(serializers.Serializer):
     """
 
     """
-    url = serializers.HyperlinkedIdentityField(view_name='ui:media_item')
+    url = apiserializers.HyperlinkedIdentityField(view_name='ui:media_item')
     imageUrl = serializers.SerializerMethodField()
     title = serializers.CharField()
     description = serializers.CharField()
@@ -130,9 +128,9 @@ class MediaItemRSSEntitySerializer(serializers.Serializer):
     enclosures = serializers.SerializerMethodField()
 
     def get_imageUrl(self, obj):
-        return self._absolute_uri(reverse('api:media_poster', kwargs={
+        return self._reverse('api:media_poster', kwargs={
             'pk': obj.id, 'width': 1920, 'extension': 'jpg'
-        }))
+        })
 
     def get_enclosures(self, obj):
         # Really we should simply use the sources attribute on the media item and serialise this
@@ -144,18 +142,20 @@ class MediaItemRSSEntitySerializer(serializers.Serializer):
         # Unfortunately itunes requires a url with an extension so we have to use
         # media_source_with_ext here.
         return [{
-            'url': self._absolute_uri(reverse('api:media_source_with_ext', kwargs={
+            'url': self._reverse('api:media_source_with_ext', kwargs={
                 'pk': obj.id,
                 'extension': mime_type.split('/')[1]
-            })),
+            }),
             'mime_type': mime_type
         }]
 
-    def _absolute_uri(self, uri):
-        request = self.context.get('request')
-        if request is None:
-            return uri
-        return request.build_absolute_uri(uri)
+    def _reverse(self, viewname, kwargs=None):
+        """
+        Wrapper around :py:func:`api.urltemplates.reverse` which uses the request in the serialiser
+        context (if any) to build an absolute URI.
+
+        """
+        return urltemplates.reverse(viewname, kwargs=kwargs, request=self.context.get('request'))
 
 
 class MediaItemRSSSerializer(serializers.Serializer):
@@ -163,7 +163,7 @@ class MediaItemRSSSerializer(serializers.Serializer):
     Serialise a media item resource into data suitable for :py:class:`ui.renderers.RSSRenderer`.
 
     """
-    url = serializers.HyperlinkedIdentityField(view_name='ui:media_item_rss')
+    url = apiserializers.HyperlinkedIdentityField(view_name='ui:media_item_rss')
     title = serializers.CharField()
     description = serializers.CharField()
     entries = MediaItemRSSEntitySerializer(many=True, source='self_list')
@@ -174,7 +174,7 @@ class PlaylistRSSSerializer(serializers.Serializer):
     Serialise a playlist resource into data suitable for :py:class:`ui.renderers.RSSRenderer`.
 
     """
-    url = serializers.HyperlinkedIdentityField(view_name='ui:playlist_rss')
+    url = apiserializers.HyperlinkedIdentityField(view_name='ui:playlist_rss')
     title = serializers.CharField()
     description = serializers.CharField()
     entries = MediaItemRSSEntitySerializer(many=True, source='downloadable_media_items')